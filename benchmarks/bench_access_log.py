@@ -0,0 +1,197 @@
+"""Access logging under uvicorn and gunicorn: the servers' own access logs, written
+as JSON records by the she_logging handler, vs the structured records of
+she_logging.access_log, vs no access log.
+
+The throughput of a minimal app is measured in its own server process for each, a
+FastAPI app under uvicorn (AccessLogMiddleware, or uvicorn's "uvicorn.access" log)
+and a Flask app under gunicorn with the threaded worker (LOG_ACCESS=True, or
+gunicorn's "gunicorn.access" log), writing to /dev/null. The cost of each access
+record is also timed on its own, with the request data the servers pass.
+
+    python -m benchmarks.bench_access_log
+"""
+import logging
+import os
+import subprocess
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from she_logging.access_log import gunicorn_access, http_request, log_access
+from she_logging.logging import CustomisedJSONFormatter
+
+from .bench_apps import CONNECTIONS, ROOT, gunicorn_command, uvicorn_command
+from .common import Results, free_port, per_call, report, requests_per_sec
+
+REQUESTS = 500
+NUMBER = 20000
+ACCESS_LOGS = ("server", "she_logging", "none")
+
+
+def _server_access_log(name: str) -> None:
+    # The server's own access log, written by the she_logging handler
+    logger = logging.getLogger(name)
+    logger.handlers = logging.getLogger().handlers
+    logger.setLevel(logging.INFO)
+
+
+def uvicorn_app() -> Any:
+    from fastapi import FastAPI
+
+    from she_logging.fastapi_access_log import AccessLogMiddleware
+    from she_logging.fastapi_request_id import RequestIDMiddleware
+    from she_logging.logging import init_logging
+
+    init_logging()
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware)
+    access_log = os.environ["BENCH_ACCESS_LOG"]
+    if access_log == "she_logging":
+        app.add_middleware(AccessLogMiddleware)
+    elif access_log == "server":
+        _server_access_log("uvicorn.access")
+
+    @app.get("/")
+    async def read_root() -> Dict[str, str]:
+        return {"Hello": "World"}
+
+    return app
+
+
+def gunicorn_app() -> Any:
+    from flask import Flask
+
+    from she_logging.flask_request_id import init_app
+
+    app = Flask(__name__)
+    init_app(app)
+    if os.environ["BENCH_ACCESS_LOG"] == "server":
+        _server_access_log("gunicorn.access")
+
+    @app.route("/")
+    def read_root() -> Dict[str, str]:
+        return {"Hello": "World"}
+
+    return app
+
+
+def throughput(server: str, access_log: str) -> Dict[str, float]:
+    port = free_port()
+    env = {**os.environ, "LOG_FORMAT": "JSON", "BENCH_ACCESS_LOG": access_log}
+    command: List[str]
+    if server == "uvicorn":
+        command = uvicorn_command("benchmarks.bench_access_log:uvicorn_app", port)
+        command.append("--factory")
+        if access_log == "server":
+            command.remove("--no-access-log")
+    else:
+        command = gunicorn_command("benchmarks.bench_access_log:gunicorn_app()", port)
+        command += ["--logger-class", "she_logging.gunicorn_logger.Logger"]
+        if access_log == "server":
+            command += ["--access-logfile", "-"]
+        env["LOG_ACCESS"] = str(access_log == "she_logging")
+    with open(os.devnull, "w") as devnull:
+        process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=devnull)
+        try:
+            best = requests_per_sec(port, CONNECTIONS, REQUESTS)
+        finally:
+            process.terminate()
+            process.wait()
+    return {"requests_per_sec": best}
+
+
+def per_record() -> Results:
+    from gunicorn import config, glogging
+
+    stream = open(os.devnull, "w")
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(CustomisedJSONFormatter())
+    logger = logging.getLogger("bench.access")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    settings = config.Config()
+    settings.set("accesslog", "-")
+    gunicorn_logger = glogging.Logger(settings)
+    gunicorn_logger.access_log.handlers = [handler]
+    resp = SimpleNamespace(
+        status="200 OK",
+        status_code=200,
+        sent=17,
+        headers=[("Content-Type", "application/json"), ("X-Request-ID", "abc")],
+    )
+    req = SimpleNamespace(
+        method="GET",
+        path="/items/1",
+        query="q=x",
+        version=(1, 1),
+        headers=[("HOST", "localhost"), ("USER-AGENT", "bench")],
+    )
+    environ = {
+        "REMOTE_ADDR": "127.0.0.1",
+        "REQUEST_METHOD": "GET",
+        "RAW_URI": "/items/1?q=x",
+        "PATH_INFO": "/items/1",
+        "QUERY_STRING": "q=x",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_USER_AGENT": "bench",
+    }
+    request_time = timedelta(microseconds=1532)
+
+    def uvicorn_access() -> None:
+        # As uvicorn's protocols log each response
+        logger.info(
+            '%s - "%s %s HTTP/%s" %d',
+            "127.0.0.1:51234",
+            "GET",
+            "/items/1?q=x",
+            "1.1",
+            200,
+        )
+
+    def structured() -> None:
+        log_access(
+            logger,
+            http_request(
+                "GET",
+                "/items/1?q=x",
+                200,
+                17,
+                0.001532,
+                "127.0.0.1",
+                "HTTP/1.1",
+                "bench",
+                "abc",
+            ),
+        )
+
+    try:
+        return {
+            "uvicorn access record": per_call(uvicorn_access, NUMBER),
+            "gunicorn access record": per_call(
+                lambda: gunicorn_logger.access(resp, req, environ, request_time),
+                NUMBER,
+            ),
+            "she_logging access record": per_call(structured, NUMBER),
+            "she_logging gunicorn access record": per_call(
+                lambda: gunicorn_access(resp, req, environ, request_time, logger),
+                NUMBER,
+            ),
+        }
+    finally:
+        stream.close()
+
+
+def run() -> Results:
+    results = per_record()
+    for server in ("uvicorn", "gunicorn"):
+        for access_log in ACCESS_LOGS:
+            results[f"{server} {access_log} access log"] = throughput(
+                server, access_log
+            )
+    return results
+
+
+if __name__ == "__main__":
+    report("Access logging", run())
@@ -0,0 +1,96 @@
+"""Request throughput of the example apps in tests/scripts with logging enabled and
+disabled.
+
+fastapi_app (RequestContextMiddleware and a log record per request) runs under
+uvicorn, flask_app (a log record per request) under gunicorn with the threaded
+worker, set up with she_logging.flask_request_id as the request ID lookup needs,
+each in its own server process writing JSON records to /dev/null. Logging is
+disabled by raising LOG_LEVEL to CRITICAL.
+
+    python -m benchmarks.bench_apps
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .common import Results, free_port, report, requests_per_sec
+
+CONNECTIONS = 16
+REQUESTS = 300
+ROOT = Path(__file__).parent.parent
+LEVELS = {"logging enabled": "INFO", "logging disabled": "CRITICAL"}
+
+
+def uvicorn_command(app: str, port: int) -> List[str]:
+    return [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        app,
+        "--port",
+        str(port),
+        "--log-level",
+        "warning",
+        "--no-access-log",
+    ]
+
+
+def gunicorn_command(app: str, port: int) -> List[str]:
+    return [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        app,
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--worker-class",
+        "gthread",
+        "--threads",
+        str(CONNECTIONS),
+        "--log-level",
+        "warning",
+    ]
+
+
+APPS = {
+    "fastapi_app": (uvicorn_command, "tests.scripts.fastapi_app:app"),
+    "flask_app": (gunicorn_command, "benchmarks.bench_apps:flask_app()"),
+}
+
+
+def flask_app() -> Any:
+    from she_logging.flask_request_id import init_app
+    from tests.scripts.flask_app import app
+
+    init_app(app)
+    return app
+
+
+def throughput(app: str, level: str) -> Dict[str, float]:
+    command, target = APPS[app]
+    port = free_port()
+    env = {**os.environ, "LOG_LEVEL": level, "LOG_FORMAT": "JSON"}
+    with open(os.devnull, "w") as devnull:
+        server = subprocess.Popen(
+            command(target, port), cwd=ROOT, env=env, stdout=devnull
+        )
+        try:
+            best = requests_per_sec(port, CONNECTIONS, REQUESTS)
+        finally:
+            server.terminate()
+            server.wait()
+    return {"requests_per_sec": best}
+
+
+def run() -> Results:
+    return {
+        f"{app} {name}": throughput(app, level)
+        for app in APPS
+        for name, level in LEVELS.items()
+    }
+
+
+if __name__ == "__main__":
+    report("Example app throughput", run())
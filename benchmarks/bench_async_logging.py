@@ -0,0 +1,67 @@
+"""Latency of a log call with synchronous output vs the LOG_ASYNC queue.
+
+The output stream simulates a log pipe applying backpressure by sleeping (which
+releases the GIL like a blocking write) on every write.
+
+    python -m benchmarks.bench_async_logging
+"""
+import logging
+import time
+from typing import Callable
+
+from she_logging.async_logging import start_async_logging, stop_async_logging
+from she_logging.logging import CustomisedJSONFormatter
+
+from .common import Results, latencies, latency_stats, report
+
+NUMBER = 5000
+WRITE_DELAY = 20e-6
+
+
+class SlowStream:
+    def write(self, text: str) -> int:
+        time.sleep(WRITE_DELAY)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def _logger(name: str) -> logging.Logger:
+    handler = logging.StreamHandler(SlowStream())  # type: ignore[arg-type]
+    handler.setFormatter(CustomisedJSONFormatter())
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def _call(logger: logging.Logger) -> Callable[[], None]:
+    def log() -> None:
+        logger.info("benchmark message %d", 42, extra={"patient": "abc"})
+
+    return log
+
+
+def run() -> Results:
+    results: Results = {}
+
+    logger = _logger("bench-sync")
+    results["sync"] = latency_stats(latencies(_call(logger), NUMBER))
+
+    for overflow in ("block", "drop_new"):
+        logger = _logger(f"bench-async-{overflow}")
+        start_async_logging(maxsize=NUMBER * 2, overflow=overflow, loggers=[logger])
+        try:
+            results[f"async {overflow}"] = latency_stats(
+                latencies(_call(logger), NUMBER)
+            )
+        finally:
+            stop_async_logging()
+
+    return results
+
+
+if __name__ == "__main__":
+    report("Log call latency (JSON formatter, slow stream)", run())
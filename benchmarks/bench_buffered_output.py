@@ -0,0 +1,66 @@
+"""Cost of a log call writing to a pipe with logging.StreamHandler vs
+BufferedStreamHandler.
+
+The pipe is drained by a separate process, as it would be by a container runtime
+collecting stdout. StreamHandler makes a write() system call for every record, the
+buffered handler one per batch. Records are created once and passed straight to the
+handler so the timings only include formatting and output. The short plain text
+format shows the output cost on its own, the JSON formatter a typical service.
+
+    python -m benchmarks.bench_buffered_output
+"""
+import io
+import logging
+import subprocess
+import sys
+from typing import Callable, Dict
+
+from she_logging.handlers import BufferedStreamHandler
+from she_logging.logging import CustomisedJSONFormatter
+
+from .common import Results, per_call, report
+
+NUMBER = 20000
+DRAIN = (
+    "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, open('/dev/null', 'wb'))"
+)
+
+
+def run() -> Results:
+    results: Results = {}
+    record = logging.getLogRecordFactory()(
+        "bench", logging.INFO, __file__, 1, "benchmark message %d", (42,), None
+    )
+    record.patient = "abc"
+    reader = subprocess.Popen([sys.executable, "-c", DRAIN], stdin=subprocess.PIPE)
+    assert reader.stdin is not None
+    stream = io.TextIOWrapper(reader.stdin, encoding="utf-8")
+    formatters: Dict[str, Callable[[], logging.Formatter]] = {
+        "plain": lambda: logging.Formatter("%(levelname)s %(message)s"),
+        "json": CustomisedJSONFormatter,
+    }
+    try:
+        for format_name, formatter in formatters.items():
+            handlers: Dict[str, logging.Handler] = {
+                "StreamHandler": logging.StreamHandler(stream),
+                "BufferedStreamHandler 8KiB": BufferedStreamHandler(
+                    stream, buffer_size=8192, flush_on_sigterm=False
+                ),
+                "BufferedStreamHandler 64KiB": BufferedStreamHandler(
+                    stream, buffer_size=65536, flush_on_sigterm=False
+                ),
+            }
+            for name, handler in handlers.items():
+                handler.setFormatter(formatter())
+                results[f"{name} ({format_name})"] = per_call(
+                    lambda: handler.handle(record), NUMBER
+                )
+                handler.close()
+    finally:
+        stream.close()
+        reader.wait()
+    return results
+
+
+if __name__ == "__main__":
+    report("Handler cost per record (writing to a pipe)", run())
@@ -0,0 +1,56 @@
+"""Cost of a log call with logging.StreamHandler vs CoalescingHandler wrapping it,
+for a burst of identical records (as from a retry loop) and for records which are
+all different.
+
+Records are formatted as JSON and written to /dev/null.
+
+    python -m benchmarks.bench_coalescing
+"""
+import logging
+import os
+from typing import Dict
+
+from she_logging.coalescing import CoalescingHandler
+from she_logging.logging import CustomisedJSONFormatter
+
+from .common import Results, per_call, report
+
+NUMBER = 20000
+
+
+def run() -> Results:
+    results: Results = {}
+    stream = open(os.devnull, "w")
+    record_factory = logging.getLogRecordFactory()
+    repeated = record_factory(
+        "bench.pika", logging.WARNING, __file__, 1, "Connection failed %s", ("x",), None
+    )
+    counter = iter(range(10**9))
+
+    def different() -> logging.LogRecord:
+        return record_factory(
+            "bench.pika", logging.WARNING, __file__, next(counter), "%s", ("x",), None
+        )
+
+    try:
+        stream_handler = logging.StreamHandler(stream)
+        stream_handler.setFormatter(CustomisedJSONFormatter())
+        handlers: Dict[str, logging.Handler] = {
+            "StreamHandler": stream_handler,
+            "CoalescingHandler": CoalescingHandler(stream_handler, window=1.0),
+        }
+        for name, handler in handlers.items():
+            results[f"{name} (repeated)"] = per_call(
+                lambda: handler.handle(repeated), NUMBER
+            )
+            results[f"{name} (different)"] = per_call(
+                lambda: handler.handle(different()), NUMBER
+            )
+        handlers["CoalescingHandler"].close()
+    finally:
+        stream.close()
+    return results
+
+
+if __name__ == "__main__":
+    report("Handler cost per record, a burst of identical records", run())
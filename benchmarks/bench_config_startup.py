@@ -0,0 +1,112 @@
+"""Cost of init_logging with a large YAML configuration file, with and without the
+configuration cache.
+
+load_config is timed on its own (parsing the file, reading the JSON cache file or
+from memory), and init_logging in a new process as each gunicorn worker or job would
+run it: without a cache directory, and with LOG_CONFIG_CACHE_DIR once the cache file
+has been written.
+
+    python -m benchmarks.bench_config_startup
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from she_logging import config_cache
+
+from .common import Results, per_call, report
+
+LOGGERS = 60
+NUMBER = 20
+STARTUP = (
+    "import sys; from she_logging.logging import init_logging; "
+    "init_logging(sys.argv[1])"
+)
+
+
+def write_config(path: Path) -> None:
+    lines = [
+        "version: 1",
+        "disable_existing_loggers: false",
+        "formatters:",
+        "  json:",
+        "    (): she_logging.logging.CustomisedJSONFormatter",
+        "  simple:",
+        "    format: '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'",
+        "handlers:",
+        "  json:",
+        "    class: logging.StreamHandler",
+        "    formatter: json",
+        "    stream: ext://sys.stdout",
+        "  plain:",
+        "    class: logging.StreamHandler",
+        "    formatter: simple",
+        "    stream: ext://sys.stderr",
+        "root:",
+        "  level: INFO",
+        "  handlers: [json]",
+        "loggers:",
+    ]
+    for index in range(LOGGERS):
+        lines += [
+            f"  service.component{index}:",
+            f"    level: {('DEBUG', 'INFO', 'WARNING')[index % 3]}",
+            "    handlers: [plain]",
+            "    propagate: false",
+        ]
+    path.write_text("\n".join(lines) + "\n")
+
+
+def startup(path: Path, env: Dict[str, str]) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(NUMBER):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", STARTUP, str(path)], env=env, check=True)
+        best = min(best, time.perf_counter() - start)
+    return {"startup_ms": best * 1e3}
+
+
+def run() -> Results:
+    results: Results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "logging.yaml"
+        write_config(path)
+        cache_dir = str(Path(directory) / "cache")
+
+        def parse() -> None:
+            config_cache.clear_cache()
+            config_cache.load_config(path)
+
+        results["load_config parse"] = per_call(parse, NUMBER)
+
+        os.environ["LOG_CONFIG_CACHE_DIR"] = cache_dir
+        try:
+            config, key = config_cache.load_config(path)
+            assert key is not None
+            config_cache.store_config(key, config)
+            results["load_config memory"] = per_call(
+                lambda: config_cache.load_config(path), NUMBER
+            )
+
+            def sidecar() -> None:
+                config_cache.clear_cache()
+                config_cache.load_config(path)
+
+            results["load_config cache file"] = per_call(sidecar, NUMBER)
+        finally:
+            del os.environ["LOG_CONFIG_CACHE_DIR"]
+
+        env = dict(os.environ)
+        results["process startup, no cache"] = startup(path, env)
+        env["LOG_CONFIG_CACHE_DIR"] = cache_dir
+        subprocess.run([sys.executable, "-c", STARTUP, str(path)], env=env, check=True)
+        results["process startup, cache file"] = startup(path, env)
+    return results
+
+
+if __name__ == "__main__":
+    report(f"Logging configuration with {LOGGERS} loggers", run())
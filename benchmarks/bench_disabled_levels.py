@@ -0,0 +1,50 @@
+"""Cost of a logging call at a disabled level.
+
+python -m benchmarks.bench_disabled_levels
+"""
+
+import logging
+
+from she_logging.logging import Lazy, LogProxy
+
+from .common import Results, per_call, report
+
+NUMBER = 200000
+
+
+def run() -> Results:
+    stdlib = logging.getLogger("bench-disabled")
+    stdlib.setLevel(logging.INFO)
+    proxy = LogProxy("bench-disabled")
+    value = {"patient": "abc", "readings": list(range(10))}
+
+    results: Results = {}
+    results["stdlib debug('%s', value)"] = per_call(
+        lambda: stdlib.debug("value %s", value), NUMBER
+    )
+    results["stdlib debug(f'{value}')"] = per_call(
+        lambda: stdlib.debug(f"value {value}"), NUMBER
+    )
+    results["proxy debug('%s', value)"] = per_call(
+        lambda: proxy.debug("value %s", value), NUMBER
+    )
+    results["proxy debug(f'{value}')"] = per_call(
+        lambda: proxy.debug(f"value {value}"), NUMBER
+    )
+    results["proxy debug(Lazy(lambda: f'{value}'))"] = per_call(
+        lambda: proxy.debug(Lazy(lambda: f"value {value}")), NUMBER
+    )
+    results["proxy debug('%s', Lazy(repr, value))"] = per_call(
+        lambda: proxy.debug("value %s", Lazy(repr, value)), NUMBER
+    )
+    results["stdlib isEnabledFor(DEBUG)"] = per_call(
+        lambda: stdlib.isEnabledFor(logging.DEBUG), NUMBER
+    )
+    results["proxy isEnabledFor(DEBUG)"] = per_call(
+        lambda: proxy.isEnabledFor(logging.DEBUG), NUMBER
+    )
+    return results
+
+
+if __name__ == "__main__":
+    report("Disabled level call cost", run())
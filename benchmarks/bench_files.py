@@ -0,0 +1,71 @@
+"""Cost of a log call writing to a rotating file, the standard library
+RotatingFileHandler compressing each rotated file with gzip vs she_logging's
+RotatingFileHandler, which buffers and compresses in a background thread.
+
+Files are rotated every 1MiB. The latency of every call is recorded, the standard
+handler's p99 and max include writing and compressing a rotated file.
+
+    python -m benchmarks.bench_files
+"""
+import gzip
+import logging
+import os
+import shutil
+import tempfile
+from logging.handlers import RotatingFileHandler as StandardRotatingFileHandler
+
+from she_logging import files
+from she_logging.logging import CustomisedJSONFormatter
+
+from .common import Results, latencies, latency_stats, report
+
+NUMBER = 50000
+MAX_BYTES = 1024 * 1024
+
+
+def gzip_rotator(source: str, destination: str) -> None:
+    with open(source, "rb") as plain, gzip.open(destination + ".gz", "wb") as packed:
+        shutil.copyfileobj(plain, packed)
+    os.remove(source)
+
+
+def standard_handler(directory: str) -> logging.Handler:
+    handler = StandardRotatingFileHandler(
+        os.path.join(directory, "standard.log"), maxBytes=MAX_BYTES, backupCount=100
+    )
+    handler.rotator = gzip_rotator
+    return handler
+
+
+def she_handler(directory: str) -> logging.Handler:
+    return files.RotatingFileHandler(
+        os.path.join(directory, "she.log"),
+        max_bytes=MAX_BYTES,
+        backup_count=100,
+        flush_on_sigterm=False,
+    )
+
+
+def run() -> Results:
+    results: Results = {}
+    record = logging.getLogRecordFactory()(
+        "bench", logging.INFO, __file__, 1, "benchmark message %d", (42,), None
+    )
+    record.patient = "abc"
+    with tempfile.TemporaryDirectory() as directory:
+        for name, make in (
+            ("logging.handlers.RotatingFileHandler", standard_handler),
+            ("she_logging RotatingFileHandler", she_handler),
+        ):
+            handler = make(directory)
+            handler.setFormatter(CustomisedJSONFormatter())
+            results[name] = latency_stats(
+                latencies(lambda: handler.handle(record), NUMBER)
+            )
+            handler.close()
+            files.wait_for_compression()
+    return results
+
+
+if __name__ == "__main__":
+    report(f"Rotating file handler cost per record ({NUMBER} records)", run())
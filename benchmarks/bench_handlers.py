@@ -0,0 +1,75 @@
+"""Records per second and memory allocated per record for each handler in
+SHE_LOGGING_CONFIG.
+
+Each handler is configured on its own with dictConfig, as init_logging would with
+LOG_HANDLER, and writes to /dev/null. The memory is the peak traced by tracemalloc
+while logging one record, above what was allocated before it (Python 3.9+).
+
+    python -m benchmarks.bench_handlers
+"""
+import logging
+import os
+import tracemalloc
+from contextlib import redirect_stderr, redirect_stdout
+from logging.config import dictConfig
+from typing import Dict
+
+from she_logging.logging import SHE_LOGGING_CONFIG
+
+from .common import Results, per_call, report
+
+NUMBER = 5000
+ALLOCATION_NUMBER = 500
+
+
+def allocated_per_record(logger: logging.Logger) -> Dict[str, float]:
+    if not hasattr(tracemalloc, "reset_peak"):
+        return {}
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(ALLOCATION_NUMBER):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            logger.info("benchmark %s", "message", extra={"count": 3})
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return {"alloc_bytes_per_record": total / ALLOCATION_NUMBER}
+
+
+def measure(handler: str) -> Dict[str, float]:
+    config = {
+        **SHE_LOGGING_CONFIG,
+        "handlers": {handler: SHE_LOGGING_CONFIG["handlers"][handler]},
+        "root": {"level": "INFO", "handlers": [handler]},
+    }
+    logger = logging.getLogger("bench.handlers")
+    with open(os.devnull, "w") as devnull:
+        # Handlers look up ext://sys.stdout and sys.stderr when they are configured
+        with redirect_stdout(devnull), redirect_stderr(devnull):
+            dictConfig(config)
+            try:
+                call = per_call(
+                    lambda: logger.info("benchmark %s", "message", extra={"count": 3}),
+                    NUMBER,
+                )
+                results = {
+                    "per_call_us": call["per_call_us"],
+                    "records_per_sec": call["calls_per_sec"],
+                }
+                results.update(allocated_per_record(logger))
+            finally:
+                for root_handler in logging.root.handlers:
+                    root_handler.close()
+                logging.root.handlers = []
+    return results
+
+
+def run() -> Results:
+    # Without rich installed "colour" is the same as "plaintext"
+    return {handler: measure(handler) for handler in SHE_LOGGING_CONFIG["handlers"]}
+
+
+if __name__ == "__main__":
+    report("Logging a record through each handler (to /dev/null)", run())
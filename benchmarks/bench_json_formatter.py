@@ -0,0 +1,79 @@
+"""Per-record cost of CustomisedJSONFormatter with each JSON serializer backend.
+
+"field plan" writes a reduced set of fields (and no `extra`) using the `fields` option.
+"legacy" is the original serializer: json.dumps(cls=SafeJsonEncoder), called twice
+per record because json_log_formatter first passes an unsupported `default` argument.
+
+    python -m benchmarks.bench_json_formatter
+"""
+import datetime
+import importlib
+import json
+import logging
+from functools import partial
+from typing import Any, Dict
+
+import json_log_formatter
+
+from she_logging.logging import CustomisedJSONFormatter, SafeJson
+from she_logging.serializers import SERIALIZERS, SafeJsonEncoder
+
+from .common import Results, per_call, report
+
+NUMBER = 5000
+
+TYPICAL_EXTRA: Dict[str, Any] = {"patient_uuid": "8f0e", "count": 3}
+LARGE_EXTRA: Dict[str, Any] = {
+    "httpRequest": {"method": "GET", "path": "/items/" + "x" * 200, "status": 200},
+    "items": [{"id": n, "name": f"item {n}", "tags": ["a", "b"]} for n in range(50)],
+    "when": datetime.datetime(2021, 6, 1, 12, 30),
+}
+
+
+class LegacySafeJson(SafeJson):
+    def dumps(self, data: object, **kwargs: Any) -> str:
+        if kwargs:
+            raise TypeError("unexpected arguments")  # as the original did
+        return json.dumps(data, cls=SafeJsonEncoder)
+
+
+def _record(extra: Dict[str, Any]) -> logging.LogRecord:
+    record = logging.getLogRecordFactory()(
+        "bench", logging.INFO, __file__, 42, "benchmark %s", ("message",), None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def run() -> Results:
+    formatters: Dict[str, CustomisedJSONFormatter] = {}
+    legacy = CustomisedJSONFormatter()
+    legacy.json_lib = LegacySafeJson()
+    legacy.to_json = partial(  # type: ignore[method-assign]
+        json_log_formatter.JSONFormatter.to_json, legacy
+    )
+    formatters["legacy"] = legacy
+    for name in SERIALIZERS[1:]:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        formatters[name] = CustomisedJSONFormatter(serializer=name)
+
+    formatters["json field plan"] = CustomisedJSONFormatter(
+        serializer="json",
+        fields=["timestamp", "message", {"severity": "levelname"}, "requestID"],
+    )
+
+    results: Results = {}
+    for size, extra in (("typical", TYPICAL_EXTRA), ("large", LARGE_EXTRA)):
+        record = _record(extra)
+        for name, formatter in formatters.items():
+            results[f"{size} {name}"] = per_call(
+                lambda: formatter.format(record), NUMBER
+            )
+    return results
+
+
+if __name__ == "__main__":
+    report("CustomisedJSONFormatter.format per record", run())
@@ -0,0 +1,59 @@
+"""Cost of changing logger levels at runtime, she_logging.levels.set_levels vs
+running logging.config.dictConfig again with the changed levels.
+
+The process has LOGGERS loggers, each with a handler, as a service with several
+libraries would. Without she_logging.levels the only way to change a level with
+she_logging is a new configuration, which replaces every handler.
+
+    python -m benchmarks.bench_levels
+"""
+import logging
+from logging.config import dictConfig
+from typing import Any, Dict
+
+from she_logging import levels
+
+from .common import Results, per_call, report
+
+LOGGERS = 50
+NUMBER = 200
+
+
+def config(level: str) -> Dict[str, Any]:
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {"null": {"class": "logging.NullHandler"}},
+        "loggers": {
+            f"bench.levels.{number}": {"level": level, "handlers": ["null"]}
+            for number in range(LOGGERS)
+        },
+    }
+
+
+def run() -> Results:
+    dictConfig(config("INFO"))
+    changed = {"bench.levels.0": "DEBUG", "bench.levels.1": "DEBUG"}
+    switch = {"level": "DEBUG"}
+
+    def set_levels() -> None:
+        switch["level"] = "INFO" if switch["level"] == "DEBUG" else "DEBUG"
+        levels.set_levels(dict.fromkeys(changed, switch["level"]), revert_after=0)
+
+    def reconfigure() -> None:
+        switch["level"] = "INFO" if switch["level"] == "DEBUG" else "DEBUG"
+        dictConfig(config(switch["level"]))
+
+    results = {
+        "set_levels (2 loggers)": per_call(set_levels, NUMBER),
+        f"dictConfig ({LOGGERS} loggers)": per_call(reconfigure, NUMBER),
+    }
+    for number in range(LOGGERS):
+        logger = logging.getLogger(f"bench.levels.{number}")
+        logger.handlers = []
+        logger.setLevel(logging.NOTSET)
+    return results
+
+
+if __name__ == "__main__":
+    report("Changing logger levels at runtime", run())
@@ -0,0 +1,49 @@
+"""Per-record cost of the she_logging metrics on a JSON handler.
+
+The same logger writes to an in-memory stream with and without instrument_handler,
+and Reservoir.add is timed on its own once its sample is full.
+
+    python -m benchmarks.bench_metrics
+"""
+import io
+import logging
+
+from she_logging.logging import CustomisedJSONFormatter
+from she_logging.metrics import Reservoir, instrument_handler, reset
+
+from .common import Results, per_call, report
+
+NUMBER = 20000
+
+
+def make_logger(name: str) -> logging.Logger:
+    handler = logging.StreamHandler(io.StringIO())
+    handler.setFormatter(CustomisedJSONFormatter())
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def run() -> Results:
+    plain = make_logger("bench.plain")
+    instrumented = make_logger("bench.metrics")
+    instrument_handler(instrumented.handlers[0], "json")
+    reservoir = Reservoir()
+    for _ in range(reservoir.size):
+        reservoir.add(1.0)
+
+    results = {
+        "json handler": per_call(lambda: plain.info("benchmark %s", 1), NUMBER),
+        "json handler with metrics": per_call(
+            lambda: instrumented.info("benchmark %s", 1), NUMBER
+        ),
+        "Reservoir.add": per_call(lambda: reservoir.add(1e-5), NUMBER),
+    }
+    reset()
+    return results
+
+
+if __name__ == "__main__":
+    report("Logging a record with and without metrics", run())
@@ -0,0 +1,34 @@
+"""Per-record cost of formatting SIMPLE_FORMAT with logging.Formatter,
+CachedTimeFormatter and the compiled PlaintextFormatter.
+
+    python -m benchmarks.bench_plaintext
+"""
+import logging
+
+from she_logging.logging import SIMPLE_FORMAT
+from she_logging.plaintext import PlaintextFormatter
+from she_logging.timestamps import CachedTimeFormatter
+
+from .common import Results, per_call, report
+
+NUMBER = 50000
+
+
+def run() -> Results:
+    record = logging.getLogRecordFactory()(
+        "bench", logging.INFO, __file__, 42, "benchmark %s", ("message",), None
+    )
+    results: Results = {}
+    for formatter in (
+        logging.Formatter(SIMPLE_FORMAT),
+        CachedTimeFormatter(SIMPLE_FORMAT),
+        PlaintextFormatter(SIMPLE_FORMAT),
+    ):
+        results[type(formatter).__name__] = per_call(
+            lambda: formatter.format(record), NUMBER
+        )
+    return results
+
+
+if __name__ == "__main__":
+    report("Formatting SIMPLE_FORMAT per record", run())
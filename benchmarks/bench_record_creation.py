@@ -0,0 +1,68 @@
+"""Cost of creating a LogRecord, which looks up the current request ID.
+
+Each case runs in its own process because whether Flask can be imported is fixed
+when she_logging is imported:
+
+- no flask: flask and flask_log_request_id cannot be imported
+- flask fallback: no request ID is set so flask_log_request_id is asked for one
+- flask init_app: she_logging.flask_request_id sets the ID for each request
+- in request: inside a Flask request with init_app
+
+    python -m benchmarks.bench_record_creation
+"""
+import json
+import logging
+import subprocess
+import sys
+from typing import Dict
+
+from .common import Results, per_call, report
+
+NUMBER = 100000
+CASES = ["no flask", "flask fallback", "flask init_app", "in request"]
+
+
+def measure(case: str) -> Dict[str, float]:
+    if case == "no flask":
+        sys.modules["flask"] = None  # type: ignore[assignment]
+        sys.modules["flask_log_request_id"] = None  # type: ignore[assignment]
+
+    import she_logging.logging  # noqa: F401 installs the record factory
+
+    factory = logging.getLogRecordFactory()
+
+    def create() -> logging.LogRecord:
+        return factory("bench", logging.INFO, __file__, 1, "message", (), None)
+
+    if case in ("flask init_app", "in request"):
+        from flask import Flask
+
+        from she_logging.flask_request_id import init_app
+
+        app = Flask(__name__)
+        init_app(app)
+        if case == "in request":
+            with app.test_request_context():
+                app.preprocess_request()
+                return per_call(create, NUMBER)
+
+    return per_call(create, NUMBER)
+
+
+def run() -> Results:
+    results: Results = {}
+    for case in CASES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_record_creation", case],
+            stdout=subprocess.PIPE,
+            check=True,
+        ).stdout
+        results[case] = json.loads(output)
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+    else:
+        report("LogRecord creation", run())
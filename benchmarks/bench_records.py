@@ -0,0 +1,67 @@
+"""Memory held by queued log records, she_logging's record factory vs CompactLogRecord.
+
+Records are put on a BoundedQueueHandler queue, as with LOG_ASYNC while the listener
+thread falls behind, and the memory traced by tracemalloc is divided by the number
+of records. Creating a record is timed on its own.
+
+    python -m benchmarks.bench_records
+"""
+import logging
+import tracemalloc
+from typing import Any, Dict
+
+from she_logging.async_logging import BoundedQueueHandler
+from she_logging.logging import ORIGINAL_LOG_RECORD_CLASS
+from she_logging.records import CompactLogRecord
+
+from .common import Results, per_call, report
+
+QUEUED = 20000
+NUMBER = 100000
+EXTRA = {"patient_uuid": "8f0e", "count": 3}
+
+
+def queued_bytes(factory: Any, extra: Dict[str, Any]) -> float:
+    handler = BoundedQueueHandler(maxsize=0, header_keys=())
+    logger = logging.getLogger("bench.records")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    previous = logging.getLogRecordFactory()
+    logging.setLogRecordFactory(factory)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(QUEUED):
+            logger.info("benchmark %s", "message", extra=extra)
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+        logging.setLogRecordFactory(previous)
+        logger.handlers = []
+    return used / QUEUED
+
+
+def run() -> Results:
+    results: Results = {}
+    factories = {
+        "RecordFactory": logging.getLogRecordFactory(),
+        "CompactLogRecord": CompactLogRecord,
+        "logging.LogRecord": ORIGINAL_LOG_RECORD_CLASS,
+    }
+    for name, factory in factories.items():
+        results[name] = {
+            **per_call(
+                lambda: factory(
+                    "bench", logging.INFO, __file__, 1, "message", (), None
+                ),
+                NUMBER,
+            ),
+            "queued_bytes": queued_bytes(factory, {}),
+            "queued_bytes_extra": queued_bytes(factory, EXTRA),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    report(f"Log records, {QUEUED} held in a queue", run())
@@ -0,0 +1,63 @@
+"""Cost of a request's log calls with DEBUG records written, not created, or kept in
+a request buffer (she_logging.request_buffer) and discarded.
+
+Each request logs DEBUG records DEBUG_RECORDS times and one INFO record, formatted as
+JSON and written to /dev/null. A failed request writes its buffered records too.
+
+    python -m benchmarks.bench_request_buffer
+"""
+import logging
+import os
+from typing import Callable
+
+from she_logging import request_buffer
+from she_logging.logging import CustomisedJSONFormatter
+
+from .common import Results, per_call, report
+
+NUMBER = 2000
+DEBUG_RECORDS = 10
+
+
+def make_request(logger: logging.Logger, failed: bool = False) -> Callable[[], None]:
+    def handle_request() -> None:
+        token = request_buffer.start_request_buffer()
+        for number in range(DEBUG_RECORDS):
+            logger.debug("step %d", number)
+        logger.info("request complete")
+        request_buffer.end_request_buffer(token, failed)
+
+    return handle_request
+
+
+def run() -> Results:
+    root = logging.getLogger()
+    previous_level = root.level
+    stream = open(os.devnull, "w")
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(CustomisedJSONFormatter())
+    logger = logging.getLogger("bench.request_buffer")
+    logger.handlers = [handler]
+    logger.propagate = False
+    results: Results = {}
+    try:
+        root.setLevel(logging.DEBUG)
+        results["DEBUG written"] = per_call(make_request(logger), NUMBER)
+        root.setLevel(logging.INFO)
+        results["INFO, DEBUG disabled"] = per_call(make_request(logger), NUMBER)
+        request_buffer.install_request_buffer(logging.INFO, loggers=[logger])
+        results["request buffer, discarded"] = per_call(make_request(logger), NUMBER)
+        results["request buffer, failed"] = per_call(
+            make_request(logger, failed=True), NUMBER
+        )
+    finally:
+        request_buffer._installed = False
+        root.setLevel(previous_level)
+        logger.handlers = []
+        logger.propagate = True
+        stream.close()
+    return results
+
+
+if __name__ == "__main__":
+    report(f"Log calls per request ({DEBUG_RECORDS} DEBUG, 1 INFO)", run())
@@ -0,0 +1,88 @@
+"""Throughput of a FastAPI app under uvicorn with each request ID middleware.
+
+Each middleware runs in its own uvicorn server process. Clients keep their
+connections open and send requests one after another, without an X-Request-ID
+header so that the middleware generates one. The ID generators are also timed on
+their own.
+
+    python -m benchmarks.bench_request_middleware
+"""
+import os
+import subprocess
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import FastAPI
+
+from she_logging.fastapi_request_id import RequestContextMiddleware, RequestIDMiddleware
+from she_logging.request_id import (
+    counter_request_id,
+    ulid_request_id,
+    uuid4_request_id,
+)
+
+from .common import Results, free_port, per_call, report, requests_per_sec
+
+CONNECTIONS = 16
+REQUESTS = 500
+NUMBER = 100000
+MIDDLEWARE: Dict[str, Optional[Tuple[Any, Dict[str, Any]]]] = {
+    "none": None,
+    "RequestContextMiddleware": (RequestContextMiddleware, {}),
+    "RequestIDMiddleware": (RequestIDMiddleware, {}),
+    "RequestIDMiddleware counter": (
+        RequestIDMiddleware,
+        {"id_generator": counter_request_id},
+    ),
+}
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    middleware = MIDDLEWARE[os.environ["BENCH_MIDDLEWARE"]]
+    if middleware is not None:
+        app.add_middleware(middleware[0], **middleware[1])
+
+    @app.get("/")
+    async def read_root() -> Dict[str, str]:
+        return {"Hello": "World"}
+
+    return app
+
+
+def throughput(middleware: str) -> Dict[str, float]:
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "benchmarks.bench_request_middleware:create_app",
+            "--factory",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            "--no-access-log",
+        ],
+        env={**os.environ, "BENCH_MIDDLEWARE": middleware},
+    )
+    try:
+        best = requests_per_sec(port, CONNECTIONS, REQUESTS)
+    finally:
+        server.terminate()
+        server.wait()
+    return {"requests_per_sec": best}
+
+
+def run() -> Results:
+    results: Results = {}
+    for middleware in MIDDLEWARE:
+        results[middleware] = throughput(middleware)
+    for generator in (uuid4_request_id, counter_request_id, ulid_request_id):
+        results[generator.__name__] = per_call(generator, NUMBER)
+    return results
+
+
+if __name__ == "__main__":
+    report("Request ID middleware (FastAPI under uvicorn)", run())
@@ -0,0 +1,89 @@
+"""Cost of request timing (she_logging.request_timing): record creation and the
+throughput of a FastAPI app under uvicorn with RequestIDMiddleware, with timing off
+and on.
+
+Each setting runs in its own uvicorn server process, the app logs one record per
+request, written as JSON to /dev/null.
+
+    python -m benchmarks.bench_request_timing
+"""
+import logging
+import os
+import subprocess
+from typing import Any, Dict
+
+from she_logging import request_timing
+
+from .bench_apps import CONNECTIONS, ROOT, uvicorn_command
+from .common import Results, free_port, per_call, report, requests_per_sec
+
+REQUESTS = 500
+NUMBER = 100000
+SETTINGS = {"timing off": "False", "timing on": "True"}
+
+
+def create_app() -> Any:
+    from fastapi import FastAPI
+
+    from she_logging.fastapi_request_id import RequestIDMiddleware
+    from she_logging.logging import init_logging
+
+    init_logging()
+    logger = logging.getLogger("bench.request_timing")
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware)
+
+    @app.get("/")
+    async def read_root() -> Dict[str, str]:
+        logger.info("handling")
+        return {"Hello": "World"}
+
+    return app
+
+
+def throughput(timing: str) -> Dict[str, float]:
+    port = free_port()
+    command = uvicorn_command("benchmarks.bench_request_timing:create_app", port)
+    command.append("--factory")
+    env = {**os.environ, "LOG_FORMAT": "JSON", "LOG_REQUEST_TIMING": timing}
+    with open(os.devnull, "w") as devnull:
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=devnull)
+        try:
+            best = requests_per_sec(port, CONNECTIONS, REQUESTS)
+        finally:
+            server.terminate()
+            server.wait()
+    return {"requests_per_sec": best}
+
+
+def record_creation() -> Results:
+    results: Results = {}
+    factory = logging.getLogRecordFactory()
+
+    def create() -> logging.LogRecord:
+        return logging.getLogRecordFactory()(
+            "bench", logging.INFO, __file__, 1, "message", (), None
+        )
+
+    try:
+        results["record timing off"] = per_call(create, NUMBER)
+        request_timing.install_request_timing()
+        results["record timing on, outside a request"] = per_call(create, NUMBER)
+        token = request_timing.start_request_timer()
+        results["record timing on, in a request"] = per_call(create, NUMBER)
+        request_timing.end_request_timer(token, "GET", "/")
+    finally:
+        logging.setLogRecordFactory(factory)
+        request_timing._installed = False
+    return results
+
+
+def run() -> Results:
+    results = record_creation()
+    for name, timing in SETTINGS.items():
+        results[f"RequestIDMiddleware {name}"] = throughput(timing)
+    return results
+
+
+if __name__ == "__main__":
+    report("Request timing", run())
@@ -0,0 +1,44 @@
+"""Cost of rendering record timestamps, cached vs uncached.
+
+python -m benchmarks.bench_timestamps
+"""
+import datetime
+import logging
+
+from she_logging.logging import SIMPLE_FORMAT
+from she_logging.timestamps import CachedTimeFormatter, TimestampCache
+
+from .common import Results, per_call, report
+
+NUMBER = 50000
+
+
+def run() -> Results:
+    record = logging.getLogRecordFactory()(
+        "bench", logging.INFO, __file__, 42, "benchmark message", (), None
+    )
+    created = record.created
+
+    results: Results = {}
+    results["json utcnow().isoformat()"] = per_call(
+        lambda: datetime.datetime.utcnow().isoformat(), NUMBER
+    )
+    for timestamp_format in ("iso", "epoch_millis", "rfc3339_nanos"):
+        cache = TimestampCache(timestamp_format)
+        results[f"json cached {timestamp_format}"] = per_call(
+            lambda: cache.format(created), NUMBER
+        )
+
+    formatter = logging.Formatter(SIMPLE_FORMAT)
+    cached_formatter = CachedTimeFormatter(SIMPLE_FORMAT)
+    results["asctime Formatter"] = per_call(
+        lambda: formatter.formatTime(record), NUMBER
+    )
+    results["asctime CachedTimeFormatter"] = per_call(
+        lambda: cached_formatter.formatTime(record), NUMBER
+    )
+    return results
+
+
+if __name__ == "__main__":
+    report("Timestamp rendering per record", run())
@@ -0,0 +1,74 @@
+"""Cost of formatting a deep traceback with large local variables.
+
+The exception is raised 200 calls deep, each frame holding a 100KB string and a
+10,000 item dict. Compared with the standard library, with and without local
+variables, and TracebackRenderer rendering the exception for the first time and
+as a repeat.
+
+    python -m benchmarks.bench_tracebacks
+"""
+import logging
+import sys
+import traceback
+from typing import Any, Dict
+
+from she_logging.tracebacks import TracebackRenderer
+
+from .common import Results, per_call, report
+
+DEPTH = 200
+NUMBER = 20
+
+
+def recurse(depth: int, text: str, data: Dict[int, str]) -> None:
+    if depth == 0:
+        raise ValueError("benchmark failure")
+    recurse(depth - 1, text, data)
+
+
+def raised() -> Any:
+    try:
+        recurse(DEPTH, "x" * 100000, {i: str(i) for i in range(10000)})
+    except ValueError:
+        return sys.exc_info()
+    raise AssertionError("not raised")
+
+
+def run() -> Results:
+    exc_info = raised()
+    formatter = logging.Formatter()
+
+    def with_locals() -> Any:
+        return "".join(
+            traceback.TracebackException(*exc_info, capture_locals=True).format()
+        )
+
+    first = TracebackRenderer(repeat_interval=0)
+    first_locals = TracebackRenderer(show_locals=True, repeat_interval=0)
+    repeated = TracebackRenderer()
+    repeated.render(exc_info)
+
+    results: Results = {
+        "logging.Formatter": per_call(
+            lambda: formatter.formatException(exc_info), NUMBER
+        ),
+        "traceback with locals": per_call(with_locals, NUMBER),
+        "TracebackRenderer": per_call(lambda: first.render(exc_info), NUMBER),
+        "TracebackRenderer with locals": per_call(
+            lambda: first_locals.render(exc_info), NUMBER
+        ),
+        "TracebackRenderer repeated": per_call(
+            lambda: repeated.render(exc_info), NUMBER
+        ),
+    }
+    for name, text in (
+        ("logging.Formatter", formatter.formatException(exc_info)),
+        ("traceback with locals", with_locals()),
+        ("TracebackRenderer with locals", first_locals.render(exc_info)[0]),
+    ):
+        results[name]["kbytes"] = len(text.encode()) / 1024
+    return results
+
+
+if __name__ == "__main__":
+    report(f"Formatting a traceback {DEPTH} frames deep", run())
@@ -0,0 +1,110 @@
+"""Sending log records to another process, pickled by SocketHandler vs the she_logging
+wire format.
+
+Encoding (makePickle) and decoding (back to a LogRecord) are timed on their own for
+a record with two `extra=` fields. Throughput is measured end to end: the records
+are sent over TCP to a receiver process, which decodes each one into a LogRecord.
+
+    python -m benchmarks.bench_wire
+"""
+import logging
+import pickle  # nosec - benchmark data only
+import socket
+import subprocess
+import sys
+import time
+from logging.handlers import SocketHandler
+from typing import Callable, Dict
+
+from she_logging import wire
+
+from .common import Results, per_call, report
+
+NUMBER = 20000
+SENT = 100000
+EXTRA = {"patient_uuid": "8f0e", "count": 3}
+
+
+def make_record() -> logging.LogRecord:
+    logger = logging.getLogger("bench.wire")
+    return logger.makeRecord(
+        logger.name, logging.INFO, __file__, 1, "benchmark %s", ("message",), None
+    )
+
+
+def unpickle(data: bytes) -> logging.LogRecord:
+    return logging.makeLogRecord(pickle.loads(data))  # nosec
+
+
+DECODERS: Dict[str, Callable[[bytes], logging.LogRecord]] = {
+    "pickle": unpickle,
+    "wire": wire.decode_record,
+}
+
+
+def receive(decoder: str) -> None:
+    decode = DECODERS[decoder]
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        print(server.getsockname()[1], flush=True)
+        connection, _ = server.accept()
+    buffer = bytearray()
+    received = 0
+    while received < SENT:
+        chunk = connection.recv(262144)
+        if not chunk:
+            break
+        buffer += chunk
+        for data in wire.split_frames(buffer):
+            decode(data)
+            received += 1
+    assert received == SENT, received
+
+
+def throughput(decoder: str, handler_class: type) -> Dict[str, float]:
+    receiver = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_wire", decoder],
+        stdout=subprocess.PIPE,
+    )
+    assert receiver.stdout is not None
+    port = int(receiver.stdout.readline())
+    handler = handler_class("127.0.0.1", port)
+    record = make_record()
+    record.__dict__.update(EXTRA)
+    start = time.perf_counter()
+    for _ in range(SENT):
+        handler.handle(record)
+    handler.close()
+    receiver.wait()
+    return {"records_per_sec": SENT / (time.perf_counter() - start)}
+
+
+def run() -> Results:
+    record = make_record()
+    record.__dict__.update(EXTRA)
+    socket_handler = SocketHandler("localhost", None)
+    wire_handler = wire.WireSocketHandler("localhost", None)
+    pickled = socket_handler.makePickle(record)[4:]
+    encoded = wire_handler.makePickle(record)[4:]
+
+    results = {
+        "SocketHandler.makePickle": per_call(
+            lambda: socket_handler.makePickle(record), NUMBER
+        ),
+        "wire encode": per_call(lambda: wire_handler.makePickle(record), NUMBER),
+        "unpickle": per_call(lambda: unpickle(pickled), NUMBER),
+        "wire decode": per_call(lambda: wire.decode_record(encoded), NUMBER),
+        "SocketHandler to receiver": throughput("pickle", SocketHandler),
+        "WireSocketHandler to receiver": throughput("wire", wire.WireSocketHandler),
+    }
+    results["SocketHandler.makePickle"]["bytes"] = len(pickled)
+    results["wire encode"]["bytes"] = len(encoded)
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        receive(sys.argv[1])
+    else:
+        report(f"Sending records to another process ({SENT} for throughput)", run())
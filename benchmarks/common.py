@@ -0,0 +1,100 @@
+"""Small helpers shared by the benchmark scripts."""
+import asyncio
+import socket
+import statistics
+import time
+from typing import Callable, Dict, List
+
+Results = Dict[str, Dict[str, float]]
+
+
+def latencies(func: Callable[[], object], number: int) -> List[float]:
+    """Call func `number` times and return the duration of each call in microseconds."""
+    samples: List[float] = []
+    timer = time.perf_counter
+    for _ in range(number):
+        start = timer()
+        func()
+        samples.append((timer() - start) * 1e6)
+    return samples
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "mean_us": statistics.mean(ordered),
+        "p50_us": ordered[len(ordered) // 2],
+        "p99_us": ordered[int(len(ordered) * 0.99)],
+        "max_us": ordered[-1],
+    }
+
+
+def per_call(
+    func: Callable[[], object], number: int, repeat: int = 5
+) -> Dict[str, float]:
+    """Time per call in microseconds and calls per second, best of `repeat` rounds."""
+    timer = time.perf_counter
+    best = float("inf")
+    for _ in range(repeat):
+        start = timer()
+        for _ in range(number):
+            func()
+        best = min(best, timer() - start)
+    return {"per_call_us": best / number * 1e6, "calls_per_sec": number / best}
+
+
+def report(title: str, results: Results) -> None:
+    print(title)
+    for name, values in results.items():
+        columns = "  ".join(f"{key}={value:,.2f}" for key, value in values.items())
+        print(f"  {name:<40} {columns}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+async def _client(port: int, path: bytes, requests: int) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = b"GET " + path + b" HTTP/1.1\r\nHost: bench\r\n\r\n"
+    for _ in range(requests):
+        writer.write(request)
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = int(head.lower().split(b"content-length: ")[1].split(b"\r\n")[0])
+        await reader.readexactly(length)
+    writer.close()
+
+
+async def _load(port: int, path: bytes, connections: int, requests: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, path, requests) for _ in range(connections)))
+    return connections * requests / (time.perf_counter() - start)
+
+
+def requests_per_sec(
+    port: int, connections: int, requests: int, path: bytes = b"/", repeat: int = 3
+) -> float:
+    """Throughput of the HTTP server on port, best of `repeat` rounds after a warm up.
+
+    Each of `connections` clients keeps its connection open and sends `requests`
+    GET requests one after another.
+    """
+    wait_for_port(port)
+    asyncio.run(_load(port, path, connections, requests))
+    return max(
+        asyncio.run(_load(port, path, connections, requests)) for _ in range(repeat)
+    )
@@ -0,0 +1,127 @@
+"""Run the benchmarks and save the results as JSON, optionally comparing them with an
+earlier run.
+
+    python -m benchmarks.suite                          # all benchmarks
+    python -m benchmarks.suite handlers json_formatter  # only these
+    python -m benchmarks.suite --output new.json --compare old.json
+
+Results are written to benchmarks/results/<date>-<time>.json by default. With
+--compare, each result is printed with its change from the earlier run, and the
+command exits with status 1 when any rate or time is more than --threshold percent
+worse.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .common import report
+
+BENCHMARKS = [
+    "handlers",
+    "json_formatter",
+    "plaintext",
+    "record_creation",
+    "records",
+    "disabled_levels",
+    "timestamps",
+    "tracebacks",
+    "buffered_output",
+    "async_logging",
+    "metrics",
+    "config_startup",
+    "request_middleware",
+    "apps",
+    "wire",
+    "files",
+    "levels",
+    "request_buffer",
+    "coalescing",
+    "access_log",
+    "request_timing",
+]
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Larger is better for these metrics, smaller for the others
+HIGHER_IS_BETTER = ("_per_sec",)
+
+
+def run(names: List[str]) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name in names:
+        module = importlib.import_module(f"benchmarks.bench_{name}")
+        results[name] = module.run()  # type: ignore[attr-defined]
+        report(name, results[name])
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def change(metric: str, old: float, new: float) -> float:
+    """Percentage change, positive when new is worse."""
+    if old == 0:
+        return 0.0
+    percent = (new - old) / old * 100
+    return -percent if metric.endswith(HIGHER_IS_BETTER) else percent
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float) -> bool:
+    """Print the changes from old to new, returns whether any is over threshold."""
+    print(f"Compared with {old['created']} (Python {old['python']})")
+    regressed = False
+    for name, results in new["results"].items():
+        old_results = old["results"].get(name, {})
+        for case, values in results.items():
+            for metric, value in values.items():
+                old_value = old_results.get(case, {}).get(metric)
+                if old_value is None:
+                    continue
+                percent = change(metric, old_value, value)
+                flag = ""
+                if percent > threshold:
+                    flag = "  WORSE"
+                    regressed = True
+                print(
+                    f"  {name + ': ' + case:<56} {metric:<24} "
+                    f"{old_value:>14,.2f} -> {value:>14,.2f} {percent:+7.1f}%{flag}"
+                )
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("benchmarks", nargs="*", help=", ".join(BENCHMARKS))
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = run(args.benchmarks or BENCHMARKS)
+    output = args.output
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / (
+            datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+        )
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"Results written to {output}")
+
+    if args.compare is not None:
+        old = json.loads(args.compare.read_text())
+        if compare(old, results, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
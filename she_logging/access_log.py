@@ -0,0 +1,108 @@
+"""Structured access log records
+
+One INFO record per request, logged to the "access" logger (level
+LOG_LEVEL_ACCESS), with an `httpRequest` field holding the request's details:
+
+    {"requestMethod": "GET", "requestUrl": "/items/1?q=x", "status": 200,
+     "responseSize": 27, "latency": "0.001532s", "remoteIp": "127.0.0.1",
+     "protocol": "HTTP/1.1", "userAgent": "curl/7.68.0", "requestID": "..."}
+
+The record is built straight from the server's request data: its message is
+"<method> <url> <status>" with no arguments to merge, and the caller lookup
+(findCaller) done for every logger.info() call is skipped. Compare with the access
+logs of uvicorn and gunicorn, which format a line from a format string for each
+request and then write it as the message of a JSON record.
+
+- ASGI apps: add she_logging.fastapi_access_log.AccessLogMiddleware, and run
+  uvicorn with --no-access-log.
+- Gunicorn: with LOG_ACCESS=True the she_logging gunicorn logger class writes these
+  records instead of its access log lines, see gunicorn_access().
+"""
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+ACCESS_LOGGER = "access"
+REQUEST_ID_HEADER = "x-request-id"
+
+
+def http_request(
+    method: str,
+    url: str,
+    status: int,
+    size: int,
+    latency: float,
+    remote_ip: Optional[str] = None,
+    protocol: Optional[str] = None,
+    user_agent: Optional[str] = None,
+    request_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """The `httpRequest` field of an access record, `latency` in seconds."""
+    details: Dict[str, Any] = {
+        "requestMethod": method,
+        "requestUrl": url,
+        "status": status,
+        "responseSize": size,
+        "latency": f"{latency:.6f}s",
+    }
+    if remote_ip:
+        details["remoteIp"] = remote_ip
+    if protocol:
+        details["protocol"] = protocol
+    if user_agent:
+        details["userAgent"] = user_agent
+    if request_id:
+        details["requestID"] = request_id
+    return details
+
+
+def log_access(logger: logging.Logger, details: Dict[str, Any]) -> None:
+    """Log an access record for the `httpRequest` details, if `logger` is enabled
+    for INFO.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    message = f"{details['requestMethod']} {details['requestUrl']} {details['status']}"
+    record = logger.makeRecord(
+        logger.name, logging.INFO, __file__, 0, message, (), None
+    )
+    record.httpRequest = details
+    request_id = details.get("requestID")
+    if request_id is not None:
+        record.requestID = request_id
+    logger.handle(record)
+
+
+def gunicorn_access(
+    resp: Any,
+    req: Any,
+    environ: Dict[str, Any],
+    request_time: timedelta,
+    logger: Optional[logging.Logger] = None,
+) -> None:
+    """Log an access record from the arguments of gunicorn's Logger.access."""
+    if logger is None:
+        logger = logging.getLogger(ACCESS_LOGGER)
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    request_id = None
+    for name, value in resp.headers:
+        if name.lower() == REQUEST_ID_HEADER:
+            request_id = value
+            break
+    url = f"{req.path}?{req.query}" if req.query else req.path
+    major, minor = req.version
+    log_access(
+        logger,
+        http_request(
+            req.method,
+            url,
+            resp.status_code or 0,
+            resp.sent,
+            request_time.total_seconds(),
+            environ.get("REMOTE_ADDR"),
+            f"HTTP/{major}.{minor}",
+            environ.get("HTTP_USER_AGENT"),
+            request_id or environ.get("HTTP_X_REQUEST_ID"),
+        ),
+    )
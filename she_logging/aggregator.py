@@ -0,0 +1,264 @@
+"""Single writer process for gunicorn workers
+
+When enabled (environment variable LOG_AGGREGATE) the gunicorn master forks a writer
+process once logging is configured. The writer keeps the configured handlers and
+listens on a unix socket in a private temporary directory. The master, and every
+worker forked from it, then sends each record over the socket instead of writing
+it, so only one process writes to stdout: long lines are never interleaved and
+formatting happens outside the workers.
+
+Records are sent in the she_logging.wire format (the message is merged with its
+arguments and the exception formatted, see she_logging.tracebacks, before sending),
+not pickled. Handler filters, such as the rate limit, run in the sending process.
+The writer batches everything it receives in one pass into a single write.
+
+The writer runs until stop_aggregator() is called, or until every process which
+could send to it has exited: the master, and every process forked from it, holds
+the write end of a pipe which the writer watches. So it keeps running when the
+master is re-parented, e.g. by `gunicorn --daemon`. Records are dropped while the
+writer is unreachable.
+"""
+import atexit
+import logging
+import os
+import selectors
+import shutil
+import signal
+import socket
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import logging as she_logging
+from .async_logging import _configured_loggers
+from .handlers import BufferedStreamHandler, flush_buffered_handlers
+from .wire import WireSocketHandler, frame, handle_encoded, split_frames
+
+POLL_INTERVAL = 0.5
+STOP_TIMEOUT = 5.0
+
+_writer_pid: Optional[int] = None
+_directory: Optional[str] = None
+_keepalive: Optional[int] = None
+_handler: Optional["AggregatingHandler"] = None
+
+
+class AggregatingHandler(WireSocketHandler):
+    """Sends records to the writer process over a unix socket.
+
+    One instance is added where each chain of configured loggers ends (the root
+    logger, or a logger which does not propagate), replacing their handlers, so each
+    record is sent once. The writer passes it to the same loggers and handlers.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        header_keys: Sequence[str] = she_logging.REQUEST_HEADER_KEYS,
+    ) -> None:
+        super().__init__(path, None)
+        self.header_keys = tuple(header_keys)
+
+    def makePickle(self, record: logging.LogRecord) -> bytes:
+        # The writer has no Flask request context
+        headers: Dict[str, str] = {}
+        request = she_logging.flask_request() if self.header_keys else None
+        if request:
+            for key in self.header_keys:
+                value = request.headers.get(key)
+                if value is not None:
+                    headers[key] = value
+        return frame(record, tracebacks=self.tracebacks, request_headers=headers)
+
+    def reset_after_fork(self) -> None:
+        # A connection inherited from the parent would interleave with its records
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.retryTime = None
+
+
+def start_aggregator() -> Optional[str]:
+    """Fork the writer process and send this process's records to it.
+
+    Call once logging is configured, in the process that forks the workers. Returns
+    the socket path, or None if the writer is already running.
+    """
+    global _writer_pid, _directory, _handler, _keepalive
+    if _writer_pid is not None:
+        return None
+
+    directory = _directory = tempfile.mkdtemp(prefix="she-logging-")
+    path = os.path.join(directory, "writer.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(128)
+
+    watch, keepalive = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            os.close(keepalive)
+            _run_writer(server, watch)
+        except BaseException:
+            status = 1
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+            os._exit(status)
+
+    server.close()
+    os.close(watch)
+    _writer_pid = pid
+    _keepalive = keepalive
+    _handler = _replace_handlers(path)
+    return path
+
+
+def stop_aggregator() -> None:
+    """Stop sending records and wait for the writer to write everything it received."""
+    global _writer_pid, _directory, _handler, _keepalive
+    if _handler is not None:
+        _handler.close()
+        _handler = None
+    if _keepalive is not None:
+        os.close(_keepalive)
+        _keepalive = None
+
+    if _writer_pid is not None:
+        try:
+            os.kill(_writer_pid, signal.SIGTERM)
+            deadline = time.monotonic() + STOP_TIMEOUT
+            while time.monotonic() < deadline:
+                if os.waitpid(_writer_pid, os.WNOHANG)[0]:
+                    break
+                time.sleep(0.01)
+        except (ChildProcessError, ProcessLookupError):
+            # Already reaped, e.g. by the gunicorn arbiter
+            pass
+        _writer_pid = None
+
+    if _directory is not None:
+        shutil.rmtree(_directory, ignore_errors=True)
+        _directory = None
+
+
+def _chain_end(logger: logging.Logger) -> logging.Logger:
+    # The last logger whose handlers see the records of `logger`
+    while logger.propagate and logger.parent is not None:
+        logger = logger.parent
+    return logger
+
+
+def _replace_handlers(path: str) -> AggregatingHandler:
+    loggers = [logger for logger in _configured_loggers() if logger.handlers]
+    replaced = {id(h): h for logger in loggers for h in logger.handlers}.values()
+    ends = {id(_chain_end(logger)): _chain_end(logger) for logger in loggers}
+    header_keys: List[str] = []
+    for handler in replaced:
+        for key in she_logging.request_header_keys(handler.formatter):
+            if key not in header_keys:
+                header_keys.append(key)
+
+    aggregating = AggregatingHandler(path, header_keys)
+    for handler in replaced:
+        for log_filter in handler.filters:
+            if log_filter not in aggregating.filters:
+                aggregating.addFilter(log_filter)
+    for logger in loggers:
+        logger.handlers = []
+    for logger in ends.values():
+        logger.handlers = [aggregating]
+    return aggregating
+
+
+def _writer_handlers() -> List[logging.Handler]:
+    # Filters ran in the sending process. Stream handlers write each batch at once.
+    replacements: Dict[int, logging.Handler] = {}
+    for logger in _configured_loggers():
+        for index, handler in enumerate(logger.handlers):
+            if id(handler) not in replacements:
+                handler.filters = []
+                replacement = handler
+                if type(handler) is logging.StreamHandler:
+                    replacement = BufferedStreamHandler(
+                        handler.stream, flush_on_sigterm=False
+                    )
+                    replacement.setLevel(handler.level)
+                    replacement.setFormatter(handler.formatter)
+                replacements[id(handler)] = replacement
+            logger.handlers[index] = replacements[id(handler)]
+    return list(replacements.values())
+
+
+def _dispatch(buffer: bytearray) -> None:
+    for data in split_frames(buffer):
+        try:
+            handle_encoded(data)
+        except Exception:
+            pass
+
+
+def _run_writer(server: socket.socket, watch: int) -> None:
+    # Interrupts go to the whole process group, keep writing until the senders exit.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stopping: List[int] = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    handlers = _writer_handlers()
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    selector.register(watch, selectors.EVENT_READ)
+    buffers: Dict[socket.socket, bytearray] = {}
+
+    while True:
+        finishing = bool(stopping)
+        events = selector.select(0 if finishing else POLL_INTERVAL)
+        for key, _ in events:
+            if key.fileobj == watch:
+                # Every process holding the pipe's write end has exited
+                selector.unregister(watch)
+                stopping.append(0)
+                continue
+            if key.fileobj is server:
+                connection, _ = server.accept()
+                selector.register(connection, selectors.EVENT_READ)
+                buffers[connection] = bytearray()
+                continue
+
+            connection = key.fileobj  # type: ignore[assignment]
+            try:
+                chunk = connection.recv(262144)
+            except OSError:
+                chunk = b""
+            if chunk:
+                buffer = buffers[connection]
+                buffer += chunk
+                _dispatch(buffer)
+            else:
+                selector.unregister(connection)
+                connection.close()
+                del buffers[connection]
+
+        flush_buffered_handlers()
+        if finishing and not events:
+            break
+
+    for handler in handlers:
+        handler.flush()
+
+
+def _after_fork_in_child() -> None:
+    # Workers send to the writer but only the process which started it stops it.
+    # The inherited write end of the pipe stays open until this process exits.
+    global _writer_pid, _directory, _keepalive
+    _writer_pid = None
+    _directory = None
+    _keepalive = None
+    if _handler is not None:
+        _handler.reset_after_fork()
+
+
+atexit.register(stop_aggregator)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
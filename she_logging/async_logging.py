@@ -0,0 +1,228 @@
+"""Non-blocking output for she_logging handlers
+
+When enabled (environment variable LOG_ASYNC) `init_logging()` replaces every
+configured handler with a bounded queue. Logging calls then only build the record
+and put it on the queue, formatting and writing happen on a listener thread.
+
+The overflow policy decides what happens when the queue is full:
+
+- block: wait for space (no records are lost, but callers can still stall)
+- drop_oldest: discard the oldest queued record to make room
+- drop_new: discard the new record
+
+Handler filters are moved to the queue handlers so records are filtered before they
+are queued. Dropped records are counted and reported when async logging is stopped.
+Queues are drained at exit and before a fork, and the listener threads are
+restarted in both parent and child after a fork.
+"""
+import atexit
+import copy
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import logging as she_logging
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEW = "drop_new"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEW)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler with a bounded queue and a configurable overflow policy."""
+
+    queue: queue.Queue
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        overflow: str = OVERFLOW_BLOCK,
+        header_keys: Sequence[str] = she_logging.REQUEST_HEADER_KEYS,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}"
+            )
+        super().__init__(queue.Queue(maxsize))
+        self.overflow = overflow
+        self.header_keys = tuple(header_keys)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def _count_drop(self) -> None:
+        with self._dropped_lock:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the args now as they may be mutated once the call returns, but leave
+        # formatting (and exc_info) to the handler running on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+
+        # The Flask request context is not visible from the listener thread, copy the
+        # headers the target handler's formatter writes.
+        request = she_logging.flask_request() if self.header_keys else None
+        if request:
+            headers = request.headers
+            for key in self.header_keys:
+                value = headers.get(key)
+                if value is not None:
+                    record.__dict__[key] = value
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == OVERFLOW_BLOCK:
+            self.queue.put(record)
+            return
+
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                if self.overflow == OVERFLOW_DROP_NEW:
+                    self._count_drop()
+                    return
+
+            try:
+                oldest = self.queue.get_nowait()
+            except queue.Empty:
+                continue
+            if oldest is _SheQueueListener._sentinel:
+                # Never discard the stop request, lose the new record instead.
+                self.queue.put_nowait(oldest)
+                self._count_drop()
+                return
+            self._count_drop()
+
+
+class _SheQueueListener(QueueListener):
+    queue: queue.Queue
+    _sentinel = None
+
+    def enqueue_sentinel(self) -> None:
+        # The default put_nowait fails when the queue is full.
+        self.queue.put(self._sentinel)
+
+
+_Pair = Tuple[BoundedQueueHandler, _SheQueueListener]
+_pairs: List[_Pair] = []
+_replaced: List[Tuple[logging.Logger, List[logging.Handler]]] = []
+
+
+def _configured_loggers() -> List[logging.Logger]:
+    loggers: List[logging.Logger] = [logging.getLogger()]
+    for item in list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(item, logging.Logger):
+            loggers.append(item)
+    return loggers
+
+
+def start_async_logging(
+    maxsize: int = 10000,
+    overflow: str = OVERFLOW_BLOCK,
+    loggers: Optional[Iterable[logging.Logger]] = None,
+) -> bool:
+    """Replace the handlers of the given loggers (default all configured loggers)
+    with bounded queue handlers feeding a listener thread per original handler.
+
+    Returns False if async logging is already running.
+    """
+    if _pairs:
+        return False
+
+    replacements: Dict[logging.Handler, BoundedQueueHandler] = {}
+    for logger in _configured_loggers() if loggers is None else loggers:
+        if not logger.handlers:
+            continue
+        _replaced.append((logger, list(logger.handlers)))
+        new_handlers: List[logging.Handler] = []
+        for handler in logger.handlers:
+            if handler not in replacements:
+                queue_handler = BoundedQueueHandler(
+                    maxsize,
+                    overflow,
+                    she_logging.request_header_keys(handler.formatter),
+                )
+                listener = _SheQueueListener(
+                    queue_handler.queue, handler, respect_handler_level=True
+                )
+                # Filter before queueing: rate limits key on the message template
+                # which prepare() replaces, and suppressed records are never queued.
+                queue_handler.filters, handler.filters = handler.filters, []
+                replacements[handler] = queue_handler
+                _pairs.append((queue_handler, listener))
+            new_handlers.append(replacements[handler])
+        logger.handlers = new_handlers
+
+    for _, listener in _pairs:
+        listener.start()
+    return True
+
+
+def stop_async_logging() -> None:
+    """Drain the queues, stop the listener threads and restore the original handlers."""
+    for _, listener in _pairs:
+        if listener._thread is not None:  # type: ignore[attr-defined]
+            listener.stop()
+
+    for logger, handlers in _replaced:
+        logger.handlers = handlers
+
+    for queue_handler, listener in _pairs:
+        target = listener.handlers[0]
+        target.filters = queue_handler.filters
+        if queue_handler.dropped:
+            target.handle(
+                logging.makeLogRecord(
+                    {
+                        "name": "she-logging",
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                        "msg": "she_logging dropped %d log records (queue full)",
+                        "args": (queue_handler.dropped,),
+                        "requestID": None,
+                    }
+                )
+            )
+
+    _pairs.clear()
+    _replaced.clear()
+
+
+def dropped_records() -> int:
+    """Number of records dropped so far because a queue was full."""
+    return sum(queue_handler.dropped for queue_handler, _ in _pairs)
+
+
+def _before_fork() -> None:
+    for _, listener in _pairs:
+        if listener._thread is not None:  # type: ignore[attr-defined]
+            listener.stop()
+
+
+def _after_fork_in_parent() -> None:
+    for _, listener in _pairs:
+        listener.start()
+
+
+def _after_fork_in_child() -> None:
+    # The parent's queues may have been locked by another thread at fork time and
+    # any records still on them belong to the parent, so start over with new ones.
+    for queue_handler, listener in _pairs:
+        queue_handler.queue = listener.queue = queue.Queue(queue_handler.queue.maxsize)
+        listener.start()
+
+
+atexit.register(stop_async_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(
+        before=_before_fork,
+        after_in_parent=_after_fork_in_parent,
+        after_in_child=_after_fork_in_child,
+    )
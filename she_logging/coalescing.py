@@ -0,0 +1,249 @@
+"""Coalescing repeated identical records
+
+CoalescingHandler wraps another handler. Records are identified by logger, level,
+message template (the message before its arguments are merged) and the file and line
+they were logged from. The first record of a burst is written straight away, and
+repeats arriving less than `window` seconds after the previous one are counted
+instead of written. When the burst ends (no repeat for `window` seconds) a single
+summary record "N similar messages suppressed: <template>" is written, with the same
+`suppressed`, `firstSuppressed` and `lastSuppressed` fields as the rate limit's (see
+she_logging.filters). A burst which goes on for longer than `max_delay` seconds is
+summarised every `max_delay` seconds.
+
+At most `max_keys` records are tracked, the least recently seen are forgotten (after
+writing their summary). Summaries are written by a background thread once a burst is
+over, when the handler is flushed or closed, and at exit.
+
+When enabled (environment variable LOG_COALESCE_WINDOW) init_logging() wraps every
+configured handler with coalesce_handlers(). With LOG_ASYNC the queue handlers are
+wrapped, so repeats are counted by the caller before the record is queued.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional
+
+from .filters import SWEEP_INTERVAL, summary_record
+
+_coalescing: "weakref.WeakSet[CoalescingHandler]" = weakref.WeakSet()
+_sweeper_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+
+
+class _Burst:
+    __slots__ = ("seen", "started", "count", "first", "last", "template")
+
+    def __init__(self, now: float) -> None:
+        # time.monotonic() of the latest record and of the first one counted
+        self.seen = now
+        self.started = 0.0
+        self.count = 0
+        # Creation times of the first and last records counted
+        self.first = 0.0
+        self.last = 0.0
+        self.template: Optional[logging.LogRecord] = None
+
+
+class CoalescingHandler(logging.Handler):
+    """Writes the first of a burst of identical records to `target` and a summary of
+    the rest, see the module documentation.
+    """
+
+    def __init__(
+        self,
+        target: logging.Handler,
+        window: float = 1.0,
+        max_delay: float = 60.0,
+        max_keys: int = 10000,
+    ) -> None:
+        super().__init__()
+        self.target = target
+        self.window = window
+        self.max_delay = max_delay
+        self.max_keys = max_keys
+        # For request_header_keys, records are formatted by the target
+        self.formatter = target.formatter
+        # Loggers skip records below the target's level before they are counted
+        self.level = target.level
+        self._bursts: "OrderedDict[Hashable, _Burst]" = OrderedDict()
+        self._next_sweep = 0.0
+        # Number of bursts with records waiting for a summary
+        self._pending = 0
+        _coalescing.add(self)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The target takes its own lock, self.lock only guards the bursts
+        if record.levelno < self.target.level or not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if "suppressed" in record.__dict__:
+            self.target.handle(record)
+            return
+
+        now = time.monotonic()
+        msg = record.msg
+        key = (
+            record.name,
+            record.levelno,
+            msg if isinstance(msg, str) else None,
+            record.pathname,
+            record.lineno,
+        )
+        summaries: List[logging.LogRecord] = []
+        write = False
+
+        self.acquire()
+        try:
+            burst = self._bursts.get(key)
+            if burst is None:
+                burst = self._bursts[key] = _Burst(now)
+                if len(self._bursts) > self.max_keys:
+                    self._evict(summaries)
+                write = True
+            else:
+                self._bursts.move_to_end(key)
+                if now - burst.seen >= self.window:
+                    # The previous burst is over, this record starts a new one
+                    self._take_summary(burst, summaries)
+                    write = True
+                else:
+                    if not burst.count:
+                        burst.started = now
+                        burst.first = record.created
+                        burst.template = record
+                        self._pending += 1
+                        _start_sweeper()
+                    burst.count += 1
+                    burst.last = record.created
+                    if now - burst.started >= self.max_delay:
+                        self._take_summary(burst, summaries)
+                burst.seen = now
+
+            if now >= self._next_sweep:
+                self._next_sweep = now + SWEEP_INTERVAL
+                self._sweep(now, summaries)
+        finally:
+            self.release()
+
+        for summary in summaries:
+            self.target.handle(summary)
+        if write:
+            self.target.handle(record)
+
+    def sweep(self, force: bool = False) -> None:
+        """Write summaries of bursts which are over, or of every burst if `force`."""
+        if not self._pending:
+            return
+        summaries: List[logging.LogRecord] = []
+        self.acquire()
+        try:
+            if force:
+                for burst in self._bursts.values():
+                    self._take_summary(burst, summaries)
+            else:
+                self._sweep(time.monotonic(), summaries)
+        finally:
+            self.release()
+        for summary in summaries:
+            self.target.handle(summary)
+
+    def flush(self) -> None:
+        self.sweep(force=True)
+        self.target.flush()
+
+    def close(self) -> None:
+        try:
+            self.sweep(force=True)
+        finally:
+            _coalescing.discard(self)
+            super().close()
+
+    def _take_summary(self, burst: _Burst, summaries: List[logging.LogRecord]) -> None:
+        if burst.count and burst.template is not None:
+            summaries.append(
+                summary_record(burst.template, burst.count, burst.first, burst.last)
+            )
+            self._pending -= 1
+        burst.count = 0
+        burst.template = None
+
+    def _sweep(self, now: float, summaries: List[logging.LogRecord]) -> None:
+        # Summarise bursts which are over and forget them
+        for key, burst in list(self._bursts.items()):
+            if now - burst.seen >= self.window:
+                self._take_summary(burst, summaries)
+                del self._bursts[key]
+
+    def _evict(self, summaries: List[logging.LogRecord]) -> None:
+        while len(self._bursts) > self.max_keys:
+            _, burst = self._bursts.popitem(last=False)
+            self._take_summary(burst, summaries)
+
+
+def coalesce_handlers(
+    window: float,
+    max_delay: float = 60.0,
+    loggers: Optional[Iterable[logging.Logger]] = None,
+) -> None:
+    """Wrap the handlers of the given loggers (default all configured loggers) with
+    CoalescingHandlers. A handler shared by several loggers gets one wrapper.
+    """
+    from .async_logging import _configured_loggers
+
+    wrappers: Dict[logging.Handler, CoalescingHandler] = {}
+    for logger in _configured_loggers() if loggers is None else loggers:
+        new_handlers: List[logging.Handler] = []
+        for handler in logger.handlers:
+            if isinstance(handler, CoalescingHandler):
+                new_handlers.append(handler)
+                continue
+            if handler not in wrappers:
+                wrappers[handler] = CoalescingHandler(handler, window, max_delay)
+            new_handlers.append(wrappers[handler])
+        logger.handlers = new_handlers
+
+
+def flush_coalesced_summaries(force: bool = True) -> None:
+    """Write the summaries held by every CoalescingHandler."""
+    for handler in list(_coalescing):
+        try:
+            handler.sweep(force)
+        except Exception:
+            pass
+
+
+def _sweep_loop() -> None:
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        flush_coalesced_summaries(force=False)
+
+
+def _start_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None and _sweeper.is_alive():
+        return
+    with _sweeper_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = threading.Thread(
+                target=_sweep_loop, name="she-logging-coalesce", daemon=True
+            )
+            _sweeper.start()
+
+
+def _after_fork_in_child() -> None:
+    # The sweeper thread doesn't survive a fork, it is restarted when needed.
+    global _sweeper, _sweeper_lock
+    _sweeper_lock = threading.Lock()
+    _sweeper = None
+
+
+atexit.register(flush_coalesced_summaries)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
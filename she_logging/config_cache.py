@@ -0,0 +1,112 @@
+"""Cache of logging configuration files
+
+init_logging(path) parses the YAML (or JSON) file once. Once dictConfig has accepted
+the configuration it is kept in memory, and if environment variable
+LOG_CONFIG_CACHE_DIR is set written as JSON to a file in that directory, so other
+processes starting with the same file skip both importing yaml and parsing it.
+
+Cached configurations are keyed by the file's resolved path, modification time and
+size, and the she-logging environment variables (LOG_*). Changing any of them
+misses the cache. Configurations which can't be written as JSON are only kept in
+memory.
+"""
+import copy
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+CacheKey = List[object]
+
+_configs: Dict[str, Tuple[CacheKey, Dict]] = {}
+
+
+def cache_key(path: Union[str, Path]) -> Tuple[str, CacheKey]:
+    """The resolved path of a configuration file and the key its cache entry must match."""
+    resolved = str(Path(path).resolve())
+    stat = os.stat(resolved)
+    environment = sorted(
+        (name, value) for name, value in os.environ.items() if name.startswith("LOG_")
+    )
+    fingerprint = hashlib.sha256(json.dumps(environment).encode()).hexdigest()
+    return resolved, [resolved, stat.st_mtime_ns, stat.st_size, fingerprint]
+
+
+def load_config(path: Union[str, Path]) -> Tuple[Dict, Optional[CacheKey]]:
+    """The configuration in the file, and its cache key if it wasn't cached.
+
+    Pass the key to store_config once the configuration has been applied.
+    """
+    resolved, key = cache_key(path)
+    cached = _configs.get(resolved)
+    if cached is not None and cached[0] == key:
+        return copy.deepcopy(cached[1]), None
+
+    config = _read_sidecar(resolved, key)
+    if config is not None:
+        _configs[resolved] = (key, copy.deepcopy(config))
+        return config, None
+
+    import yaml
+
+    with open(resolved) as file:
+        return yaml.safe_load(file), key
+
+
+def store_config(key: CacheKey, config: Dict) -> None:
+    """Cache a configuration which dictConfig accepted."""
+    resolved = str(key[0])
+    _configs[resolved] = (key, copy.deepcopy(config))
+    _write_sidecar(resolved, key, config)
+
+
+def clear_cache() -> None:
+    """Forget configurations cached in memory."""
+    _configs.clear()
+
+
+def _sidecar_path(resolved: str) -> Optional[Path]:
+    directory = os.environ.get("LOG_CONFIG_CACHE_DIR")
+    if not directory:
+        return None
+    name = hashlib.sha256(resolved.encode()).hexdigest()[:32]
+    return Path(directory) / f"she-logging-{name}.json"
+
+
+def _read_sidecar(resolved: str, key: CacheKey) -> Optional[Dict]:
+    sidecar = _sidecar_path(resolved)
+    if sidecar is None:
+        return None
+    try:
+        with sidecar.open() as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("key") != key:
+        return None
+    return cached.get("config")
+
+
+def _write_sidecar(resolved: str, key: CacheKey, config: Dict) -> None:
+    sidecar = _sidecar_path(resolved)
+    if sidecar is None:
+        return
+    try:
+        text = json.dumps({"key": key, "config": config})
+        if json.loads(text)["config"] != config:
+            # e.g. tuples or non-string keys, which JSON can't reproduce
+            return
+        sidecar.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=str(sidecar.parent))
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                file.write(text)
+            os.replace(temporary, str(sidecar))
+        except OSError:
+            os.unlink(temporary)
+            raise
+    except (OSError, TypeError, ValueError):
+        # The cache is only an optimisation, e.g. the directory may be read only
+        pass
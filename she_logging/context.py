@@ -0,0 +1,104 @@
+"""Fields bound to the current context and written with every log record
+
+    token = bind(tenant="abc", user="123")
+    logger.info("Updated")  # JSON record includes "tenant" and "user"
+    reset_context(token)
+
+    with bound(episode="456"):
+        logger.info("Nested")  # also includes "episode"
+
+Bound fields are kept in a ContextVar so they follow asyncio tasks and FastAPI
+requests. Each bind adds a Context pointing at the one it extends, so binding is
+O(1) however many fields are already bound, and the merged fields are computed once
+for each Context, not for each record. Records keep a reference to the context they
+were created in (attribute logContext), CustomisedJSONFormatter writes its fields
+before any passed with `extra=`, which take precedence.
+
+Threads are reused between requests by some servers, reset the context at the end
+of each request, or use bound(). she_logging.flask_request_id does this for Flask.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+_REMOVED = object()
+
+
+class Context:
+    """Immutable fields: the fields of a parent Context with some added or removed."""
+
+    __slots__ = ("parent", "changes", "_fields")
+
+    def __init__(self, parent: Optional["Context"], changes: Dict[str, Any]) -> None:
+        self.parent = parent
+        self.changes = changes
+        self._fields: Optional[Mapping[str, Any]] = None
+
+    @property
+    def fields(self) -> Mapping[str, Any]:
+        """All the bound fields, merged on first use."""
+        if self._fields is None:
+            merged = dict(self.parent.fields) if self.parent is not None else {}
+            for key, value in self.changes.items():
+                if value is _REMOVED:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = value
+            self._fields = MappingProxyType(merged)
+        return self._fields
+
+    def __bool__(self) -> bool:
+        return bool(self.fields)
+
+    def __str__(self) -> str:
+        return " ".join(f"{key}={value}" for key, value in self.fields.items())
+
+    def __repr__(self) -> str:
+        return f"Context({dict(self.fields)!r})"
+
+    def __reduce__(self) -> Tuple[Any, Tuple[None, Dict[str, Any]]]:
+        # Records are pickled by SocketHandler and multiprocessing queues
+        return Context, (None, dict(self.fields))
+
+
+EMPTY_CONTEXT = Context(None, {})
+
+_context_var: "ContextVar[Context]" = ContextVar("logContext", default=EMPTY_CONTEXT)
+
+
+def current_context() -> Context:
+    """The fields bound in the current context."""
+    return _context_var.get()
+
+
+def bind(**fields: Any) -> Token:
+    """Add fields to the current context, returns a token for reset_context."""
+    return _context_var.set(Context(_context_var.get(), fields))
+
+
+def unbind(*keys: str) -> Token:
+    """Remove fields from the current context, returns a token for reset_context."""
+    return _context_var.set(
+        Context(_context_var.get(), {key: _REMOVED for key in keys})
+    )
+
+
+def clear_context() -> Token:
+    """Remove all fields from the current context, returns a token for reset_context."""
+    return _context_var.set(EMPTY_CONTEXT)
+
+
+def reset_context(token: Token) -> None:
+    """Restore the fields bound before the bind, unbind or clear_context returning token."""
+    _context_var.reset(token)
+
+
+@contextmanager
+def bound(**fields: Any) -> Iterator[Context]:
+    """Bind fields for the duration of a with block."""
+    token = bind(**fields)
+    try:
+        yield _context_var.get()
+    finally:
+        reset_context(token)
@@ -0,0 +1,80 @@
+"""ASGI middleware writing a structured access record for each request, see
+she_logging.access_log
+
+    app.add_middleware(AccessLogMiddleware)
+
+Run uvicorn with --no-access-log (or uvicorn.run(..., access_log=False)) so requests
+aren't logged twice. The record's request ID is the X-Request-ID response header set
+by RequestIDMiddleware or RequestContextMiddleware, wherever they are in the
+middleware stack, otherwise the X-Request-ID request header.
+"""
+import logging
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from she_logging.access_log import ACCESS_LOGGER, http_request, log_access
+from she_logging.request_id import current_request_id
+
+_REQUEST_ID_HEADER = b"x-request-id"
+_USER_AGENT_HEADER = b"user-agent"
+
+
+class AccessLogMiddleware:
+    """Logs each HTTP request to the `logger_name` logger once it has been answered."""
+
+    def __init__(self, app: ASGIApp, logger_name: str = ACCESS_LOGGER) -> None:
+        self.app = app
+        self.logger = logging.getLogger(logger_name)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.logger.isEnabledFor(logging.INFO):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        response_request_id = None
+
+        async def send_and_measure(message: Message) -> None:
+            nonlocal status, size, response_request_id
+            message_type = message["type"]
+            if message_type == "http.response.body":
+                size += len(message.get("body", b""))
+            elif message_type == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name.lower() == _REQUEST_ID_HEADER:
+                        response_request_id = value.decode("latin-1")
+                        break
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            latency = time.perf_counter() - start
+            request_id = response_request_id or current_request_id()
+            user_agent = None
+            for name, value in scope["headers"]:
+                if name == _USER_AGENT_HEADER:
+                    user_agent = value.decode("latin-1")
+                elif name == _REQUEST_ID_HEADER and request_id is None:
+                    request_id = value.decode("latin-1")
+            query = scope.get("query_string")
+            path = scope["path"]
+            client = scope.get("client")
+            log_access(
+                self.logger,
+                http_request(
+                    scope["method"],
+                    f"{path}?{query.decode('latin-1')}" if query else path,
+                    status,
+                    size,
+                    latency,
+                    client[0] if client else None,
+                    f"HTTP/{scope.get('http_version', '1.1')}",
+                    user_agent,
+                    request_id,
+                ),
+            )
@@ -0,0 +1,48 @@
+"""Starlette/FastAPI admin endpoints for changing log levels at runtime, see
+she_logging.levels
+
+    app.mount("/admin/log-levels", log_levels_app())
+
+- GET /admin/log-levels: the current levels and pending reverts
+- PUT /admin/log-levels: {"levels": {"<logger>": "DEBUG"}, "revert_after": 300}
+- DELETE /admin/log-levels: revert every pending change now
+
+The endpoints have no authentication of their own, mount them only where they are
+protected, e.g. on an internal port or behind the app's own admin middleware.
+"""
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route, Router
+
+from she_logging import levels
+
+
+async def _get_levels(request: Request) -> JSONResponse:
+    return JSONResponse(levels.get_levels())
+
+
+async def _set_levels(request: Request) -> JSONResponse:
+    try:
+        settings = await request.json()
+    except ValueError:
+        settings = None
+    try:
+        levels.apply_levels(settings)
+    except ValueError as error:
+        return JSONResponse({"error": str(error)}, status_code=400)
+    return JSONResponse(levels.get_levels())
+
+
+async def _reset_levels(request: Request) -> JSONResponse:
+    levels.reset_levels()
+    return JSONResponse(levels.get_levels())
+
+
+def log_levels_app() -> Router:
+    return Router(
+        routes=[
+            Route("/", _get_levels, methods=["GET"]),
+            Route("/", _set_levels, methods=["PUT"]),
+            Route("/", _reset_levels, methods=["DELETE"]),
+        ]
+    )
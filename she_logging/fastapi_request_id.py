@@ -1,10 +1,27 @@
-from uuid import uuid4
+from typing import Callable, List, Tuple
 
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from she_logging.request_id import current_request_id, reset_request_id, set_request_id
+from she_logging.request_buffer import end_request_buffer, start_request_buffer
+from she_logging.request_id import (
+    current_request_id,
+    reset_request_id,
+    set_request_id,
+    uuid4_request_id,
+)
+from she_logging.request_timing import (
+    SERVER_TIMING_HEADER,
+    end_request_timer,
+    request_elapsed_ms,
+    server_timing,
+    start_request_timer,
+)
+
+REQUEST_ID_HEADER = b"x-request-id"
+_SERVER_TIMING_HEADER = SERVER_TIMING_HEADER.lower().encode("latin-1")
 
 
 class RequestContextMiddleware(BaseHTTPMiddleware):
@@ -12,13 +29,87 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
         self, request: Request, call_next: RequestResponseEndpoint
     ) -> Response:
         request_id_token = set_request_id(
-            request.headers.get("X-Request-ID", None) or str(uuid4())
+            request.headers.get("X-Request-ID", None) or uuid4_request_id()
         )
+        buffer_token = start_request_buffer()
+        timer_token = start_request_timer()
 
-        response = await call_next(request)
-        request_id = current_request_id()
-        if request_id is not None:
-            response.headers["X-Request-ID"] = request_id
-        reset_request_id(request_id_token)
+        failed = True
+        try:
+            response = await call_next(request)
+            failed = response.status_code >= 500
+            request_id = current_request_id()
+            if request_id is not None:
+                response.headers["X-Request-ID"] = request_id
+            if timer_token is not None:
+                response.headers[SERVER_TIMING_HEADER] = server_timing(
+                    request_elapsed_ms() or 0.0
+                )
+        finally:
+            end_request_buffer(buffer_token, failed)
+            end_request_timer(timer_token, request.method, request.url.path)
+            reset_request_id(request_id_token)
 
         return response
+
+
+class RequestIDMiddleware:
+    """Sets the request ID like RequestContextMiddleware, as plain ASGI middleware.
+
+    Avoids the extra task and response stream BaseHTTPMiddleware adds to every
+    request, and streaming responses are passed straight through. `id_generator`
+    creates the IDs of requests without an X-Request-ID header, e.g.
+    she_logging.request_id.counter_request_id.
+    """
+
+    def __init__(
+        self, app: ASGIApp, id_generator: Callable[[], str] = uuid4_request_id
+    ) -> None:
+        self.app = app
+        self.id_generator = id_generator
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = ""
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        request_id_token = set_request_id(request_id or self.id_generator())
+        buffer_token = start_request_buffer()
+        timer_token = start_request_timer()
+        failed = True
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal failed
+            if message["type"] == "http.response.start":
+                failed = message["status"] >= 500
+                current = current_request_id()
+                if current is not None:
+                    headers: List[Tuple[bytes, bytes]] = [
+                        header
+                        for header in message.get("headers", ())
+                        if header[0].lower() != REQUEST_ID_HEADER
+                    ]
+                    headers.append((REQUEST_ID_HEADER, current.encode("latin-1")))
+                    message["headers"] = headers
+                if timer_token is not None:
+                    message["headers"] = [
+                        *message.get("headers", ()),
+                        (
+                            _SERVER_TIMING_HEADER,
+                            server_timing(request_elapsed_ms() or 0.0).encode(),
+                        ),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            # Failed unless a response below 500 was started
+            end_request_buffer(buffer_token, failed)
+            end_request_timer(timer_token, scope["method"], scope["path"])
+            reset_request_id(request_id_token)
@@ -0,0 +1,331 @@
+"""Rotating log files for deployments without a log shipper
+
+RotatingFileHandler writes to a file through the preallocated buffer of
+she_logging.handlers.BufferedStreamHandler, so records are written in batches with a
+single os.write, at ERROR and above, after `flush_interval` and at exit. Before a
+batch is written the file is rotated if it would grow past `max_bytes`, or if the
+`when` interval has passed: the file is renamed to <filename>.<YYYYmmdd-HHMMSS> and
+a new one opened.
+
+Rotated files are compressed (gzip, or zstd with the zstandard package) by a
+background thread, so logging never waits for compression, and only the newest
+`backup_count` are kept. Files left uncompressed when a process exits are compressed
+by the next handler writing to the same file.
+
+Only one process may write to a file, with gunicorn set LOG_AGGREGATE so that the
+workers send their records to a single writer.
+
+read_lines() and read_records() stream a log file and its rotated files back out,
+oldest first:
+
+    python -m she_logging.files /var/log/service.log | jq .message
+"""
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from importlib import import_module
+from importlib.util import find_spec
+from typing import IO, Any, Iterator, List, Optional, Pattern, Sequence, Tuple
+
+from .handlers import BufferedStreamHandler
+
+COMPRESSIONS = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+INTERVALS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_compress_queue: "queue.Queue[Tuple[str, str, str, int]]" = queue.Queue()
+_compressor_lock = threading.Lock()
+_compressor: Optional[threading.Thread] = None
+
+
+def rotation_interval(when: str) -> Optional[float]:
+    """Seconds between rotations for `when`, e.g. "30m", "1h", "1d".
+
+    "midnight" and "" (no time based rotation) return None, raises ValueError for
+    anything else.
+    """
+    match = re.fullmatch(r"(\d+)([smhd])", when.strip().lower())
+    if match:
+        return int(match.group(1)) * INTERVALS[match.group(2)]
+    if when.strip().lower() in ("", "midnight"):
+        return None
+    raise ValueError(f"Invalid log rotation interval {when!r}")
+
+
+def _segment_pattern(filename: str) -> Pattern[str]:
+    return re.compile(
+        re.escape(os.path.basename(filename))
+        + r"\.(\d{8}-\d{6})(?:\.(\d+))?(\.gz|\.zst)?$"
+    )
+
+
+def rotated_files(filename: str) -> List[str]:
+    """The rotated files of a log file, oldest first."""
+    directory = os.path.dirname(filename) or "."
+    pattern = _segment_pattern(filename)
+    found = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            key = (match.group(1), int(match.group(2) or 0))
+            found.append((key, os.path.join(directory, name)))
+    return [path for _, path in sorted(found)]
+
+
+def compress_file(path: str, compression: str) -> str:
+    """Compress a rotated file, replacing it. Returns the compressed file's path."""
+    if compression == "none":
+        return path
+    target = path + COMPRESSIONS[compression]
+    temporary = target + ".tmp"
+    with open(path, "rb") as source, open(temporary, "wb") as raw:
+        if compression == "zstd":
+            compressor = import_module("zstandard").ZstdCompressor()
+            with compressor.stream_writer(raw, closefd=False) as output:
+                shutil.copyfileobj(source, output, 1 << 20)
+        else:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as output:
+                shutil.copyfileobj(source, output, 1 << 20)
+    os.replace(temporary, target)
+    os.remove(path)
+    return target
+
+
+def remove_old_files(filename: str, backup_count: int) -> None:
+    """Remove all but the newest backup_count rotated files, 0 keeps them all."""
+    if backup_count <= 0:
+        return
+    for path in rotated_files(filename)[:-backup_count]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _compress_loop() -> None:
+    while True:
+        path, compression, filename, backup_count = _compress_queue.get()
+        try:
+            if os.path.exists(path):
+                compress_file(path, compression)
+            remove_old_files(filename, backup_count)
+        except Exception:
+            pass
+        finally:
+            _compress_queue.task_done()
+
+
+def _start_compressor() -> None:
+    global _compressor
+    with _compressor_lock:
+        if _compressor is None or not _compressor.is_alive():
+            _compressor = threading.Thread(
+                target=_compress_loop, name="she-logging-compressor", daemon=True
+            )
+            _compressor.start()
+
+
+def wait_for_compression() -> None:
+    """Block until every rotated file queued so far has been compressed."""
+    _compress_queue.join()
+
+
+class RotatingFileHandler(BufferedStreamHandler):
+    """Buffered file handler rotating by size and time, see the module documentation.
+
+    Raises ValueError for an unknown compression, or zstd without zstandard
+    installed, and an invalid `when`.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 100 * 1024 * 1024,
+        when: str = "",
+        backup_count: int = 10,
+        compression: str = "gzip",
+        buffer_size: int = 65536,
+        flush_interval: float = 1.0,
+        flush_level: int = logging.ERROR,
+        flush_on_sigterm: bool = True,
+    ) -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown log file compression {compression!r}")
+        if compression == "zstd" and find_spec("zstandard") is None:
+            raise ValueError("zstd log file compression needs zstandard installed")
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.when = when
+        self.interval = rotation_interval(when)
+        self.backup_count = backup_count
+        self.compression = compression
+        super().__init__(
+            self._open(),
+            buffer_size=buffer_size,
+            flush_interval=flush_interval,
+            flush_level=flush_level,
+            flush_on_sigterm=flush_on_sigterm,
+        )
+        self._size = os.fstat(self.stream.fileno()).st_size
+        self._rollover_at = self._next_rollover(time.time())
+        self._rotated_stem = ""
+        self._rotated_count = 0
+
+        # Compress anything left behind by a previous process
+        for path in rotated_files(self.filename):
+            if not path.endswith((".gz", ".zst")):
+                self._queue_compression(path)
+
+    def _open(self) -> IO[str]:
+        directory = os.path.dirname(self.filename)
+        os.makedirs(directory, exist_ok=True)
+        return open(self.filename, "a", encoding="utf-8")
+
+    def _next_rollover(self, now: float) -> Optional[float]:
+        if self.interval is not None:
+            return now + self.interval
+        if self.when.strip().lower() == "midnight":
+            tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+            return datetime(tomorrow.year, tomorrow.month, tomorrow.day).timestamp()
+        return None
+
+    def _should_rotate(self, size: int) -> bool:
+        if not self._size:
+            return False
+        if self.max_bytes > 0 and self._size + size > self.max_bytes:
+            return True
+        return self._rollover_at is not None and time.time() >= self._rollover_at
+
+    def _write(self, data: memoryview) -> None:
+        # Called with the handler lock held, see BufferedStreamHandler
+        if self._should_rotate(len(data)):
+            self.rotate()
+        super()._write(data)
+        self._size += len(data)
+
+    def rotate(self) -> None:
+        """Rename the current file and start a new one, called with the lock held."""
+        now = time.time()
+        stem = f"{self.filename}.{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}"
+        # Numbered in order within a second, older files may already be removed
+        count = self._rotated_count + 1 if stem == self._rotated_stem else 0
+        rotated = f"{stem}.{count}" if count else stem
+        while any(os.path.exists(rotated + ext) for ext in COMPRESSIONS.values()):
+            count += 1
+            rotated = f"{stem}.{count}"
+        self._rotated_stem, self._rotated_count = stem, count
+
+        self.stream.flush()
+        self.stream.close()
+        os.rename(self.filename, rotated)
+        self.stream = self._open()
+        self._fd = self.stream.fileno()
+        self._size = 0
+        self._rollover_at = self._next_rollover(now)
+        self._queue_compression(rotated)
+
+    def _queue_compression(self, path: str) -> None:
+        _compress_queue.put((path, self.compression, self.filename, self.backup_count))
+        _start_compressor()
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            if not self.stream.closed:
+                self.stream.close()
+
+
+def open_log_file(path: str) -> IO[str]:
+    """A log file or rotated file opened for reading text, decompressed if needed."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="backslashreplace")
+    if path.endswith(".zst"):
+        decompressor = import_module("zstandard").ZstdDecompressor()
+        return io.TextIOWrapper(
+            decompressor.stream_reader(open(path, "rb"), closefd=True),
+            encoding="utf-8",
+            errors="backslashreplace",
+        )
+    return open(path, encoding="utf-8", errors="backslashreplace")
+
+
+def read_lines(filename: str, rotated: bool = True) -> Iterator[str]:
+    """The lines of a log file, after those of its rotated files unless `rotated` is
+    false, without line endings.
+    """
+    paths = rotated_files(filename) if rotated else []
+    if os.path.exists(filename):
+        paths.append(filename)
+    for path in paths:
+        try:
+            stream = open_log_file(path)
+        except FileNotFoundError:
+            # Removed or compressed since it was listed
+            continue
+        with stream:
+            for line in stream:
+                yield line.rstrip("\n")
+
+
+def read_records(filename: str, rotated: bool = True) -> Iterator[Any]:
+    """The JSON records in a log file and its rotated files, oldest first.
+
+    Lines which are not JSON (e.g. written by another handler) are skipped.
+    """
+    for line in read_lines(filename, rotated):
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python -m she_logging.files",
+        description="Write a log file and its rotated files to stdout, oldest first.",
+    )
+    parser.add_argument("filename")
+    parser.add_argument(
+        "--current-only",
+        action="store_true",
+        help="only the current file, not the rotated files",
+    )
+    args = parser.parse_args(argv)
+    try:
+        for line in read_lines(args.filename, rotated=not args.current_only):
+            sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # e.g. piped to head
+        sys.stderr.close()
+    return 0
+
+
+def _after_fork_in_child() -> None:
+    global _compress_queue, _compressor, _compressor_lock
+    # Files queued before the fork are compressed by the parent
+    _compress_queue = queue.Queue()
+    _compressor_lock = threading.Lock()
+    _compressor = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+if __name__ == "__main__":
+    sys.exit(main())
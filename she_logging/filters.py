@@ -0,0 +1,258 @@
+"""Rate limiting and sampling filters
+
+RateLimitFilter keeps a token bucket for each logger, level and message template.
+Records arriving when the bucket is empty are suppressed, and once the burst is over
+a single summary record "N similar messages suppressed" is logged in their place. A
+background thread logs summaries for bursts which end without another record passing
+the filter, and any outstanding summaries are logged at exit.
+
+SamplingFilter passes a fixed proportion of DEBUG and INFO records.
+
+Both are enabled from environment variables (see README) and attached to the handlers
+in SHE_LOGGING_CONFIG, or can be added to any handler's filters.
+"""
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+SUPPRESSED_MESSAGE = "%d similar messages suppressed: %s"
+SWEEP_INTERVAL = 0.5
+
+_rate_limits: "weakref.WeakSet[RateLimitFilter]" = weakref.WeakSet()
+_sweeper_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+
+
+def summary_record(
+    template: logging.LogRecord, count: int, first: float, last: float
+) -> logging.LogRecord:
+    """A record reporting that `count` records like `template` were not written."""
+    record = logging.getLogger(template.name).makeRecord(
+        template.name,
+        template.levelno,
+        template.pathname,
+        template.lineno,
+        SUPPRESSED_MESSAGE,
+        (count, template.msg),
+        None,
+        template.funcName,
+        extra={"suppressed": count, "firstSuppressed": first, "lastSuppressed": last},
+    )
+    return record
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "suppressed", "first", "last", "template")
+
+    def __init__(self, tokens: float, now: float) -> None:
+        self.tokens = tokens
+        self.updated = now
+        self.suppressed = 0
+        self.first = 0.0
+        self.last = 0.0
+        self.template: Optional[logging.LogRecord] = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Allows `rate` records per second with bursts of up to `burst` records for each
+    (logger, level, message template).
+
+    A summary of suppressed records is logged when their key next passes the filter, or
+    by a background thread once `quiet` seconds have passed since the last one was
+    suppressed. At most `max_keys` keys are tracked, the least recently used are
+    discarded.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        burst: int = 20,
+        quiet: float = 1.0,
+        max_keys: int = 10000,
+    ) -> None:
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.quiet = quiet
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[Hashable, _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+        # Number of buckets with suppressed records waiting for a summary
+        self._pending = 0
+        _rate_limits.add(self)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if "suppressed" in record.__dict__:
+            return True
+
+        now = time.monotonic()
+        msg = record.msg
+        # Lazy messages are identified by where they were logged
+        template = msg if isinstance(msg, str) else (record.pathname, record.lineno)
+        key = (record.name, record.levelno, template)
+        summaries: List[logging.LogRecord] = []
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._evict(summaries)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(
+                    self.burst, bucket.tokens + (now - bucket.updated) * self.rate
+                )
+                bucket.updated = now
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                allowed = True
+                self._take_summary(bucket, summaries)
+            else:
+                allowed = False
+                if not bucket.suppressed:
+                    bucket.first = record.created
+                    bucket.template = record
+                    self._pending += 1
+                    _start_sweeper()
+                bucket.suppressed += 1
+                bucket.last = record.created
+
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.quiet
+                self._sweep(now, summaries)
+
+        self._log(summaries)
+        return allowed
+
+    def flush(self, force: bool = False) -> None:
+        """Log summaries for bursts which are over, or for every key with suppressed
+        records if `force` is set."""
+        if not self._pending:
+            return
+        summaries: List[logging.LogRecord] = []
+        with self._lock:
+            if force:
+                for bucket in self._buckets.values():
+                    self._take_summary(bucket, summaries)
+            else:
+                self._sweep(time.monotonic(), summaries)
+        self._log(summaries)
+
+    @staticmethod
+    def _log(summaries: List[logging.LogRecord]) -> None:
+        for summary in summaries:
+            logging.getLogger(summary.name).handle(summary)
+
+    def _take_summary(
+        self, bucket: _Bucket, summaries: List[logging.LogRecord]
+    ) -> None:
+        if bucket.suppressed and bucket.template is not None:
+            summaries.append(
+                summary_record(
+                    bucket.template, bucket.suppressed, bucket.first, bucket.last
+                )
+            )
+            self._pending -= 1
+        bucket.suppressed = 0
+        bucket.template = None
+
+    def _sweep(self, now: float, summaries: List[logging.LogRecord]) -> None:
+        # Summarise bursts which are over and forget buckets which have refilled.
+        wall_clock = time.time()
+        for key, bucket in list(self._buckets.items()):
+            if bucket.suppressed and wall_clock - bucket.last >= self.quiet:
+                self._take_summary(bucket, summaries)
+            if (
+                not bucket.suppressed
+                and bucket.tokens + (now - bucket.updated) * self.rate >= self.burst
+            ):
+                del self._buckets[key]
+
+    def _evict(self, summaries: List[logging.LogRecord]) -> None:
+        while len(self._buckets) > self.max_keys:
+            _, bucket = self._buckets.popitem(last=False)
+            self._take_summary(bucket, summaries)
+
+
+class SamplingFilter(logging.Filter):
+    """Passes DEBUG records with probability `debug` and INFO records with probability
+    `info`. Records at WARNING or above are always passed."""
+
+    def __init__(self, debug: float = 1.0, info: float = 1.0) -> None:
+        super().__init__()
+        self.rates: Dict[int, float] = {logging.DEBUG: debug, logging.INFO: info}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate  # nosec - not security related
+
+
+def flush_rate_limit_summaries(force: bool = True) -> None:
+    """Log the summaries of suppressed records held by every RateLimitFilter."""
+    for rate_limit in list(_rate_limits):
+        try:
+            rate_limit.flush(force)
+        except Exception:
+            pass
+
+
+def _sweep_loop() -> None:
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        flush_rate_limit_summaries(force=False)
+
+
+def _start_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None and _sweeper.is_alive():
+        return
+    with _sweeper_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = threading.Thread(
+                target=_sweep_loop, name="she-logging-rate-limit", daemon=True
+            )
+            _sweeper.start()
+
+
+def _after_fork_in_child() -> None:
+    # The sweeper thread doesn't survive a fork, it is restarted when needed.
+    global _sweeper, _sweeper_lock
+    _sweeper_lock = threading.Lock()
+    _sweeper = None
+
+
+atexit.register(flush_rate_limit_summaries)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def she_filters(
+    rate_limit: float, burst: int, sample_debug: float, sample_info: float
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """The logging configuration `filters` section and the list of filter names to
+    attach to each handler for the given settings."""
+    filters: Dict[str, Dict] = {}
+    if sample_debug < 1.0 or sample_info < 1.0:
+        filters["sample"] = {
+            "()": "she_logging.filters.SamplingFilter",
+            "debug": sample_debug,
+            "info": sample_info,
+        }
+    if rate_limit > 0:
+        filters["rate_limit"] = {
+            "()": "she_logging.filters.RateLimitFilter",
+            "rate": rate_limit,
+            "burst": burst,
+        }
+    return filters, list(filters)
@@ -0,0 +1,43 @@
+"""Flask admin endpoints for changing log levels at runtime, see she_logging.levels
+
+    app.register_blueprint(log_levels_blueprint(), url_prefix="/admin")
+
+- GET /admin/log-levels: the current levels and pending reverts
+- PUT /admin/log-levels: {"levels": {"<logger>": "DEBUG"}, "revert_after": 300}
+- DELETE /admin/log-levels: revert every pending change now
+
+The endpoints have no authentication of their own, register them only where they
+are protected, e.g. on an internal port or behind the app's own admin checks.
+"""
+from typing import Any, Tuple
+
+from flask import Blueprint, jsonify, request
+
+from she_logging import levels
+
+
+def log_levels_blueprint(name: str = "she_logging_levels") -> Blueprint:
+    blueprint = Blueprint(name, __name__)
+
+    @blueprint.route("/log-levels", methods=["GET"])
+    def get_levels() -> Any:
+        return jsonify(levels.get_levels())
+
+    @blueprint.route("/log-levels", methods=["PUT"])
+    def set_levels() -> Any:
+        try:
+            levels.apply_levels(request.get_json(force=True, silent=True))
+        except ValueError as error:
+            return _error(str(error))
+        return jsonify(levels.get_levels())
+
+    @blueprint.route("/log-levels", methods=["DELETE"])
+    def reset_levels() -> Any:
+        levels.reset_levels()
+        return jsonify(levels.get_levels())
+
+    return blueprint
+
+
+def _error(message: str) -> Tuple[Any, int]:
+    return jsonify({"error": message}), 400
@@ -0,0 +1,66 @@
+"""Sets the request ID context variable for each Flask request
+
+Without this every log record asks flask_log_request_id for the ID of the current
+request, which looks up the Flask request context even in threads and at startup
+when there isn't one. With it the ID is copied into the context variable once at
+the start of each request, and records created outside a request have no ID.
+Fields bound with she_logging.context during a request are removed at the end of it,
+and records buffered for the request (see she_logging.request_buffer) are written if
+it failed and discarded otherwise.
+
+    app = Flask(__name__)
+    RequestID(app)
+    init_app(app)
+"""
+from typing import Optional
+
+from flask import Flask, Response, g
+from flask_log_request_id import RequestID
+from flask_log_request_id import current_request_id as flask_request_id
+
+from she_logging import context, request_buffer, request_id
+
+_TOKEN_ATTRIBUTE = "_she_logging_request_id_token"
+_CONTEXT_TOKEN_ATTRIBUTE = "_she_logging_context_token"
+_BUFFER_TOKEN_ATTRIBUTE = "_she_logging_buffer_token"
+_STATUS_ATTRIBUTE = "_she_logging_status"
+
+
+def init_app(app: Flask) -> None:
+    """Set the request ID context variable in each of the app's requests.
+
+    Initialises flask_log_request_id for the app if it isn't already, otherwise call
+    this after RequestID(app) so the ID has been read from the request headers.
+    """
+    if "LOG_REQUEST_ID_G_OBJECT_ATTRIBUTE" not in app.config:
+        RequestID(app)
+    app.before_request(_set_request_id)
+    app.after_request(_record_status)
+    app.teardown_request(_reset_request_id)
+    request_id._flask_fallback = False
+
+
+def _set_request_id() -> None:
+    setattr(g, _TOKEN_ATTRIBUTE, request_id.set_request_id(flask_request_id()))
+    setattr(g, _CONTEXT_TOKEN_ATTRIBUTE, context.clear_context())
+    setattr(g, _BUFFER_TOKEN_ATTRIBUTE, request_buffer.start_request_buffer())
+
+
+def _record_status(response: Response) -> Response:
+    setattr(g, _STATUS_ATTRIBUTE, response.status_code)
+    return response
+
+
+def _reset_request_id(exc: Optional[BaseException]) -> None:
+    buffer_token = g.pop(_BUFFER_TOKEN_ATTRIBUTE, None)
+    if buffer_token is not None:
+        status = g.pop(_STATUS_ATTRIBUTE, 500)
+        request_buffer.end_request_buffer(
+            buffer_token, failed=exc is not None or status >= 500
+        )
+    context_token = g.pop(_CONTEXT_TOKEN_ATTRIBUTE, None)
+    if context_token is not None:
+        context.reset_context(context_token)
+    token = g.pop(_TOKEN_ATTRIBUTE, None)
+    if token is not None:
+        request_id.reset_request_id(token)
@@ -1,8 +1,12 @@
-from typing import Any
+import traceback
+from datetime import timedelta
+from typing import Any, Dict
 
 from gunicorn import glogging
 
 from . import logging
+from .access_log import gunicorn_access
+from .handlers import flush_buffered_handlers
 
 
 class Logger(glogging.Logger):
@@ -11,3 +15,37 @@ class Logger(glogging.Logger):
     def setup(self, cfg: Any) -> None:
         super().setup(cfg)
         logging.init_logging()
+        if logging.LOG_AGGREGATE:
+            from .aggregator import start_aggregator
+
+            start_aggregator()
+
+    def reopen_files(self) -> None:
+        # Gunicorn's SIGUSR1 handler, which replaces install_reload_signal's
+        super().reopen_files()
+        if logging.LOG_LEVEL_FILE:
+            from .levels import request_reload
+
+            request_reload()
+
+    def access(
+        self, resp: Any, req: Any, environ: Dict[str, Any], request_time: timedelta
+    ) -> None:
+        if not logging.LOG_ACCESS:
+            super().access(resp, req, environ, request_time)
+            return
+        # Structured records instead of gunicorn's access log lines
+        try:
+            gunicorn_access(resp, req, environ, request_time)
+        except Exception:
+            self.error(traceback.format_exc())
+
+
+def worker_exit(server: Any, worker: Any) -> None:
+    """Gunicorn server hook, writes out buffered log records when a worker exits."""
+    flush_buffered_handlers()
+
+
+def on_exit(server: Any) -> None:
+    """Gunicorn server hook, writes out buffered log records when gunicorn exits."""
+    flush_buffered_handlers()
@@ -0,0 +1,215 @@
+"""Buffered output for she_logging
+
+BufferedStreamHandler can be used in place of logging.StreamHandler. Formatted records
+are encoded into a preallocated buffer which is written to the stream's file
+descriptor with a single os.write when:
+
+- the buffer is full,
+- a record at `flush_level` (default ERROR) or above is logged,
+- `flush_interval` seconds have passed since the last write (checked on each record
+  and by a background thread so quiet periods are not delayed),
+- the process exits, receives SIGTERM, or forks.
+
+Streams without a file descriptor (e.g. captured output in tests) are written to
+with a single write() call per batch instead.
+"""
+import atexit
+import io
+import logging
+import os
+import signal
+import threading
+import time
+import weakref
+from types import FrameType
+from typing import IO, Any, Optional, Tuple
+
+_handlers: "weakref.WeakSet[BufferedStreamHandler]" = weakref.WeakSet()
+_flusher_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+_sigterm_installed = False
+_previous_sigterm: Any = signal.SIG_DFL
+_pending_sigterm: Optional[Tuple[int, Optional[FrameType]]] = None
+
+FLUSHER_TICK = 0.1
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        buffer_size: int = 65536,
+        flush_interval: float = 1.0,
+        flush_level: int = logging.ERROR,
+        flush_on_sigterm: bool = True,
+    ) -> None:
+        super().__init__(stream)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.flush_level = logging._checkLevel(flush_level)  # type: ignore
+        self.encoding = getattr(self.stream, "encoding", None) or "utf-8"
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._length = 0
+        self._last_write = time.monotonic()
+        try:
+            self._fd: Optional[int] = self.stream.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            self._fd = None
+
+        _handlers.add(self)
+        _start_flusher()
+        if flush_on_sigterm:
+            _install_sigterm_handler()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        result = super().handle(record)
+        if _pending_sigterm is not None:
+            _resume_sigterm()
+        return result
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Called by Handler.handle with the handler lock held.
+        try:
+            data = (self.format(record) + self.terminator).encode(
+                self.encoding, "backslashreplace"
+            )
+            size = len(data)
+            if self._length + size > self.buffer_size:
+                self._write_buffer()
+            if size > self.buffer_size:
+                self._write(memoryview(data))
+            else:
+                self._buffer[self._length : self._length + size] = data
+                self._length += size
+
+            if (
+                record.levelno >= self.flush_level
+                or time.monotonic() - self._last_write >= self.flush_interval
+            ):
+                self._write_buffer()
+        except RecursionError:  # See issue 36272
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _write_buffer(self) -> None:
+        if self._length:
+            length, self._length = self._length, 0
+            self._write(self._view[:length])
+        self._last_write = time.monotonic()
+
+    def _write(self, data: memoryview) -> None:
+        if self._fd is None:
+            self.stream.write(data.tobytes().decode(self.encoding))
+            self.stream.flush()
+            return
+
+        # Anything written to the stream object directly must come first.
+        self.stream.flush()
+        while data:
+            written = os.write(self._fd, data)
+            data = data[written:]
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            self._write_buffer()
+        finally:
+            self.release()
+        if _pending_sigterm is not None:
+            _resume_sigterm()
+
+    def _held_by_current_thread(self) -> bool:
+        return self.lock is not None and self.lock._is_owned()  # type: ignore
+
+    def flush_if_due(self) -> None:
+        if self._length and time.monotonic() - self._last_write >= self.flush_interval:
+            self.flush()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            _handlers.discard(self)
+            super().close()
+
+
+def flush_buffered_handlers() -> None:
+    """Write out everything buffered by BufferedStreamHandlers."""
+    for handler in list(_handlers):
+        try:
+            handler.flush()
+        except Exception:
+            pass
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(FLUSHER_TICK)
+        for handler in list(_handlers):
+            try:
+                handler.flush_if_due()
+            except Exception:
+                pass
+
+
+def _start_flusher() -> None:
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(
+                target=_flush_loop, name="she-logging-flusher", daemon=True
+            )
+            _flusher.start()
+
+
+def _install_sigterm_handler() -> None:
+    global _sigterm_installed, _previous_sigterm
+    if _sigterm_installed or threading.current_thread() is not threading.main_thread():
+        return
+    _sigterm_installed = True
+    _previous_sigterm = signal.getsignal(signal.SIGTERM)
+    signal.signal(signal.SIGTERM, _on_sigterm)
+
+
+def _on_sigterm(signum: int, frame: Optional[FrameType]) -> None:
+    global _pending_sigterm
+    # Signal handlers run on the main thread between bytecodes. If it was interrupted
+    # part way through writing to a handler's buffer, flushing now would corrupt the
+    # buffer, so wait until the handler lock is released (see handle and flush).
+    if any(handler._held_by_current_thread() for handler in list(_handlers)):
+        _pending_sigterm = (signum, frame)
+        return
+
+    _pending_sigterm = None
+    flush_buffered_handlers()
+    if callable(_previous_sigterm):
+        _previous_sigterm(signum, frame)
+    elif _previous_sigterm != signal.SIG_IGN:
+        # Terminate the way we would have without this handler
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+
+def _resume_sigterm() -> None:
+    # Only the main thread can have deferred the signal.
+    pending = _pending_sigterm
+    if pending is not None and threading.current_thread() is threading.main_thread():
+        _on_sigterm(*pending)
+
+
+def _after_fork_in_child() -> None:
+    global _flusher, _flusher_lock
+    _flusher_lock = threading.Lock()
+    _flusher = None
+    if _handlers:
+        _start_flusher()
+
+
+atexit.register(flush_buffered_handlers)
+if hasattr(os, "register_at_fork"):
+    # Flush first so that the child doesn't inherit (and repeat) buffered records.
+    os.register_at_fork(
+        before=flush_buffered_handlers, after_in_child=_after_fork_in_child
+    )
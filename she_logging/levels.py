@@ -0,0 +1,248 @@
+"""Changing logger levels at runtime
+
+set_levels() changes the levels of loggers in a running process, all at once under
+the logging module lock. Cached level checks are cleared as for Logger.setLevel,
+including those of she_logging.logging.LogProxy. Changes are reverted after
+`revert_after` seconds (LOG_LEVEL_REVERT_AFTER by default) so that a burst of DEBUG
+records can't be left on by mistake:
+
+    set_levels({"she_logging": "DEBUG", "urllib3": "INFO"}, revert_after=300)
+
+A second change to the same logger before then keeps the original level to revert
+to, reset_levels() reverts immediately.
+
+With LOG_LEVEL_FILE set init_logging() calls install_reload_signal(), so that on
+SIGUSR1 the levels are read from that file (JSON, or YAML if the name ends with
+.yaml or .yml). Gunicorn replaces the SIGUSR1 handler to reopen its log files, the
+she_logging gunicorn logger class reloads the levels when it does:
+
+    {"levels": {"she_logging": "DEBUG"}, "revert_after": 300}
+
+she_logging.flask_levels and she_logging.fastapi_levels provide admin endpoints.
+"""
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple, Union
+
+from . import logging as she_logging
+from . import request_buffer
+
+Level = Union[int, str]
+
+_lock = threading.Lock()
+# Logger name: (level before the first change, time.monotonic() to revert at)
+_overrides: Dict[str, Tuple[int, float]] = {}
+_timer: Optional[threading.Timer] = None
+_reload_requested = threading.Event()
+_reloader: Optional[threading.Thread] = None
+_reload_path: Optional[str] = None
+
+
+def _get_logger(name: str) -> logging.Logger:
+    return logging.root if name in ("", "root") else logging.getLogger(name)
+
+
+def _level_of(name: str) -> int:
+    # The root level is kept by request_buffer, which may lower the root logger's own
+    if name == "root":
+        return request_buffer.root_level()
+    return _get_logger(name).level
+
+
+def _set_level_of(name: str, level: int) -> None:
+    if name == "root":
+        request_buffer.set_root_level(level)
+    else:
+        _get_logger(name).setLevel(level)
+
+
+def _check_level(level: Level) -> int:
+    if isinstance(level, str):
+        level = level.upper()
+    return logging._checkLevel(level)  # type: ignore[attr-defined,no-any-return]
+
+
+def set_levels(
+    levels: Mapping[str, Level], revert_after: Optional[float] = None
+) -> None:
+    """Set the level of each named logger ("root" for the root logger).
+
+    The levels are reverted after `revert_after` seconds, LOG_LEVEL_REVERT_AFTER by
+    default, 0 makes the change permanent. Raises ValueError for an unknown level,
+    in which case no level is changed.
+    """
+    if revert_after is None:
+        revert_after = she_logging.LOG_LEVEL_REVERT_AFTER
+    try:
+        checked = {
+            ("root" if name == "" else name): _check_level(level)
+            for name, level in levels.items()
+        }
+    except TypeError as error:
+        raise ValueError(str(error)) from None
+
+    revert_at = time.monotonic() + revert_after
+    with _lock, logging._lock:  # type: ignore[attr-defined]
+        for name, level in checked.items():
+            if revert_after > 0:
+                original = _overrides.get(name, (_level_of(name), 0.0))[0]
+                _overrides[name] = (original, revert_at)
+            else:
+                _overrides.pop(name, None)
+            _set_level_of(name, level)
+        _schedule()
+    she_logging.LogProxy.invalidate_all()
+
+
+def set_level(name: str, level: Level, revert_after: Optional[float] = None) -> None:
+    """Set the level of one logger, see set_levels."""
+    set_levels({name: level}, revert_after)
+
+
+def reset_levels() -> None:
+    """Revert every change which is waiting to be reverted."""
+    _revert(float("inf"))
+
+
+def _revert(until: float) -> None:
+    with _lock, logging._lock:  # type: ignore[attr-defined]
+        for name, (original, revert_at) in list(_overrides.items()):
+            if revert_at <= until:
+                del _overrides[name]
+                _set_level_of(name, original)
+        _schedule()
+    she_logging.LogProxy.invalidate_all()
+
+
+def _revert_due() -> None:
+    _revert(time.monotonic())
+
+
+def _schedule() -> None:
+    # Called with _lock held, one timer for the next revert
+    global _timer
+    if _timer is not None:
+        _timer.cancel()
+        _timer = None
+    if _overrides:
+        delay = min(revert_at for _, revert_at in _overrides.values())
+        _timer = threading.Timer(max(0.0, delay - time.monotonic()), _revert_due)
+        _timer.daemon = True
+        _timer.start()
+
+
+def get_levels() -> Dict[str, Any]:
+    """The level of the root logger and every logger with a level set, and the
+    changes waiting to be reverted with the seconds until they are.
+    """
+    now = time.monotonic()
+    with _lock:
+        overrides = dict(_overrides)
+    levels = {"root": logging.getLevelName(_level_of("root"))}
+    for name, logger in sorted(logging.Logger.manager.loggerDict.items()):
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logging.getLevelName(logger.level)
+    return {
+        "levels": levels,
+        "reverts": {
+            name: {
+                "level": logging.getLevelName(original),
+                "seconds": max(0.0, round(revert_at - now, 3)),
+            }
+            for name, (original, revert_at) in sorted(overrides.items())
+        },
+    }
+
+
+def apply_levels(settings: Any) -> None:
+    """Apply {"levels": {name: level}, "revert_after": seconds}, revert_after is
+    optional. Raises ValueError if settings are not in that form.
+    """
+    levels = settings.get("levels") if isinstance(settings, Mapping) else None
+    if not isinstance(levels, Mapping):
+        raise ValueError('Expected {"levels": {"<logger>": "<level>"}}')
+    revert_after = settings.get("revert_after")
+    if revert_after is not None and not isinstance(revert_after, (int, float)):
+        raise ValueError("revert_after must be a number of seconds")
+    set_levels(levels, revert_after)
+
+
+def load_levels_file(path: str) -> None:
+    """Apply the levels in a JSON or YAML file, see apply_levels."""
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            settings = yaml.safe_load(file)
+        else:
+            settings = json.load(file)
+    apply_levels(settings)
+
+
+def _reload_loop() -> None:
+    while True:
+        _reload_requested.wait()
+        _reload_requested.clear()
+        path = _reload_path
+        if path is None:
+            continue
+        try:
+            load_levels_file(path)
+        except Exception:
+            logging.getLogger("she-logging").exception(
+                "Failed to load log levels from %s", path
+            )
+
+
+def install_reload_signal(path: str, signum: int = signal.SIGUSR1) -> None:
+    """Load the levels in path whenever the process receives signum.
+
+    The file is read by a background thread, not the signal handler, which may have
+    interrupted the main thread while it held a logging lock. Only the main thread
+    can install signal handlers, elsewhere this does nothing. Under gunicorn, which
+    handles SIGUSR1 itself, the she_logging logger class calls request_reload().
+    """
+    global _reload_path
+    if threading.current_thread() is not threading.main_thread():
+        return
+    _reload_path = path
+    _start_reloader()
+    signal.signal(signum, lambda signum, frame: request_reload())
+
+
+def request_reload() -> None:
+    """Load the levels from the file given to install_reload_signal, in the
+    background. Safe to call from a signal handler.
+    """
+    if _reload_path is not None:
+        _start_reloader()
+        _reload_requested.set()
+
+
+def _start_reloader() -> None:
+    global _reloader
+    if _reload_path is not None and (_reloader is None or not _reloader.is_alive()):
+        _reloader = threading.Thread(
+            target=_reload_loop, name="she-logging-levels", daemon=True
+        )
+        _reloader.start()
+
+
+def _after_fork_in_child() -> None:
+    global _lock, _timer, _reloader, _reload_requested
+    _lock = threading.Lock()
+    _reload_requested = threading.Event()
+    # The parent's timer and reloader threads don't exist in the child
+    _timer = None
+    _reloader = None
+    with _lock:
+        _schedule()
+    _start_reloader()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -23,37 +23,73 @@ Log level may be overriden (environment variable LOG_LEVEL, default INFO)
 Log format may be overridden (environment variable LOG_FORMAT, default JSON, other options COLOURED, PLAIN)
 
 """
-import datetime
-import json
-import logging.config
+
+import logging
 import sys
+import weakref
+from importlib.util import find_spec
 from logging import Logger, root, warning
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 import json_log_formatter
-import yaml
 from environs import Env
 
+from .config_cache import CacheKey, load_config, store_config
+from .context import EMPTY_CONTEXT, current_context
+from .filters import she_filters
 from .request_id import current_request_id
+from .serializers import Dumps, SafeJsonEncoder, get_serializer  # noqa: F401
+from .timestamps import Timestamp, TimestampCache
+from .tracebacks import TracebackRenderer, exception_id
+
+# rich is imported by logging.config when the colour handler is configured
+HAVE_RICH: bool = find_spec("rich") is not None
 
-try:
-    import rich
 
-    HAVE_RICH: bool = bool(rich)
-except:
-    HAVE_RICH = False
+def flask_request() -> Any:
+    """The current Flask request, false outside a request.
 
-try:
-    from flask import request
-except ImportError:
-    request = None  # type: ignore
+    Flask is not imported here, if the application hasn't imported it there can't be
+    a Flask request.
+    """
+    flask = sys.modules.get("flask")
+    return flask.request if flask is not None else None
 
 
 env = Env()
 LOG_LEVEL = env.str("LOG_LEVEL", "INFO").upper()
 LOG_FORMAT = env.str("LOG_FORMAT", "JSON").upper()
 LOG_LOCALS = env.bool("LOG_LOCALS", True)
+LOG_TIMESTAMP_FORMAT = env.str("LOG_TIMESTAMP_FORMAT", "iso").lower()
+LOG_JSON_SERIALIZER = env.str("LOG_JSON_SERIALIZER", "auto").lower()
+LOG_TRACEBACK_MAX_FRAMES = env.int("LOG_TRACEBACK_MAX_FRAMES", 40)
+LOG_TRACEBACK_MAX_BYTES = env.int("LOG_TRACEBACK_MAX_BYTES", 16384)
+LOG_TRACEBACK_LOCALS = env.bool("LOG_TRACEBACK_LOCALS", False)
+LOG_TRACEBACK_REPEAT_INTERVAL = env.float("LOG_TRACEBACK_REPEAT_INTERVAL", 300.0)
+LOG_ASYNC = env.bool("LOG_ASYNC", False)
+LOG_ASYNC_QUEUE_SIZE = env.int("LOG_ASYNC_QUEUE_SIZE", 10000)
+LOG_ASYNC_OVERFLOW = env.str("LOG_ASYNC_OVERFLOW", "block").lower()
+LOG_BUFFER_SIZE = env.int("LOG_BUFFER_SIZE", 0)
+LOG_BUFFER_FLUSH_INTERVAL = env.float("LOG_BUFFER_FLUSH_INTERVAL", 1.0)
+LOG_AGGREGATE = env.bool("LOG_AGGREGATE", False)
+LOG_METRICS = env.bool("LOG_METRICS", False)
+LOG_COMPACT_RECORDS = env.bool("LOG_COMPACT_RECORDS", False)
+LOG_FILE = env.str("LOG_FILE", "")
+LOG_FILE_MAX_BYTES = env.int("LOG_FILE_MAX_BYTES", 100 * 1024 * 1024)
+LOG_FILE_ROTATE_WHEN = env.str("LOG_FILE_ROTATE_WHEN", "")
+LOG_FILE_BACKUP_COUNT = env.int("LOG_FILE_BACKUP_COUNT", 10)
+LOG_FILE_COMPRESSION = env.str("LOG_FILE_COMPRESSION", "gzip").lower()
+LOG_LEVEL_FILE = env.str("LOG_LEVEL_FILE", "")
+LOG_LEVEL_REVERT_AFTER = env.float("LOG_LEVEL_REVERT_AFTER", 900.0)
+LOG_COALESCE_WINDOW = env.float("LOG_COALESCE_WINDOW", 0.0)
+LOG_REQUEST_BUFFER = env.bool("LOG_REQUEST_BUFFER", False)
+LOG_REQUEST_BUFFER_LEVEL = env.str("LOG_REQUEST_BUFFER_LEVEL", "DEBUG").upper()
+LOG_REQUEST_BUFFER_SIZE = env.int("LOG_REQUEST_BUFFER_SIZE", 200)
+LOG_REQUEST_BUFFER_MAX_RECORDS = env.int("LOG_REQUEST_BUFFER_MAX_RECORDS", 10000)
+LOG_ACCESS = env.bool("LOG_ACCESS", False)
+LOG_REQUEST_TIMING = env.bool("LOG_REQUEST_TIMING", False)
+LOG_SLOW_REQUEST_MS = env.float("LOG_SLOW_REQUEST_MS", 0.0)
 
 HANDLERS = {
     "JSON": "json",
@@ -62,6 +98,10 @@ HANDLERS = {
     "PLAIN": "plaintext",
 }
 LOG_HANDLER = HANDLERS.get(LOG_FORMAT, "json")
+# Records are written to LOG_FILE instead of stdout when it is set
+FILE_FORMATTER = "json" if LOG_HANDLER == "json" else "simple"
+if LOG_FILE:
+    LOG_HANDLER = "file"
 
 # According to the Python docs getLogRecordFactory and setLogRecordFactory get and set callables that create a
 # LogRecord, however in practice they return the LogRecord class and using a function instead of a class fails with
@@ -77,33 +117,259 @@ class RecordFactory(ORIGINAL_LOG_RECORD_CLASS):
     def __init__(self, *args: object, **kwargs: object) -> None:
         super().__init__(*args, **kwargs)
         self.requestID = current_request_id()
+        self.logContext = current_context()
 
 
-class SheLogRecord(logging.LogRecord):
-    requestID: str
+# The name RecordFactory is None, setLogRecordFactory returns None
+RECORD_CLASS: Any = logging.getLogRecordFactory()
 
+if LOG_COMPACT_RECORDS:
+    from .records import CompactLogRecord
 
-class SafeJsonEncoder(json.JSONEncoder):
-    def default(self, obj: object) -> Any:
-        try:
-            if isinstance(obj, (datetime.datetime, datetime.date)):
-                return obj.isoformat()
+    logging.setLogRecordFactory(CompactLogRecord)
+
+
+class Lazy:
+    """A log message or argument which is only computed if the record is formatted:
+
+    logger.debug(Lazy(lambda: f"State: {state.dump()}"))
+    logger.debug("State: %s", Lazy(expensive_dump, state))
+    """
 
-            return json.JSONEncoder.default(self, obj)
-        except Exception as e:
-            return f"{e} {repr(obj)}"
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable[..., Any], *args: Any) -> None:
+        self.func = func
+        self.args = args
+
+    def __str__(self) -> str:
+        return str(self.func(*self.args))
+
+    def __repr__(self) -> str:
+        return repr(self.func(*self.args))
+
+
+class SheLogRecord(logging.LogRecord):
+    requestID: str
 
 
 class SafeJson:
-    def dumps(self, data: object) -> str:
-        return json.dumps(data, cls=SafeJsonEncoder)
+    """Serializes log records with the named backend, see she_logging.serializers
+
+    Raises ValueError for an unknown backend name.
+    """
+
+    def __init__(self, serializer: str = "auto") -> None:
+        self.serializer = serializer
+        self._dumps: Dumps = get_serializer(serializer)
+
+    def dumps(self, data: object, **kwargs: Any) -> str:
+        # Extra arguments (json_log_formatter passes `default`) are ignored, the
+        # backends always handle unserializable objects.
+        return self._dumps(data)
+
+
+REQUEST_HEADER_KEYS = ("X-Client", "X-Version")
+
+FieldSpec = Union[str, Dict[str, str]]
+FieldGetter = Callable[[logging.LogRecord, str], Any]
+
+# Attributes added by she_logging which are never written as part of `extra`
+SHE_RECORD_ATTRS = {"requestID", "logContext", "excId"}
+
+_ALWAYS, _IF_SET, _MERGE = range(3)
+
+
+class FieldPlan:
+    """The fields written by CustomisedJSONFormatter, compiled once from its `fields` option.
+
+    Each field is either a name, or a single item mapping of output name to source.
+    Sources are LogRecord attributes or one of:
+
+    - message: the formatted message
+    - timestamp: the time the record was created, see she_logging.timestamps
+    - exc_info: the formatted exception, omitted if there isn't one
+    - exc_id: identifies the type and location of the exception, see
+      she_logging.tracebacks
+    - header:<name>: a Flask request header, omitted if not present
+    - extra: every field bound with she_logging.context and attribute passed with
+      `extra=` that is not otherwise written
+    """
+
+    def __init__(
+        self,
+        fields: Sequence[FieldSpec],
+        format_exception: Callable[[Any], str],
+        format_timestamp: Callable[[float], Timestamp],
+    ) -> None:
+        self._format_exception = format_exception
+        self._format_timestamp = format_timestamp
+        self._excluded = set(json_log_formatter.BUILTIN_ATTRS) | SHE_RECORD_ATTRS
+        self.steps: List[Tuple[str, FieldGetter, int]] = []
+        # Request headers written by the plan
+        self.headers: List[str] = []
+
+        for field in fields:
+            if isinstance(field, str):
+                name = source = field
+                if source.startswith("header:"):
+                    name = source[len("header:") :]
+            elif isinstance(field, dict) and len(field) == 1:
+                [(name, source)] = field.items()
+            else:
+                raise ValueError(f"Invalid log field {field!r}")
+            self.steps.append(self._compile(name, source))
+
+    def _compile(self, name: str, source: str) -> Tuple[str, FieldGetter, int]:
+        if source == "message":
+            return name, lambda record, message: message, _ALWAYS
+        if source == "timestamp":
+            format_timestamp = self._format_timestamp
+            return (
+                name,
+                lambda record, message: format_timestamp(record.created),
+                _ALWAYS,
+            )
+        if source == "exc_info":
+            format_exception = self._format_exception
+            return (
+                name,
+                lambda record, message: format_exception(record.exc_info)
+                if record.exc_info
+                else record.exc_text,
+                _IF_SET,
+            )
+        if source == "exc_id":
+            return (
+                name,
+                lambda record, message: exception_id(record.exc_info)
+                if record.exc_info
+                else getattr(record, "excId", None),
+                _IF_SET,
+            )
+        if source == "extra":
+            excluded = self._excluded
+
+            def get_extra(record: logging.LogRecord, message: str) -> dict:
+                extra = {
+                    key: value
+                    for key, value in record.__dict__.items()
+                    if key not in excluded
+                }
+                return with_context(record, extra)
+
+            return name, get_extra, _MERGE
+        if source.startswith("header:"):
+            header = source[len("header:") :]
+            self._excluded.add(header)
+            self.headers.append(header)
+
+            def get_header(record: logging.LogRecord, message: str) -> Any:
+                # Headers were copied onto the record if it was queued (LOG_ASYNC),
+                # see BoundedQueueHandler.prepare
+                value = getattr(record, header, None)
+                if value is None:
+                    request = flask_request()
+                    if request:
+                        value = request.headers.get(header)
+                return value
+
+            return name, get_header, _IF_SET
+
+        self._excluded.add(source)
+        return name, lambda record, message: getattr(record, source, None), _ALWAYS
+
+    def extract(self, record: logging.LogRecord, message: str) -> dict:
+        data: dict = {}
+        for name, getter, kind in self.steps:
+            value = getter(record, message)
+            if kind == _ALWAYS:
+                data[name] = value
+            elif kind == _MERGE:
+                data.update(value)
+            elif value is not None:
+                data[name] = value
+        return data
+
+
+def with_context(record: logging.LogRecord, extra: dict) -> dict:
+    """Fields bound to the record's context (see she_logging.context) merged with extra."""
+    context = getattr(record, "logContext", EMPTY_CONTEXT)
+    if not context:
+        return extra
+    return {**context.fields, **extra}
+
+
+def request_header_keys(formatter: Optional[logging.Formatter]) -> Tuple[str, ...]:
+    """Names of the Flask request headers the formatter may write."""
+    field_plan: Optional[FieldPlan] = getattr(formatter, "field_plan", None)
+    if field_plan is None:
+        return REQUEST_HEADER_KEYS
+    return tuple(field_plan.headers)
 
 
 class CustomisedJSONFormatter(json_log_formatter.JSONFormatter):
-    json_lib = SafeJson()
+    json_lib: SafeJson
+    field_plan: Optional[FieldPlan] = None
+
+    def __init__(
+        self,
+        *args: Any,
+        serializer: Optional[str] = None,
+        fields: Optional[Sequence[FieldSpec]] = None,
+        timestamp_format: str = LOG_TIMESTAMP_FORMAT,
+        traceback_max_frames: int = LOG_TRACEBACK_MAX_FRAMES,
+        traceback_max_bytes: int = LOG_TRACEBACK_MAX_BYTES,
+        traceback_locals: bool = LOG_TRACEBACK_LOCALS,
+        traceback_repeat_interval: float = LOG_TRACEBACK_REPEAT_INTERVAL,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.timestamps = TimestampCache(timestamp_format)
+        self.tracebacks = TracebackRenderer(
+            max_frames=traceback_max_frames,
+            max_bytes=traceback_max_bytes,
+            show_locals=traceback_locals,
+            repeat_interval=traceback_repeat_interval,
+        )
+        self.json_lib = SafeJson(
+            LOG_JSON_SERIALIZER if serializer is None else serializer
+        )
+        if fields is not None:
+            self.field_plan = FieldPlan(
+                fields, self.formatException, self.timestamps.format
+            )
+
+    def formatException(self, ei: Any) -> str:
+        return self.tracebacks.render(ei)[0]
+
+    def extra_from_record(self, record: logging.LogRecord) -> dict:
+        extra = super().extra_from_record(record)
+        extra.pop("logContext", None)
+        return with_context(record, extra)
+
+    def format(self, record: logging.LogRecord) -> str:
+        if self.field_plan is None:
+            return super().format(record)
+        return self.to_json(self.field_plan.extract(record, record.getMessage()))
+
+    def to_json(self, record: dict) -> str:
+        try:
+            return self.json_lib.dumps(record)
+        except (TypeError, ValueError, OverflowError):
+            return "{}"
 
     def json_record(self, message: str, extra: dict, record: SheLogRecord) -> dict:
-        super().json_record(message, extra, record)
+        if "time" not in extra:
+            extra["time"] = self.timestamps.format(record.created)
+        extra["message"] = message
+        if record.exc_info:
+            extra["exc_info"], extra["excId"] = self.tracebacks.render(
+                record.exc_info
+            )
+        elif record.exc_text:
+            # Formatted before the record was sent from another process
+            extra["exc_info"] = record.exc_text
 
         extra.update(
             {
@@ -116,11 +382,13 @@ class CustomisedJSONFormatter(json_log_formatter.JSONFormatter):
             }
         )
 
+        request = flask_request()
         if request:
-            header_keys = ["X-Client", "X-Version"]
-            for key in header_keys:
-                if key in request.headers:
-                    extra[key] = request.headers[key]
+            headers = request.headers
+            for key in REQUEST_HEADER_KEYS:
+                value = headers.get(key)
+                if value is not None:
+                    extra[key] = value
 
         return extra
 
@@ -130,37 +398,74 @@ SIMPLE_FORMAT = (
 )
 RICH_FORMAT = "[%(requestID)s] %(message)s"
 
+SHE_FILTERS, HANDLER_FILTERS = she_filters(
+    rate_limit=env.float("LOG_RATE_LIMIT", 0),
+    burst=env.int("LOG_RATE_LIMIT_BURST", 20),
+    sample_debug=env.float("LOG_SAMPLE_RATE_DEBUG", 1.0),
+    sample_info=env.float("LOG_SAMPLE_RATE_INFO", 1.0),
+)
+
+# Handler class and arguments for the json and plaintext handlers
+STREAM_HANDLER: Dict[str, Any] = {"class": "logging.StreamHandler"}
+if LOG_BUFFER_SIZE > 0:
+    STREAM_HANDLER = {
+        "class": "she_logging.handlers.BufferedStreamHandler",
+        "buffer_size": LOG_BUFFER_SIZE,
+        "flush_interval": LOG_BUFFER_FLUSH_INTERVAL,
+    }
+
 RICH_HANDLER = {
     "class": "rich.logging.RichHandler",
     "formatter": "rich",
     "rich_tracebacks": True,
     "tracebacks_show_locals": LOG_LOCALS,
     "tracebacks_word_wrap": False,
+    "filters": HANDLER_FILTERS,
 }
 PLAINTEXT_HANDLER = {
-    "class": "logging.StreamHandler",
+    **STREAM_HANDLER,
     "stream": "ext://sys.stdout",
     "formatter": "simple",
+    "filters": HANDLER_FILTERS,
 }
 if not HAVE_RICH:
     RICH_HANDLER = PLAINTEXT_HANDLER
+FILE_HANDLER = {
+    "class": "she_logging.files.RotatingFileHandler",
+    "filename": LOG_FILE,
+    "max_bytes": LOG_FILE_MAX_BYTES,
+    "when": LOG_FILE_ROTATE_WHEN,
+    "backup_count": LOG_FILE_BACKUP_COUNT,
+    "compression": LOG_FILE_COMPRESSION,
+    "buffer_size": LOG_BUFFER_SIZE if LOG_BUFFER_SIZE > 0 else 65536,
+    "flush_interval": LOG_BUFFER_FLUSH_INTERVAL,
+    "formatter": FILE_FORMATTER,
+    "filters": HANDLER_FILTERS,
+}
 
 SHE_LOGGING_CONFIG: Dict[str, Any] = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
         "json": {"()": CustomisedJSONFormatter},
-        "simple": {"format": SIMPLE_FORMAT},
+        "simple": {
+            "class": "she_logging.plaintext.PlaintextFormatter",
+            "format": SIMPLE_FORMAT,
+        },
         "rich": {"format": RICH_FORMAT},
     },
+    "filters": SHE_FILTERS,
     "handlers": {
         "json": {
-            "class": "logging.StreamHandler",
+            **STREAM_HANDLER,
             "stream": "ext://sys.stdout",
             "formatter": "json",
+            "filters": HANDLER_FILTERS,
         },
         "plaintext": PLAINTEXT_HANDLER,
         "colour": RICH_HANDLER,
+        # Only configured when LOG_FILE is set, there is no default file name
+        **({"file": FILE_HANDLER} if LOG_FILE else {}),
     },
     "root": {"level": LOG_LEVEL, "handlers": [LOG_HANDLER]},
     "loggers": {
@@ -179,24 +484,69 @@ SHE_LOGGING_CONFIG: Dict[str, Any] = {
             "propagate": False,
         },
         "uvicorn.error": {"level": env.str("LOG_LEVEL_UVICORN_ERROR", "INFO")},
+        # Structured access records, see she_logging.access_log
+        "access": {"level": env.str("LOG_LEVEL_ACCESS", "INFO")},
     },
 }
 
 
+LEVEL_METHODS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "warn": logging.WARNING,
+    "error": logging.ERROR,
+    "exception": logging.ERROR,
+    "critical": logging.CRITICAL,
+    "fatal": logging.CRITICAL,
+}
+
+
+def _disabled(*args: Any, **kwargs: Any) -> None:
+    pass
+
+
 class LogProxy:
+    """Logger which is looked up (and logging initialised) on first use.
+
+    Logging methods for disabled levels are replaced by a function which does nothing.
+    They are looked up again when she_logging changes logger levels (init_logging,
+    she_logging.levels), call invalidate_all() after changing them otherwise.
+    """
+
     _logger: Optional[Logger] = None
     _name: str
+    _proxies: "weakref.WeakSet[LogProxy]" = weakref.WeakSet()
 
     def __init__(self, name: str = "root") -> None:
         self._name = name
+        LogProxy._proxies.add(self)
 
-    def __getattr__(self, item: str) -> Any:
+    def _get_logger(self) -> Logger:
         if self._logger is None:
             self._logger = getLogger(self._name)
-        attr = getattr(self._logger, item)
+        return self._logger
+
+    def __getattr__(self, item: str) -> Any:
+        logger = self._get_logger()
+        level = LEVEL_METHODS.get(item)
+        if level is not None and not logger.isEnabledFor(level):
+            attr: Any = _disabled
+        else:
+            attr = getattr(logger, item)
         setattr(self, item, attr)
         return attr
 
+    def _invalidate(self) -> None:
+        for name in LEVEL_METHODS:
+            self.__dict__.pop(name, None)
+
+    @classmethod
+    def invalidate_all(cls) -> None:
+        """Forget cached level checks, called when logger levels change."""
+        for proxy in list(cls._proxies):
+            proxy._invalidate()
+
 
 logger = LogProxy("root")
 
@@ -204,7 +554,7 @@ logger = LogProxy("root")
 def init_logging(config: Union[str, Path, Dict, None] = None) -> bool:
     global _initialised
 
-    if "she-logging" in logging.Logger.manager.loggerDict:  # type:ignore
+    if "she-logging" in logging.Logger.manager.loggerDict:  # type: ignore
         # she-logging configuration has already been applied, don't overwrite it
         _initialised = True
         return False
@@ -224,14 +574,63 @@ def init_logging(config: Union[str, Path, Dict, None] = None) -> bool:
 
     _initialised = True
     log_config: Dict = SHE_LOGGING_CONFIG
+    cache_key: Optional[CacheKey] = None
 
     if isinstance(config, Dict):
         log_config = config
     elif isinstance(config, (str, Path)):
-        with Path(config).open() as file:
-            log_config = yaml.safe_load(file)
+        log_config, cache_key = load_config(config)
+    else:
+        # Only create the handler in use, the others may import optional packages
+        log_config = {
+            **log_config,
+            "handlers": {LOG_HANDLER: log_config["handlers"][LOG_HANDLER]},
+        }
+
+    from logging.config import dictConfig
+
+    dictConfig(log_config)
+    if cache_key is not None:
+        store_config(cache_key, log_config)
+    LogProxy.invalidate_all()
+
+    if LOG_METRICS:
+        from .metrics import instrument_handlers
+
+        instrument_handlers()
+
+    if LOG_ASYNC:
+        from .async_logging import start_async_logging
+
+        start_async_logging(LOG_ASYNC_QUEUE_SIZE, LOG_ASYNC_OVERFLOW)
+
+    if LOG_COALESCE_WINDOW > 0:
+        from .coalescing import coalesce_handlers
+
+        # After LOG_ASYNC, repeats are counted by the caller, before the queue
+        # handler merges the message with its arguments
+        coalesce_handlers(LOG_COALESCE_WINDOW)
+
+    if LOG_REQUEST_BUFFER:
+        from .request_buffer import install_request_buffer
+
+        # After LOG_ASYNC, records are buffered before they are queued
+        install_request_buffer(
+            LOG_LEVEL,
+            LOG_REQUEST_BUFFER_LEVEL,
+            LOG_REQUEST_BUFFER_SIZE,
+            LOG_REQUEST_BUFFER_MAX_RECORDS,
+        )
+
+    if LOG_REQUEST_TIMING:
+        from .request_timing import install_request_timing
+
+        install_request_timing(LOG_SLOW_REQUEST_MS)
+
+    if LOG_LEVEL_FILE:
+        from .levels import install_reload_signal
 
-    logging.config.dictConfig(log_config)
+        install_reload_signal(LOG_LEVEL_FILE)
 
     return True
 
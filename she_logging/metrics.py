@@ -0,0 +1,271 @@
+"""Counters and latency samples for the she_logging handlers
+
+When enabled (environment variable LOG_METRICS, or instrument_handlers()) each
+configured handler counts the records it writes by logger and level, and the bytes
+it writes, and samples how long formatting and emitting (including formatting) take.
+
+Each thread updates its own counters so the logging path takes no locks. Latencies
+are kept in a fixed size reservoir sample per handler and thread, which snapshot()
+merges into quantiles. prometheus_text() renders a snapshot in the Prometheus text
+format, add_flask_metrics and add_fastapi_metrics serve it from an application.
+"""
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+RESERVOIR_SIZE = 1024
+QUANTILES = (0.5, 0.9, 0.99)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Snapshot = Dict[str, Any]
+
+
+class Reservoir:
+    """Count, total and a uniform random sample of up to `size` values.
+
+    Once the sample is full the index of the next value to keep is drawn in advance
+    (Li's algorithm L), so most values only update the count and total.
+    """
+
+    __slots__ = ("size", "count", "total", "maximum", "samples", "_next", "_weight")
+
+    def __init__(self, size: int = RESERVOIR_SIZE) -> None:
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.samples: List[float] = []
+        self._next = size
+        self._weight = 1.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+        if self.count <= self.size:
+            self.samples.append(value)
+            if self.count < self.size:
+                return
+        elif self.count < self._next:
+            return
+        else:
+            self.samples[int(random.random() * self.size)] = value
+        self._weight *= math.exp(math.log(1.0 - random.random()) / self.size)
+        self._next = self.count + 1
+        self._next += int(math.log(1.0 - random.random()) / math.log1p(-self._weight))
+
+
+class _ThreadMetrics:
+    __slots__ = ("records", "bytes", "format", "emit")
+
+    def __init__(self) -> None:
+        self.records: Dict[Tuple[str, str, str], int] = {}
+        self.bytes: Dict[str, int] = {}
+        self.format: Dict[str, Reservoir] = {}
+        self.emit: Dict[str, Reservoir] = {}
+
+
+_local = threading.local()
+_all_metrics: List[_ThreadMetrics] = []
+_all_metrics_lock = threading.Lock()
+
+
+def _thread_metrics() -> _ThreadMetrics:
+    try:
+        return _local.metrics
+    except AttributeError:
+        metrics = _local.metrics = _ThreadMetrics()
+        with _all_metrics_lock:
+            _all_metrics.append(metrics)
+        return metrics
+
+
+def instrument_handler(handler: logging.Handler, name: Optional[str] = None) -> None:
+    """Count and time the records written by handler, labelled `name`."""
+    if getattr(handler, "_she_metrics", None) is not None:
+        return
+    label = name or handler.get_name() or type(handler).__name__
+    handler._she_metrics = label  # type: ignore[attr-defined]
+    terminator = len(getattr(handler, "terminator", ""))
+    timer = time.perf_counter
+    format_record = handler.format
+    emit_record = handler.emit
+
+    def format(record: logging.LogRecord) -> str:
+        start = timer()
+        text = format_record(record)
+        elapsed = timer() - start
+        metrics = _thread_metrics()
+        reservoir = metrics.format.get(label)
+        if reservoir is None:
+            reservoir = metrics.format[label] = Reservoir()
+        reservoir.add(elapsed)
+        metrics.bytes[label] = (
+            metrics.bytes.get(label, 0) + len(text.encode("utf-8")) + terminator
+        )
+        return text
+
+    def emit(record: logging.LogRecord) -> None:
+        start = timer()
+        emit_record(record)
+        elapsed = timer() - start
+        metrics = _thread_metrics()
+        reservoir = metrics.emit.get(label)
+        if reservoir is None:
+            reservoir = metrics.emit[label] = Reservoir()
+        reservoir.add(elapsed)
+        key = (label, record.name, record.levelname)
+        metrics.records[key] = metrics.records.get(key, 0) + 1
+
+    handler.format = format  # type: ignore[assignment]
+    handler.emit = emit  # type: ignore[assignment]
+
+
+def instrument_handlers(loggers: Optional[Iterable[logging.Logger]] = None) -> None:
+    """Instrument the handlers of the given loggers, by default all configured loggers."""
+    from .async_logging import _configured_loggers
+
+    for logger in _configured_loggers() if loggers is None else loggers:
+        for handler in logger.handlers:
+            instrument_handler(handler)
+
+
+def _merge(reservoirs: List[Reservoir]) -> Dict[str, float]:
+    samples = sorted(value for reservoir in reservoirs for value in reservoir.samples)
+    summary = {
+        "count": sum(reservoir.count for reservoir in reservoirs),
+        "sum": sum(reservoir.total for reservoir in reservoirs),
+        "max": max(reservoir.maximum for reservoir in reservoirs),
+    }
+    for quantile in QUANTILES:
+        summary[str(quantile)] = (
+            samples[min(int(len(samples) * quantile), len(samples) - 1)]
+            if samples
+            else 0.0
+        )
+    return summary
+
+
+def snapshot() -> Snapshot:
+    """Totals across all threads: record counts by (handler, logger, level), bytes and
+    format and emit latencies (seconds) by handler."""
+    with _all_metrics_lock:
+        all_metrics = list(_all_metrics)
+
+    records: Dict[Tuple[str, str, str], int] = {}
+    written: Dict[str, int] = {}
+    latencies: Dict[str, Dict[str, List[Reservoir]]] = {"format": {}, "emit": {}}
+    for metrics in all_metrics:
+        # Copies, another thread may be adding keys
+        for key, count in list(metrics.records.items()):
+            records[key] = records.get(key, 0) + count
+        for label, count in list(metrics.bytes.items()):
+            written[label] = written.get(label, 0) + count
+        for kind, reservoirs in (("format", metrics.format), ("emit", metrics.emit)):
+            for label, reservoir in list(reservoirs.items()):
+                latencies[kind].setdefault(label, []).append(reservoir)
+
+    return {
+        "records": [
+            {"handler": handler, "logger": logger, "level": level, "count": count}
+            for (handler, logger, level), count in sorted(records.items())
+        ],
+        "bytes": written,
+        "format_seconds": {
+            label: _merge(reservoirs)
+            for label, reservoirs in latencies["format"].items()
+        },
+        "emit_seconds": {
+            label: _merge(reservoirs) for label, reservoirs in latencies["emit"].items()
+        },
+    }
+
+
+def reset() -> None:
+    """Discard all counters and samples."""
+    with _all_metrics_lock:
+        for metrics in _all_metrics:
+            metrics.__init__()  # type: ignore[misc]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def prometheus_text(data: Optional[Snapshot] = None) -> str:
+    """A snapshot (by default a new one) in the Prometheus text exposition format."""
+    if data is None:
+        data = snapshot()
+    lines = [
+        "# HELP she_logging_records_total Log records written.",
+        "# TYPE she_logging_records_total counter",
+    ]
+    for row in data["records"]:
+        labels = _labels(
+            handler=row["handler"], logger=row["logger"], level=row["level"]
+        )
+        lines.append(f"she_logging_records_total{{{labels}}} {row['count']}")
+
+    lines += [
+        "# HELP she_logging_bytes_total Bytes of formatted log output.",
+        "# TYPE she_logging_bytes_total counter",
+    ]
+    for label, count in sorted(data["bytes"].items()):
+        lines.append(f"she_logging_bytes_total{{{_labels(handler=label)}}} {count}")
+
+    for kind, description in (
+        ("format", "Time to format a log record."),
+        ("emit", "Time to format and write a log record."),
+    ):
+        metric = f"she_logging_{kind}_seconds"
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} summary"]
+        for label, summary in sorted(data[f"{kind}_seconds"].items()):
+            for quantile in QUANTILES:
+                labels = _labels(handler=label, quantile=str(quantile))
+                lines.append(f"{metric}{{{labels}}} {summary[str(quantile)]!r}")
+            labels = _labels(handler=label)
+            lines.append(f"{metric}_sum{{{labels}}} {summary['sum']!r}")
+            lines.append(f"{metric}_count{{{labels}}} {summary['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def add_flask_metrics(app: Any, path: str = "/metrics") -> None:
+    """Serve prometheus_text() from a Flask app."""
+    from flask import Response
+
+    def she_logging_metrics() -> Response:
+        return Response(prometheus_text(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_url_rule(path, "she_logging_metrics", she_logging_metrics)
+
+
+def add_fastapi_metrics(app: Any, path: str = "/metrics") -> None:
+    """Serve prometheus_text() from a FastAPI (or Starlette) app."""
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    async def she_logging_metrics(request: Request) -> Response:
+        return Response(prometheus_text(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+    app.add_route(path, she_logging_metrics, include_in_schema=False)
+
+
+def _after_fork_in_child() -> None:
+    # Counters inherited from the parent process belong to the parent
+    global _all_metrics_lock
+    _all_metrics_lock = threading.Lock()
+    _all_metrics.clear()
+    _local.__dict__.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,107 @@
+"""Compiled %-style formatter for the plaintext handler
+
+logging.Formatter interpolates the format string with the record's __dict__ for every
+record, after computing `message` and `asctime`. PlaintextFormatter produces the same
+output, but when it is created it compiles the format string into:
+
+- a template with positional conversions, `[%(asctime)s] %(levelname)-8s` becomes
+  `[%s] %-8s`, each conversion keeping its flags, width and precision
+- one operator.attrgetter fetching the referenced record attributes as a tuple
+
+so formatting a record is one attribute fetch and one interpolation. `message` and
+`asctime` are only computed when the format uses them, `asctime` reuses the date and
+time cached by CachedTimeFormatter.
+
+Formats using `{` or `$` style, or defaults (Python 3.10+), are formatted as by
+logging.Formatter.
+"""
+import logging
+import re
+from operator import attrgetter
+from typing import Any, Callable, List, Optional, Tuple
+
+from .timestamps import CachedTimeFormatter
+
+# As logging.PercentStyle.validation_pattern without `*` widths, capturing the name
+FIELD_PATTERN = re.compile(
+    r"%\((?P<name>\w+)\)(?P<spec>[#0+ -]*\d*(?:\.\d+)?[diouxefgcrsa%])", re.I
+)
+
+Values = Callable[[logging.LogRecord], Tuple[Any, ...]]
+
+
+def compile_format(fmt: str) -> Optional[Tuple[str, List[str]]]:
+    """The positional template and the field names in the order they are used, None
+    if the format can't be compiled."""
+    names: List[str] = []
+
+    def positional(match: "re.Match[str]") -> str:
+        names.append(match.group("name"))
+        return "%" + match.group("spec")
+
+    parts = [FIELD_PATTERN.sub(positional, part) for part in fmt.split("%%")]
+    if any("%(" in part for part in parts):
+        return None
+    return "%%".join(parts), names
+
+
+def _values(names: List[str]) -> Values:
+    if not names:
+        return lambda record: ()
+    if len(names) == 1:
+        get = attrgetter(names[0])
+        return lambda record: (get(record),)
+    return attrgetter(*names)
+
+
+class PlaintextFormatter(CachedTimeFormatter):
+    """logging.Formatter producing identical output from a format compiled once, see
+    the module documentation."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._template: Optional[str] = None
+        style = self._style
+        compiled = None
+        if type(style) is logging.PercentStyle and not getattr(
+            style, "_defaults", None
+        ):
+            compiled = compile_format(style._fmt)
+        if compiled is not None:
+            self._template, self._names = compiled
+            self._values = _values(self._names)
+            self._uses_message = "message" in self._names
+            self._uses_time = "asctime" in self._names
+
+    def format(self, record: logging.LogRecord) -> str:
+        if self._template is None:
+            return super().format(record)
+
+        if self._uses_message:
+            record.message = record.getMessage()
+        if self._uses_time:
+            record.asctime = self.formatTime(record, self.datefmt)
+        text = self.formatMessage(record)
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            if text[-1:] != "\n":
+                text += "\n"
+            text += record.exc_text
+        if record.stack_info:
+            if text[-1:] != "\n":
+                text += "\n"
+            text += self.formatStack(record.stack_info)
+        return text
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        if self._template is None:
+            return super().formatMessage(record)
+        try:
+            return self._template % self._values(record)
+        except AttributeError:
+            missing = [name for name in self._names if not hasattr(record, name)]
+            if not missing:
+                raise
+            raise ValueError(f"Formatting field not found in record: {missing[0]!r}")
@@ -0,0 +1,150 @@
+"""Compact log records
+
+The records created by she_logging's record factory keep their attributes in an
+instance dict, and each has its own `filename` and `module` strings. When many
+records are held at once (LOG_ASYNC queues, buffered handlers) CompactLogRecord uses
+less memory:
+
+- the standard LogRecord attributes, requestID, logContext and the `message` and
+  `asctime` set by formatters are stored in slots
+- `filename` and `module` are shared by all records logged from the same file
+- an instance dict is only created for attributes added with `extra=` (or by
+  handlers and filters)
+
+Enabled with the environment variable LOG_COMPACT_RECORDS. Code reading
+`record.__dict__` (logging.Formatter, json_log_formatter, makeRecord with `extra=`,
+SocketHandler) gets a RecordDict, a mutable mapping of the slots and the instance
+dict, which is slower to use than a dict.
+"""
+import logging
+import os
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Mapping, Tuple
+
+from .context import current_context
+from .request_id import current_request_id
+
+RECORD_SLOTS = (
+    "name",
+    "msg",
+    "args",
+    "levelname",
+    "levelno",
+    "pathname",
+    "filename",
+    "module",
+    "exc_info",
+    "exc_text",
+    "stack_info",
+    "lineno",
+    "funcName",
+    "created",
+    "msecs",
+    "relativeCreated",
+    "thread",
+    "threadName",
+    "processName",
+    "process",
+    "taskName",
+    "requestID",
+    "logContext",
+    "message",
+    "asctime",
+)
+_SLOT_SET = frozenset(RECORD_SLOTS)
+_MISSING = object()
+
+# The instance dict descriptor, hidden on CompactLogRecord by its __dict__ property
+_instance_dict = logging.LogRecord.__dict__["__dict__"].__get__
+
+_file_names: Dict[str, Tuple[str, str]] = {}
+
+
+def _file_name_and_module(pathname: str) -> Tuple[str, str]:
+    names = _file_names.get(pathname)
+    if names is None:
+        filename = os.path.basename(pathname)
+        names = _file_names[pathname] = (filename, os.path.splitext(filename)[0])
+    return names
+
+
+class RecordDict(MutableMapping):
+    """The attributes of a CompactLogRecord as a mapping, like an instance dict."""
+
+    __slots__ = ("_record",)
+
+    def __init__(self, record: "CompactLogRecord") -> None:
+        self._record = record
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _SLOT_SET:
+            value = getattr(self._record, key, _MISSING)
+            if value is _MISSING:
+                raise KeyError(key)
+            return value
+        return _instance_dict(self._record)[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _SLOT_SET:
+            return getattr(self._record, key, default)
+        return _instance_dict(self._record).get(key, default)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _SLOT_SET:
+            setattr(self._record, key, value)
+        else:
+            _instance_dict(self._record)[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key not in _SLOT_SET:
+            del _instance_dict(self._record)[key]
+            return
+        try:
+            delattr(self._record, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        record = self._record
+        for key in RECORD_SLOTS:
+            if hasattr(record, key):
+                yield key
+        yield from list(_instance_dict(record))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __or__(self, other: Mapping[str, Any]) -> Dict[str, Any]:
+        return {**self, **other}
+
+    def __ror__(self, other: Mapping[str, Any]) -> Dict[str, Any]:
+        return {**other, **self}
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __repr__(self) -> str:
+        return f"RecordDict({dict(self)!r})"
+
+
+class CompactLogRecord(logging.LogRecord):
+    """LogRecord with its attributes in slots, see the module documentation."""
+
+    __slots__ = RECORD_SLOTS
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.filename, self.module = _file_name_and_module(self.pathname)
+        self.requestID = current_request_id()
+        self.logContext = current_context()
+
+    @property  # type: ignore[override]
+    def __dict__(self) -> RecordDict:  # type: ignore[override]
+        return RecordDict(self)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return dict(RecordDict(self))
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for key, value in state.items():
+            RecordDict(self)[key] = value
@@ -0,0 +1,242 @@
+"""Records below the log level kept for each request, written only if it fails
+
+When enabled (environment variable LOG_REQUEST_BUFFER) init_logging() calls
+install_request_buffer(): the root logger's level is lowered to
+LOG_REQUEST_BUFFER_LEVEL (default DEBUG) and a RequestBufferFilter is added to every
+configured handler.
+Records at LOG_LEVEL and above are written as before. Records below it are kept,
+unformatted, in a ring buffer for the current request, or dropped outside a request.
+
+The request ID middleware (RequestContextMiddleware, RequestIDMiddleware and
+she_logging.flask_request_id) starts a buffer for each request. The buffered records
+are written through the handlers they were buffered by, before the record that
+triggered it, when:
+
+- a record at ERROR or above is logged during the request (later records below the
+  log level are then written straight away),
+- the request raises an exception or the response status is 500 or above.
+
+Otherwise they are discarded at the end of the request. Each request keeps at most
+LOG_REQUEST_BUFFER_SIZE records (the oldest are discarded first) and no more than
+LOG_REQUEST_BUFFER_MAX_RECORDS are kept across all requests, further records are
+dropped until requests end.
+
+Loggers with a level of their own (e.g. set with she_logging.levels) are not
+buffered, their records are written as their level allows.
+
+The configured root level (LOG_LEVEL) is kept here as the level at which records
+are written, see root_level() and set_root_level(), which she_logging.levels uses to
+change the root level. Handlers added to the root logger after installing, such as
+pytest's caplog handler, get a RequestBufferFilter as well, so they too only see the
+records below that level if a request fails.
+"""
+import logging
+import threading
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Deque, Iterable, Optional, Tuple, Union
+
+from .logging import LogProxy
+
+_buffer_var: "ContextVar[Optional[RequestBuffer]]" = ContextVar(
+    "she_logging_request_buffer", default=None
+)
+_lock = threading.Lock()
+_installed = False
+# The configured root level, records below it are buffered, and the lowest level
+# buffered, the root logger's own level is the lower of the two
+_level = logging.WARNING
+_capture_level = logging.DEBUG
+_size = 200
+_max_records = 10000
+# Records held by all requests' buffers
+_held = 0
+
+
+class RequestBuffer:
+    """The records below the log level for one request, see the module documentation."""
+
+    __slots__ = ("records", "flushed")
+
+    def __init__(self, size: int) -> None:
+        self.records: Deque[Tuple[logging.Handler, logging.LogRecord]] = deque(
+            maxlen=size
+        )
+        self.flushed = False
+
+    def add(self, handler: logging.Handler, record: logging.LogRecord) -> None:
+        global _held
+        records = self.records
+        if len(records) < (records.maxlen or 0):
+            with _lock:
+                if _held >= _max_records:
+                    return
+                _held += 1
+        records.append((handler, record))
+
+    def flush(self) -> None:
+        """Write the buffered records and stop buffering."""
+        self.flushed = True
+        for handler, record in self._take():
+            handler.acquire()
+            try:
+                # Filters ran when the record was buffered
+                handler.emit(record)
+            finally:
+                handler.release()
+
+    def discard(self) -> None:
+        self._take()
+
+    def _take(self) -> Iterable[Tuple[logging.Handler, logging.LogRecord]]:
+        global _held
+        records = list(self.records)
+        self.records.clear()
+        if records:
+            with _lock:
+                _held -= len(records)
+        return records
+
+
+class RequestBufferFilter(logging.Filter):
+    """Buffers the records below the configured root level during a request, see the
+    module documentation. Records at `flush_level` and above flush the request's
+    buffer.
+    """
+
+    def __init__(self, handler: logging.Handler, flush_level: int = logging.ERROR):
+        super().__init__()
+        self.handler = handler
+        self.flush_level = flush_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        levelno = record.levelno
+        if levelno >= _level:
+            if levelno >= self.flush_level:
+                buffer = _buffer_var.get()
+                if buffer is not None and not buffer.flushed:
+                    buffer.flush()
+            return True
+        if _has_own_level(record.name):
+            return True
+        buffer = _buffer_var.get()
+        if buffer is None:
+            return False
+        if buffer.flushed:
+            return True
+        buffer.add(self.handler, record)
+        return False
+
+
+def _add_filter(handler: logging.Handler) -> None:
+    if not any(isinstance(item, RequestBufferFilter) for item in handler.filters):
+        handler.addFilter(RequestBufferFilter(handler))
+
+
+class _BufferedRootLogger(logging.RootLogger):
+    """The root logger's class once buffering is installed, handlers added to it
+    are filtered too.
+    """
+
+    def addHandler(self, hdlr: logging.Handler) -> None:
+        super().addHandler(hdlr)
+        _add_filter(hdlr)
+
+
+def _has_own_level(name: str) -> bool:
+    """Whether a logger's effective level is set by it or a parent, not the root."""
+    logger: Any = logging.Logger.manager.loggerDict.get(name)
+    while logger is not None and logger is not logging.root:
+        if getattr(logger, "level", logging.NOTSET):
+            return True
+        logger = getattr(logger, "parent", None)
+    return False
+
+
+def install_request_buffer(
+    level: Optional[Union[int, str]] = None,
+    capture_level: Union[int, str] = logging.DEBUG,
+    size: int = 200,
+    max_records: int = 10000,
+    loggers: Optional[Iterable[logging.Logger]] = None,
+) -> None:
+    """Buffer the records below `level` (the root logger's level by default) down to
+    `capture_level`, for the handlers of the given loggers (default all configured
+    loggers) and those added to the root logger later.
+    """
+    from .async_logging import _configured_loggers
+
+    global _installed, _level, _capture_level, _size, _max_records
+    root = logging.getLogger()
+    _level = _check_level(root_level() if level is None else level)
+    _capture_level = _check_level(capture_level)
+    _size, _max_records = size, max_records
+    for logger in _configured_loggers() if loggers is None else loggers:
+        for handler in logger.handlers:
+            _add_filter(handler)
+    if type(root) is logging.RootLogger:
+        root.__class__ = _BufferedRootLogger
+    _installed = True
+    root.setLevel(min(_level, _capture_level))
+    LogProxy.invalidate_all()
+
+
+def root_level() -> int:
+    """The configured root level. While buffering is installed the root logger's
+    own level is lowered so that the records below it are created.
+    """
+    return _level if _installed else logging.getLogger().level
+
+
+def set_root_level(level: Union[int, str]) -> None:
+    """Set the root level, keeping the root logger's own level low enough for the
+    buffered records while buffering is installed.
+    """
+    global _level
+    checked = _check_level(level)
+    if _installed:
+        _level = checked
+        checked = min(checked, _capture_level)
+    logging.getLogger().setLevel(checked)
+    LogProxy.invalidate_all()
+
+
+def _check_level(level: Union[int, str]) -> int:
+    return logging._checkLevel(level)  # type: ignore[attr-defined,no-any-return]
+
+
+def start_request_buffer() -> Optional[Token]:
+    """Start buffering for the current request, returns a token for
+    end_request_buffer, or None if buffering is not installed.
+    """
+    if not _installed:
+        return None
+    return _buffer_var.set(RequestBuffer(_size))
+
+
+def end_request_buffer(token: Optional[Token], failed: bool) -> None:
+    """Write the request's buffered records if it failed, discard them otherwise."""
+    if token is None:
+        return
+    buffer = _buffer_var.get()
+    _buffer_var.reset(token)
+    if buffer is None:
+        return
+    if failed:
+        buffer.flush()
+    else:
+        buffer.discard()
+
+
+def flush_request_buffer() -> None:
+    """Write the current request's buffered records now, and any later ones below the
+    log level as they are logged.
+    """
+    buffer = _buffer_var.get()
+    if buffer is not None:
+        buffer.flush()
+
+
+def held_records() -> int:
+    """Number of records held by all requests' buffers."""
+    return _held
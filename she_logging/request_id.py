@@ -1,37 +1,54 @@
+import itertools
+import os
+import sys
+import time
 from contextvars import ContextVar, Token
-from typing import Any, Optional
+from importlib.util import find_spec
+from typing import Any, Callable, Iterator, Optional
+from uuid import uuid4
 
-try:
-    from flask_log_request_id import current_request_id as flask_request_id
-except ImportError:
-    FLASK_AVAILABLE = False
-    flask_request_id = None
-else:
-    FLASK_AVAILABLE = True
+# flask_log_request_id imports flask, it is only imported once the application has
+FLASK_AVAILABLE: bool = find_spec("flask_log_request_id") is not None
+flask_request_id: Optional[Callable[[], Optional[str]]] = None
 
 
 REQUEST_ID_UNSET = object()
 
+# Cleared by she_logging.flask_request_id.init_app, which sets the context variable
+_flask_fallback: bool = True
+
 
 _request_id_context_var: ContextVar = ContextVar("requestID", default=REQUEST_ID_UNSET)
 
 
 def current_request_id() -> Optional[str]:
     """Returns request ID as set in current context,
-    otherwise returns flask request ID if we have flask
+    otherwise returns flask request ID if we have flask (unless
+    she_logging.flask_request_id sets the context for each request)
     otherwise returns None
     """
     request_id: Any = _request_id_context_var.get()
 
     if request_id is REQUEST_ID_UNSET:
-        if FLASK_AVAILABLE:
-            request_id = flask_request_id()
+        if FLASK_AVAILABLE and _flask_fallback:
+            request_id = _flask_request_id()
         else:
             request_id = None
 
     return request_id
 
 
+def _flask_request_id() -> Optional[str]:
+    global flask_request_id
+    if flask_request_id is None:
+        if "flask" not in sys.modules:
+            return None
+        from flask_log_request_id import current_request_id
+
+        flask_request_id = current_request_id
+    return flask_request_id()
+
+
 def set_request_id(requestId: str) -> Token:
     """Set the current request ID, returns a token"""
     return _request_id_context_var.set(requestId)
@@ -40,3 +57,45 @@ def set_request_id(requestId: str) -> Token:
 def reset_request_id(token: Token) -> None:
     """Reset the request ID using the token returned from set_request_id"""
     _request_id_context_var.reset(token)
+
+
+def uuid4_request_id() -> str:
+    """A random UUID, the default for new request IDs"""
+    return str(uuid4())
+
+
+def _new_prefix() -> str:
+    return os.urandom(8).hex()
+
+
+_prefix: str = _new_prefix()
+_counter: Iterator[int] = itertools.count(1)
+
+
+def counter_request_id() -> str:
+    """A random prefix for this process followed by a counter, the cheapest unique ID.
+
+    The prefix is replaced in forked processes.
+    """
+    return f"{_prefix}-{next(_counter):x}"
+
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_CROCKFORD_PAIRS = [first + second for first in _CROCKFORD for second in _CROCKFORD]
+_ULID_SHIFTS = tuple(range(120, -1, -10))
+
+
+def ulid_request_id() -> str:
+    """A ULID: 26 characters which sort by the millisecond the ID was created"""
+    value = int(time.time() * 1000) << 80 | int.from_bytes(os.urandom(10), "big")
+    return "".join([_CROCKFORD_PAIRS[value >> shift & 1023] for shift in _ULID_SHIFTS])
+
+
+def _after_fork_in_child() -> None:
+    global _prefix, _counter
+    _prefix = _new_prefix()
+    _counter = itertools.count(1)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,93 @@
+"""Request latency written with log records and returned to the client
+
+When enabled (environment variable LOG_REQUEST_TIMING) init_logging() calls
+install_request_timing(), and the FastAPI request ID middleware
+(RequestContextMiddleware and RequestIDMiddleware) takes a time.monotonic() start
+time for each request. Then:
+
+- every record logged during a request has an `elapsedMs` field, the milliseconds
+  since the request started,
+- the response has a `Server-Timing: app;dur=<milliseconds>` header, the time until
+  the response was started,
+- requests which take LOG_SLOW_REQUEST_MS milliseconds or more (default 0, off) are
+  logged as a WARNING by the "she-logging.requests" logger.
+
+Until it is installed start_request_timer() returns None and the middleware and
+records do nothing more.
+"""
+import logging
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Optional
+
+_start_var: "ContextVar[Optional[float]]" = ContextVar(
+    "she_logging_request_start", default=None
+)
+_installed = False
+_slow_request_ms = 0.0
+
+SERVER_TIMING_HEADER = "Server-Timing"
+SLOW_REQUEST_LOGGER = "she-logging.requests"
+
+
+def _timed_record_class(record_class: Any) -> Any:
+    class TimedRecord(record_class):  # type: ignore[misc, valid-type]
+        __slots__ = ()
+
+        def __init__(self, *args: object, **kwargs: object) -> None:
+            super().__init__(*args, **kwargs)
+            start = _start_var.get()
+            if start is not None:
+                self.elapsedMs = round(  # type: ignore[misc]
+                    (time.monotonic() - start) * 1000, 3
+                )
+
+    return TimedRecord
+
+
+def install_request_timing(slow_request_ms: float = 0.0) -> None:
+    """Time requests in the request ID middleware and add `elapsedMs` to the records
+    created during them. Requests taking `slow_request_ms` or more are logged, 0 for
+    none.
+    """
+    global _installed, _slow_request_ms
+    _slow_request_ms = slow_request_ms
+    if not _installed:
+        logging.setLogRecordFactory(_timed_record_class(logging.getLogRecordFactory()))
+        _installed = True
+
+
+def start_request_timer() -> Optional[Token]:
+    """Start timing the current request, returns a token for end_request_timer, or
+    None if timing is not installed.
+    """
+    if not _installed:
+        return None
+    return _start_var.set(time.monotonic())
+
+
+def request_elapsed_ms() -> Optional[float]:
+    """Milliseconds since the current request started, None outside a request."""
+    start = _start_var.get()
+    if start is None:
+        return None
+    return (time.monotonic() - start) * 1000
+
+
+def server_timing(elapsed_ms: float) -> str:
+    """The Server-Timing header value for a request which took `elapsed_ms`."""
+    return f"app;dur={elapsed_ms:.3f}"
+
+
+def end_request_timer(token: Optional[Token], method: str, path: str) -> None:
+    """Stop timing the current request, logging it if it was slow."""
+    if token is None:
+        return
+    if _slow_request_ms > 0:
+        elapsed = request_elapsed_ms()
+        if elapsed is not None and elapsed >= _slow_request_ms:
+            # Logged while the timer is set, so the record has elapsedMs
+            logging.getLogger(SLOW_REQUEST_LOGGER).warning(
+                "Slow request %s %s took %.1fms", method, path, elapsed
+            )
+    _start_var.reset(token)
@@ -0,0 +1,91 @@
+"""JSON serializer backends for CustomisedJSONFormatter
+
+The serializer is chosen by name (environment variable LOG_JSON_SERIALIZER):
+
+- auto: orjson if installed, otherwise ujson if installed, otherwise json
+- orjson, ujson: use that library (falls back to json if it is not installed)
+- json: the standard library with a single cached encoder
+
+Every backend behaves like SafeJsonEncoder: dates and datetimes are written in ISO
+format and objects which cannot be serialized are written as a description of the
+error instead of raising. If a fast backend rejects a record (e.g. an integer too
+large for orjson) the record is written using the standard library instead.
+
+N.B. orjson and ujson write compact JSON without spaces after separators.
+"""
+import datetime
+import importlib
+import json
+from typing import Any, Callable
+
+Dumps = Callable[[Any], str]
+
+SERIALIZERS = ("auto", "orjson", "ujson", "json")
+
+
+class SafeJsonEncoder(json.JSONEncoder):
+    def default(self, obj: object) -> Any:
+        try:
+            if isinstance(obj, (datetime.datetime, datetime.date)):
+                return obj.isoformat()
+
+            return json.JSONEncoder.default(self, obj)
+        except Exception as e:
+            return f"{e} {repr(obj)}"
+
+
+_encoder = SafeJsonEncoder()
+
+
+def stdlib_dumps(data: Any) -> str:
+    return _encoder.encode(data)
+
+
+def _orjson_dumps() -> Dumps:
+    orjson = importlib.import_module("orjson")
+    options = orjson.OPT_NON_STR_KEYS  # type: ignore[attr-defined]
+    encode = orjson.dumps  # type: ignore[attr-defined]
+    default = _encoder.default
+
+    def dumps(data: Any) -> str:
+        try:
+            return encode(data, default=default, option=options).decode("utf-8")
+        except TypeError:  # orjson.JSONEncodeError is a TypeError
+            return stdlib_dumps(data)
+
+    return dumps
+
+
+def _ujson_dumps() -> Dumps:
+    ujson = importlib.import_module("ujson")
+    encode = ujson.dumps  # type: ignore[attr-defined]
+    default = _encoder.default
+
+    def dumps(data: Any) -> str:
+        try:
+            return encode(data, default=default, escape_forward_slashes=False)
+        except (TypeError, ValueError, OverflowError):
+            return stdlib_dumps(data)
+
+    return dumps
+
+
+_BACKENDS = {"orjson": _orjson_dumps, "ujson": _ujson_dumps}
+
+
+def get_serializer(name: str = "auto") -> Dumps:
+    """Return a dumps function for the named backend."""
+    name = name.lower()
+    if name not in SERIALIZERS:
+        raise ValueError(
+            f"Unknown JSON serializer {name!r}, expected one of {SERIALIZERS}"
+        )
+
+    candidates = ["orjson", "ujson"] if name == "auto" else [name]
+    for candidate in candidates:
+        if candidate in _BACKENDS:
+            try:
+                return _BACKENDS[candidate]()
+            except ImportError:
+                pass
+    return stdlib_dumps
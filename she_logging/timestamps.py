@@ -0,0 +1,87 @@
+"""Cached timestamp rendering
+
+Records logged in bursts share the same second, so the date and time up to the
+second is formatted once and reused, only the fraction of a second is added for
+each record.
+
+Timestamp formats for the JSON formatter (environment variable LOG_TIMESTAMP_FORMAT):
+
+- iso: ISO-8601 in UTC with microseconds, e.g. 2021-06-01T12:30:15.123456
+- epoch_millis: integer milliseconds since the epoch, e.g. 1622550615123
+- rfc3339_nanos: RFC3339 in UTC with nine fractional digits, e.g.
+  2021-06-01T12:30:15.123456000Z (record times only have microsecond precision)
+"""
+import logging
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+
+TIMESTAMP_FORMATS = ("iso", "epoch_millis", "rfc3339_nanos")
+
+Timestamp = Union[str, int]
+
+
+class TimestampCache:
+    """Formats record creation times (seconds since the epoch) in the given format."""
+
+    def __init__(self, timestamp_format: str = "iso") -> None:
+        renderers: Dict[str, Callable[[float], Timestamp]] = {
+            "iso": self._iso,
+            "epoch_millis": self._epoch_millis,
+            "rfc3339_nanos": self._rfc3339_nanos,
+        }
+        if timestamp_format not in renderers:
+            raise ValueError(
+                f"Unknown timestamp format {timestamp_format!r}, expected one of {TIMESTAMP_FORMATS}"
+            )
+        self.format: Callable[[float], Timestamp] = renderers[timestamp_format]
+        # Second and its formatted prefix, replaced together so threads never see a
+        # prefix belonging to a different second.
+        self._cached: Tuple[int, str] = (-1, "")
+
+    def _split(self, created: float) -> Tuple[str, int]:
+        seconds = int(created)
+        micros = int((created - seconds) * 1e6 + 0.5)
+        if micros >= 1000000:
+            seconds += 1
+            micros -= 1000000
+
+        cached = self._cached
+        if cached[0] != seconds:
+            cached = (
+                seconds,
+                time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)),
+            )
+            self._cached = cached
+        return cached[1], micros
+
+    def _iso(self, created: float) -> str:
+        return "%s.%06d" % self._split(created)
+
+    def _rfc3339_nanos(self, created: float) -> str:
+        return "%s.%06d000Z" % self._split(created)
+
+    @staticmethod
+    def _epoch_millis(created: float) -> int:
+        return int(created * 1000)
+
+
+class CachedTimeFormatter(logging.Formatter):
+    """logging.Formatter producing identical output, but `asctime` reuses the
+    formatted date and time for records logged within the same second."""
+
+    _cached: Tuple[int, str] = (-1, "")
+
+    def formatTime(
+        self, record: logging.LogRecord, datefmt: Optional[str] = None
+    ) -> str:
+        if datefmt:
+            return super().formatTime(record, datefmt)
+
+        seconds = int(record.created)
+        cached_seconds, prefix = self._cached
+        if cached_seconds != seconds:
+            prefix = time.strftime(self.default_time_format, self.converter(seconds))
+            self._cached = (seconds, prefix)
+        if self.default_msec_format:
+            return self.default_msec_format % (prefix, record.msecs)
+        return prefix
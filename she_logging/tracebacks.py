@@ -0,0 +1,159 @@
+"""Bounded traceback rendering for CustomisedJSONFormatter
+
+Formatting a deep traceback, especially with local variables, can take a log call
+tens of milliseconds. TracebackRenderer limits the cost:
+
+- max_frames: frames beyond the limit are omitted from the middle of the stack, the
+  outermost and innermost frames are kept
+- max_local_length: local variables (if shown) are written with reprlib, each repr
+  is cut to this many characters
+- max_bytes: longer tracebacks keep their start and end, the exception message is
+  always the last line
+
+Each exception is identified by its type and the code locations in its traceback
+(not its message). The first time an exception is rendered the full traceback is
+written, repeats within repeat_interval seconds only write the exception message and
+a reference to the first one. Both have the same exception ID, written by
+CustomisedJSONFormatter as excId.
+"""
+import hashlib
+import reprlib
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from types import FrameType, TracebackType
+from typing import Any, List, Optional, Set, Tuple, Type
+
+ExcInfo = Tuple[
+    Optional[Type[BaseException]], Optional[BaseException], Optional[TracebackType]
+]
+
+REPEATED = "Traceback repeated, see excId {exc_id}\n"
+OMITTED = "  ... {count} frames omitted ...\n"
+TRUNCATED = "\n... {count} bytes truncated ...\n"
+CAUSE = "\nThe above exception was the direct cause of the following exception:\n\n"
+CONTEXT = "\nDuring handling of the above exception, another exception occurred:\n\n"
+
+
+def exception_id(exc_info: ExcInfo) -> str:
+    """Identifies exceptions with the same type raised from the same code."""
+    _, exc_value, tb = exc_info
+    exc_type = type(exc_value)
+    locations = [
+        f"{frame.f_code.co_filename}:{lineno}"
+        for frame, lineno in traceback.walk_tb(tb)
+    ]
+    key = "\n".join([f"{exc_type.__module__}.{exc_type.__qualname__}", *locations])
+    return hashlib.blake2b(key.encode(), digest_size=6).hexdigest()
+
+
+class TracebackRenderer:
+    """Formats exceptions within the given limits, see the module documentation."""
+
+    def __init__(
+        self,
+        max_frames: int = 40,
+        max_bytes: int = 16384,
+        show_locals: bool = False,
+        max_local_length: int = 200,
+        repeat_interval: float = 300.0,
+        cache_size: int = 1000,
+    ) -> None:
+        self.max_frames = max(max_frames, 2)
+        self.max_bytes = max_bytes
+        self.show_locals = show_locals
+        self.repeat_interval = repeat_interval
+        self.cache_size = cache_size
+        self._repr = reprlib.Repr()
+        self._repr.maxstring = self._repr.maxother = max_local_length
+        self._first_seen: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, exc_info: ExcInfo) -> Tuple[str, str]:
+        """The formatted exception and its exception ID."""
+        exc_id = exception_id(exc_info)
+        exc_value = exc_info[1]
+        if exc_value is None or self._repeated(exc_id):
+            text = "".join(traceback.format_exception_only(type(exc_value), exc_value))
+            if exc_value is not None:
+                text = REPEATED.format(exc_id=exc_id) + text
+        else:
+            text = "".join(self._format_chain(exc_value, set()))
+        return self._truncate(text.rstrip("\n")), exc_id
+
+    def _repeated(self, exc_id: str) -> bool:
+        if self.repeat_interval <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            first = self._first_seen.get(exc_id)
+            if first is not None and now - first < self.repeat_interval:
+                return True
+            self._first_seen[exc_id] = now
+            self._first_seen.move_to_end(exc_id)
+            if len(self._first_seen) > self.cache_size:
+                self._first_seen.popitem(last=False)
+            return False
+
+    def _format_chain(self, exc: BaseException, seen: Set[int]) -> List[str]:
+        seen.add(id(exc))
+        lines: List[str] = []
+        cause, context = exc.__cause__, exc.__context__
+        if cause is not None and id(cause) not in seen:
+            lines += self._format_chain(cause, seen)
+            lines.append(CAUSE)
+        elif (
+            context is not None
+            and not exc.__suppress_context__
+            and id(context) not in seen
+        ):
+            lines += self._format_chain(context, seen)
+            lines.append(CONTEXT)
+
+        if exc.__traceback__ is not None:
+            lines.append("Traceback (most recent call last):\n")
+            lines += self._format_frames(exc.__traceback__)
+        lines += traceback.format_exception_only(type(exc), exc)
+        return lines
+
+    def _format_frames(self, tb: TracebackType) -> List[str]:
+        frames = list(traceback.walk_tb(tb))
+        omitted = len(frames) - self.max_frames
+        if omitted <= 0:
+            return self._format_stack(frames)
+        head = self.max_frames // 2
+        return (
+            self._format_stack(frames[:head])
+            + [OMITTED.format(count=omitted)]
+            + self._format_stack(frames[head + omitted :])
+        )
+
+    def _format_stack(self, frames: List[Tuple[FrameType, int]]) -> List[str]:
+        stack = traceback.StackSummary.extract(iter(frames))
+        if self.show_locals:
+            for summary, (frame, _) in zip(stack, frames):
+                summary.locals = {
+                    name: self._local_repr(value)
+                    for name, value in frame.f_locals.items()
+                }
+        return stack.format()
+
+    def _local_repr(self, value: Any) -> str:
+        try:
+            return self._repr.repr(value)
+        except Exception as e:
+            return f"<repr failed: {e.__class__.__name__}>"
+
+    def _truncate(self, text: str) -> str:
+        encoded = text.encode("utf-8", "replace")
+        if len(encoded) <= self.max_bytes:
+            return text
+        head = self.max_bytes // 4
+        tail = self.max_bytes - head
+        count = len(encoded) - head - tail
+        return (
+            encoded[:head].decode("utf-8", "ignore")
+            + TRUNCATED.format(count=count)
+            + encoded[-tail:].decode("utf-8", "ignore")
+        )
@@ -0,0 +1,368 @@
+"""Binary wire format for sending log records between processes
+
+logging.handlers.SocketHandler pickles each record's attributes, including `args`
+and anything passed with `extra=`, which is slow and fails on objects which cannot
+be pickled. encode() instead writes what a formatter in the receiving process
+needs, already rendered:
+
+- a fixed header packed with struct: format version, level number, creation times,
+  line number, process and thread IDs, and the length of each string
+- the strings, UTF-8 encoded: logger name, level name, message (merged with its
+  arguments), path, function, process and thread names, request ID, traceback
+  (rendered by a TracebackRenderer), exception ID, stack and the `extra` fields
+  (with any fields bound by she_logging.context) as JSON, written by the
+  LOG_JSON_SERIALIZER serializer
+
+decode() returns the record attributes for logging.makeLogRecord. Values passed with
+`extra=` arrive as their JSON form (e.g. datetimes as ISO strings, other objects as
+a description).
+
+Records are framed as by SocketHandler, a 4 byte big-endian length then the encoded
+record. WireSocketHandler sends them, WireReceiver receives them and passes each
+record to the logger it was logged with.
+"""
+import importlib
+import json
+import logging
+import socketserver
+import struct
+import threading
+from logging.handlers import SocketHandler
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import logging as she_logging
+from .context import EMPTY_CONTEXT
+from .records import CompactLogRecord, _file_name_and_module
+from .serializers import get_serializer
+from .tracebacks import TracebackRenderer
+
+VERSION = 1
+
+STRING_FIELDS = (
+    "name",
+    "levelname",
+    "msg",
+    "pathname",
+    "funcName",
+    "processName",
+    "threadName",
+    "requestID",
+    "exc_text",
+    "excId",
+    "stack_info",
+    "extra",
+)
+# version, flags, levelno, created, msecs, relativeCreated, lineno, process, thread
+# then the length of each string in bytes
+_HEADER = struct.Struct(">BBHdddIIQ" + "I" * len(STRING_FIELDS))
+FRAME = struct.Struct(">L")
+
+_NONE = 0xFFFFFFFF
+_NO_PROCESS = 1
+_NO_THREAD = 2
+
+# Attributes of every record, and those which are not sent as `extra` fields
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None)))
+_NOT_EXTRA = _RECORD_ATTRS | {
+    "taskName",
+    "requestID",
+    "logContext",
+    "excId",
+    "message",
+    "asctime",
+}
+_NOT_SENT = (
+    _RECORD_ATTRS
+    - {*STRING_FIELDS, "filename", "module", "args"}
+    - {
+        "levelno",
+        "created",
+        "msecs",
+        "relativeCreated",
+        "lineno",
+        "process",
+        "thread",
+        "exc_info",
+    }
+)
+
+# Records of these classes are created without calling __init__ by decode_record
+_SHE_RECORD_CLASSES = (she_logging.RECORD_CLASS, CompactLogRecord)
+
+_dumps = get_serializer(she_logging.LOG_JSON_SERIALIZER)
+_formatter = logging.Formatter()
+
+
+def _json_loads() -> Callable[[str], Any]:
+    try:
+        return importlib.import_module("orjson").loads  # type: ignore[no-any-return]
+    except ImportError:
+        return json.loads
+
+
+_loads = _json_loads()
+
+
+def _record_extra(
+    record: logging.LogRecord, request_headers: Optional[Dict[str, str]]
+) -> Optional[str]:
+    # In the order they were set, as the JSON formatter writes them
+    extra = {
+        key: value for key, value in record.__dict__.items() if key not in _NOT_EXTRA
+    }
+    context = getattr(record, "logContext", None)
+    if context:
+        for key, value in context.fields.items():
+            extra.setdefault(key, value)
+    if request_headers:
+        extra.update(request_headers)
+    return _dumps(extra) if extra else None
+
+
+def encode(
+    record: logging.LogRecord,
+    tracebacks: Optional[TracebackRenderer] = None,
+    request_headers: Optional[Dict[str, str]] = None,
+) -> bytes:
+    """The record in the wire format, see the module documentation.
+
+    The exception is rendered by tracebacks, or as by logging.Formatter without.
+    request_headers are sent as `extra` fields.
+    """
+    exc_text, exc_id = record.exc_text, getattr(record, "excId", None)
+    if record.exc_info:
+        if tracebacks is not None:
+            exc_text, exc_id = tracebacks.render(record.exc_info)
+        else:
+            exc_text = _formatter.formatException(record.exc_info)
+    request_id = getattr(record, "requestID", None)
+
+    strings = (
+        record.name,
+        record.levelname,
+        record.getMessage(),
+        record.pathname,
+        record.funcName,
+        record.processName,
+        record.threadName,
+        None if request_id is None else str(request_id),
+        exc_text,
+        exc_id,
+        record.stack_info,
+        _record_extra(record, request_headers),
+    )
+    text = "".join([value for value in strings if value])
+    payload = text.encode("utf-8", "surrogatepass")
+    if len(payload) == len(text):
+        # ASCII, the length in bytes of each string is its length
+        lengths = [_NONE if value is None else len(value) for value in strings]
+    else:
+        lengths = [
+            _NONE if value is None else len(value.encode("utf-8", "surrogatepass"))
+            for value in strings
+        ]
+    flags = (_NO_PROCESS if record.process is None else 0) | (
+        _NO_THREAD if record.thread is None else 0
+    )
+    return (
+        _HEADER.pack(
+            VERSION,
+            flags,
+            record.levelno,
+            record.created,
+            record.msecs,
+            record.relativeCreated,
+            record.lineno,
+            record.process or 0,
+            record.thread or 0,
+            *lengths,
+        )
+        + payload
+    )
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """The attributes of an encoded record, for logging.makeLogRecord.
+
+    Raises ValueError if data is not an encoded record.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated log record")
+    fields = _HEADER.unpack_from(data)
+    if fields[0] != VERSION:
+        raise ValueError(f"Unknown log record format version {fields[0]}")
+    lengths = fields[9:]
+    if _HEADER.size + sum(n for n in lengths if n != _NONE) != len(data):
+        raise ValueError("Truncated log record")
+
+    payload = data[_HEADER.size :]
+    text = payload.decode("utf-8", "surrogatepass")
+    # Unless it is ASCII slice the bytes, not the text
+    source: Any = text if len(text) == len(payload) else payload
+    strings: List[Optional[str]] = []
+    offset = 0
+    for length in lengths:
+        if length == _NONE:
+            strings.append(None)
+            continue
+        end = offset + length
+        value = source[offset:end]
+        strings.append(
+            value if source is text else value.decode("utf-8", "surrogatepass")
+        )
+        offset = end
+
+    (
+        name,
+        levelname,
+        msg,
+        pathname,
+        func_name,
+        process_name,
+        thread_name,
+        request_id,
+        exc_text,
+        exc_id,
+        stack_info,
+        extra,
+    ) = strings
+    filename, module = _file_name_and_module(pathname or "")
+    flags = fields[1]
+    attributes = {
+        "name": name,
+        "msg": msg,
+        "args": None,
+        "levelname": levelname,
+        "levelno": fields[2],
+        "pathname": pathname,
+        "filename": filename,
+        "module": module,
+        "exc_info": None,
+        "exc_text": exc_text,
+        "stack_info": stack_info,
+        "lineno": fields[6],
+        "funcName": func_name,
+        "created": fields[3],
+        "msecs": fields[4],
+        "relativeCreated": fields[5],
+        "thread": None if flags & _NO_THREAD else fields[8],
+        "threadName": thread_name,
+        "processName": process_name,
+        "process": None if flags & _NO_PROCESS else fields[7],
+        "requestID": request_id,
+    }
+    for key in _NOT_SENT:
+        attributes[key] = None
+    if exc_id is not None:
+        attributes["excId"] = exc_id
+    if extra is not None:
+        for key, value in _loads(extra).items():
+            attributes.setdefault(key, value)
+    return attributes
+
+
+def decode_record(data: bytes) -> logging.LogRecord:
+    """An encoded record as a LogRecord."""
+    attributes = decode(data)
+    factory: Any = logging.getLogRecordFactory()
+    if factory not in _SHE_RECORD_CLASSES:
+        return logging.makeLogRecord(attributes)
+    # All the attributes are known, don't initialise the record only to replace them
+    record: logging.LogRecord = factory.__new__(factory)
+    record.__dict__.update(attributes)
+    record.__dict__["logContext"] = EMPTY_CONTEXT
+    return record
+
+
+def frame(record: logging.LogRecord, **kwargs: Any) -> bytes:
+    """The encoded record prefixed with its length, as sent on a socket."""
+    data = encode(record, **kwargs)
+    return FRAME.pack(len(data)) + data
+
+
+def split_frames(buffer: bytearray) -> List[bytes]:
+    """The complete frames at the start of buffer, which are removed from it."""
+    frames: List[bytes] = []
+    offset = 0
+    while len(buffer) - offset >= FRAME.size:
+        (size,) = FRAME.unpack_from(buffer, offset)
+        end = offset + FRAME.size + size
+        if len(buffer) < end:
+            break
+        frames.append(bytes(buffer[offset + FRAME.size : end]))
+        offset = end
+    del buffer[:offset]
+    return frames
+
+
+def handle_encoded(data: bytes) -> None:
+    """Pass an encoded record to the logger it was logged with."""
+    record = decode_record(data)
+    logging.getLogger(record.name).handle(record)
+
+
+class WireSocketHandler(SocketHandler):
+    """SocketHandler sending records in the wire format instead of pickled.
+
+    Exceptions are rendered as set by the LOG_TRACEBACK_* environment variables,
+    unless a TracebackRenderer is given.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: Optional[int],
+        tracebacks: Optional[TracebackRenderer] = None,
+    ) -> None:
+        super().__init__(host, port)
+        if tracebacks is None:
+            tracebacks = TracebackRenderer(
+                max_frames=she_logging.LOG_TRACEBACK_MAX_FRAMES,
+                max_bytes=she_logging.LOG_TRACEBACK_MAX_BYTES,
+                show_locals=she_logging.LOG_TRACEBACK_LOCALS,
+                repeat_interval=she_logging.LOG_TRACEBACK_REPEAT_INTERVAL,
+            )
+        self.tracebacks = tracebacks
+
+    def makePickle(self, record: logging.LogRecord) -> bytes:
+        return frame(record, tracebacks=self.tracebacks)
+
+
+class WireRequestHandler(socketserver.StreamRequestHandler):
+    """Reads framed records from a connection and passes them to their loggers."""
+
+    def handle(self) -> None:
+        buffer = bytearray()
+        while True:
+            chunk = self.request.recv(262144)
+            if not chunk:
+                return
+            buffer += chunk
+            for data in split_frames(buffer):
+                handle_encoded(data)
+
+
+class WireReceiver(socketserver.ThreadingTCPServer):
+    """TCP server receiving records from WireSocketHandler, one thread per connection.
+
+    receiver = WireReceiver(("localhost", 9020))
+    receiver.serve_forever()  # until receiver.shutdown()
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        handler: Any = WireRequestHandler,
+    ) -> None:
+        super().__init__(address, handler)
+
+    def start(self) -> threading.Thread:
+        """Serve from a daemon thread."""
+        thread = threading.Thread(
+            target=self.serve_forever, name="she-logging-receiver", daemon=True
+        )
+        thread.start()
+        return thread
@@ -1,3 +1,5 @@
+import logging
+from typing import Callable, Iterator, List
 from uuid import uuid4
 
 import pytest
@@ -29,3 +31,43 @@ def dummy_flask_request_id(monkeypatch: MonkeyPatch) -> str:
     monkeypatch.setattr(request_id, "FLASK_AVAILABLE", True)
     monkeypatch.setattr(request_id, "flask_request_id", dummy_request_id)
     return request_uuid
+
+
+class ListHandler(logging.Handler):
+    """Keeps the records it handles."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+    @property
+    def messages(self) -> List[str]:
+        return [record.getMessage() for record in self.records]
+
+
+MakeLogger = Callable[[str, logging.Handler], logging.Logger]
+
+
+@pytest.fixture
+def make_logger() -> Iterator[MakeLogger]:
+    """Factory for a DEBUG level logger writing only to the given handler."""
+    loggers: List[logging.Logger] = []
+
+    def make(name: str, handler: logging.Handler) -> logging.Logger:
+        logger = logging.getLogger(name)
+        logger.handlers = [handler]
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        loggers.append(logger)
+        return logger
+
+    yield make
+    for logger in loggers:
+        for handler in logger.handlers:
+            handler.close()
+        logger.handlers = []
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
@@ -0,0 +1,24 @@
+"""Logs through the aggregator writer from a process re-parented as by daemonizing."""
+import logging
+import os
+import sys
+import time
+
+from she_logging.aggregator import start_aggregator
+
+handler = logging.StreamHandler(sys.stdout)
+handler.setFormatter(logging.Formatter("%(message)s"))
+logging.getLogger().addHandler(handler)
+logging.getLogger().setLevel(logging.INFO)
+
+start_aggregator()
+logging.info("before")
+logging.shutdown()
+
+if os.fork():
+    # The parent which started the writer exits without stopping it
+    os._exit(0)
+time.sleep(1)
+logging.info("daemon")
+logging.shutdown()
+os._exit(0)
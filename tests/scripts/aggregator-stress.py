@@ -0,0 +1,32 @@
+"""Forks workers which all log long lines through the aggregator writer process."""
+import logging
+import os
+import sys
+
+from she_logging.aggregator import start_aggregator, stop_aggregator
+
+WORKERS = int(sys.argv[1])
+LINES = int(sys.argv[2])
+LENGTH = int(sys.argv[3])
+
+handler = logging.StreamHandler(sys.stdout)
+handler.setFormatter(logging.Formatter("%(message)s"))
+logging.getLogger().addHandler(handler)
+logging.getLogger().setLevel(logging.INFO)
+
+start_aggregator()
+
+pids = []
+for worker in range(WORKERS):
+    pid = os.fork()
+    if pid == 0:
+        for line in range(LINES):
+            prefix = f"{worker}:{line}:"
+            logging.info(prefix + chr(ord("a") + worker % 26) * (LENGTH - len(prefix)))
+        logging.shutdown()
+        os._exit(0)
+    pids.append(pid)
+
+for pid in pids:
+    os.waitpid(pid, 0)
+stop_aggregator()
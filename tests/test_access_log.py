@@ -0,0 +1,97 @@
+import json
+import logging
+from datetime import timedelta
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest_mock import MockFixture
+from starlette.responses import PlainTextResponse
+
+from she_logging import access_log, gunicorn_logger
+from she_logging.fastapi_access_log import AccessLogMiddleware
+from she_logging.fastapi_request_id import RequestIDMiddleware
+from she_logging.logging import CustomisedJSONFormatter
+
+from .conftest import ListHandler, MakeLogger
+
+NAME = "she-logging-access"
+
+
+def test_record(make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    logger = make_logger(NAME, handler)
+    details = access_log.http_request("GET", "/a?b=c", 200, 12, 0.0015, request_id="1")
+    access_log.log_access(logger, details)
+    logger.setLevel(logging.WARNING)
+    access_log.log_access(logger, details)
+
+    [record] = handler.records
+    assert record.getMessage() == "GET /a?b=c 200"
+    assert record.__dict__["requestID"] == "1"
+    line = json.loads(CustomisedJSONFormatter().format(record))
+    assert line["httpRequest"] == {
+        "requestMethod": "GET",
+        "requestUrl": "/a?b=c",
+        "status": 200,
+        "responseSize": 12,
+        "latency": "0.001500s",
+        "requestID": "1",
+    }
+    assert line["requestID"] == "1" and line["severity"] == "INFO"
+
+
+def test_asgi_middleware(make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    make_logger(NAME, handler)
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware)
+    app.add_middleware(AccessLogMiddleware, logger_name=NAME)
+
+    @app.get("/items/{item}")
+    async def read_item(item: str) -> PlainTextResponse:
+        return PlainTextResponse(item * 3, status_code=201)
+
+    @app.get("/fail")
+    async def fail() -> None:
+        raise RuntimeError("failed")
+
+    client = TestClient(app, raise_server_exceptions=False)
+    client.get("/items/ab?q=1", headers={"X-Request-ID": "abc", "User-Agent": "x"})
+    client.get("/fail")
+
+    ok, failed = (record.__dict__["httpRequest"] for record in handler.records)
+    assert ok["requestUrl"] == "/items/ab?q=1" and ok["status"] == 201
+    assert ok["responseSize"] == 6 and ok["requestID"] == "abc"
+    assert ok["userAgent"] == "x" and ok["protocol"] == "HTTP/1.1"
+    assert ok["latency"].endswith("s")
+    assert failed["requestUrl"] == "/fail" and failed["status"] == 500
+    # The exception's response is sent outside both middleware, without an ID
+    assert "requestID" not in failed
+
+
+def test_gunicorn(mocker: MockFixture, make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    make_logger(access_log.ACCESS_LOGGER, handler)
+    resp = SimpleNamespace(
+        status_code=404, sent=9, headers=[("X-Request-ID", "r1")], status="404"
+    )
+    req = SimpleNamespace(method="POST", path="/p", query="", version=(1, 0))
+    environ = {"REMOTE_ADDR": "10.0.0.1", "HTTP_X_REQUEST_ID": "ignored"}
+
+    logger = gunicorn_logger.Logger.__new__(gunicorn_logger.Logger)
+    mocker.patch.object(gunicorn_logger.logging, "LOG_ACCESS", True)
+    logger.access(resp, req, environ, timedelta(milliseconds=250))
+
+    [record] = handler.records
+    assert record.getMessage() == "POST /p 404"
+    assert record.__dict__["httpRequest"] == {
+        "requestMethod": "POST",
+        "requestUrl": "/p",
+        "status": 404,
+        "responseSize": 9,
+        "latency": "0.250000s",
+        "remoteIp": "10.0.0.1",
+        "protocol": "HTTP/1.0",
+        "requestID": "r1",
+    }
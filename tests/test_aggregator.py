@@ -0,0 +1,99 @@
+import json
+import logging
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+from pytest_mock import MockFixture
+
+from she_logging import aggregator, wire
+from she_logging.aggregator import AggregatingHandler
+from she_logging.logging import CustomisedJSONFormatter
+
+from .conftest import ListHandler, MakeLogger
+
+SCRIPTS = Path(__file__).parent / "scripts"
+SCRIPT = SCRIPTS / "aggregator-stress.py"
+
+
+def test_no_torn_lines() -> None:
+    workers, lines, length = 16, 200, 10000
+    proc = subprocess.run(
+        [sys.executable, str(SCRIPT), str(workers), str(lines), str(length)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr
+
+    output = proc.stdout.decode("ascii").split("\n")
+    assert output.pop() == ""
+    seen: Counter = Counter()
+    for text in output:
+        worker, line, body = text.split(":", 2)
+        assert len(text) == length
+        assert body == chr(ord("a") + int(worker) % 26) * len(body)
+        seen[worker] += 1
+        assert int(line) == seen[worker] - 1, "lines from a worker are in order"
+
+    assert len(output) == workers * lines
+    assert set(seen.values()) == {lines}
+
+
+def test_writer_outlives_parent() -> None:
+    # The output pipe closes once the writer, the last process holding it, exits
+    proc = subprocess.run(
+        [sys.executable, str(SCRIPTS / "aggregator-daemon.py")],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.decode("ascii").split("\n") == ["before", "daemon", ""]
+
+
+def test_one_handler_per_chain(mocker: MockFixture, make_logger: MakeLogger) -> None:
+    name = "she-logging-aggregated"
+    top, child, other, nested = (
+        make_logger(f"{name}{suffix}", ListHandler())
+        for suffix in ("", ".child", ".other", ".other.nested")
+    )
+    child.propagate = nested.propagate = True
+    mocker.patch.object(
+        aggregator, "_configured_loggers", return_value=[top, child, other, nested]
+    )
+    emit = mocker.patch.object(AggregatingHandler, "emit")
+
+    handler = aggregator._replace_handlers("/nonexistent/writer.sock")
+    try:
+        assert top.handlers == other.handlers == [handler]
+        assert child.handlers == nested.handlers == []
+        for logger in (top, child, other, nested):
+            logger.info(logger.name)
+    finally:
+        handler.close()
+    sent = [call.args[0].getMessage() for call in emit.call_args_list]
+    assert sent == [top.name, child.name, other.name, nested.name]
+
+
+def test_exception_sent_as_text() -> None:
+    handler = AggregatingHandler("/nonexistent/writer.sock", [])
+    logger = logging.getLogger("she-logging-aggregated-exception")
+    try:
+        raise ValueError("aggregated")
+    except ValueError:
+        record = logger.makeRecord(
+            logger.name,
+            logging.ERROR,
+            __file__,
+            1,
+            "failed %s",
+            ("here",),
+            sys.exc_info(),
+        )
+    received = wire.decode_record(handler.makePickle(record)[4:])
+
+    output = json.loads(CustomisedJSONFormatter().format(received))
+    assert output["message"] == "failed here"
+    assert "ValueError: aggregated" in output["exc_info"]
@@ -0,0 +1,103 @@
+import json
+import logging
+
+import flask
+import pytest
+from flask_log_request_id import RequestID
+
+from she_logging import async_logging
+from she_logging.logging import CustomisedJSONFormatter
+
+from .conftest import ListHandler, MakeLogger
+
+
+def make_record(message: str) -> logging.LogRecord:
+    return logging.makeLogRecord({"msg": message, "levelno": logging.INFO})
+
+
+def test_drop_new_counts_dropped_records() -> None:
+    handler = async_logging.BoundedQueueHandler(maxsize=2, overflow="drop_new")
+    for n in range(5):
+        handler.handle(make_record(f"message {n}"))
+
+    assert handler.dropped == 3
+    assert [handler.queue.get_nowait().msg for _ in range(2)] == [
+        "message 0",
+        "message 1",
+    ]
+
+
+def test_drop_oldest_keeps_newest_records() -> None:
+    handler = async_logging.BoundedQueueHandler(maxsize=2, overflow="drop_oldest")
+    for n in range(5):
+        handler.handle(make_record(f"message {n}"))
+
+    assert handler.dropped == 3
+    assert [handler.queue.get_nowait().msg for _ in range(2)] == [
+        "message 3",
+        "message 4",
+    ]
+
+
+def test_unknown_overflow_policy() -> None:
+    with pytest.raises(ValueError):
+        async_logging.BoundedQueueHandler(overflow="explode")
+
+
+def test_prepare_merges_args() -> None:
+    handler = async_logging.BoundedQueueHandler()
+    args = [1, 2]
+    record = logging.makeLogRecord({"msg": "values %s", "args": (args,)})
+    prepared = handler.prepare(record)
+    args.append(3)
+
+    assert prepared.msg == "values [1, 2]"
+    assert prepared.args is None
+    assert record.args == ([1, 2, 3],)
+
+
+def test_start_and_stop_async_logging(make_logger: MakeLogger) -> None:
+    target = ListHandler()
+    logger = make_logger("she-logging-async-test", target)
+
+    try:
+        assert async_logging.start_async_logging(maxsize=10, loggers=[logger])
+        assert isinstance(logger.handlers[0], async_logging.BoundedQueueHandler)
+        assert not async_logging.start_async_logging(loggers=[logger])
+
+        for n in range(100):
+            logger.info("message %d", n)
+    finally:
+        async_logging.stop_async_logging()
+
+    assert logger.handlers == [target]
+    assert target.messages == [f"message {n}" for n in range(100)]
+
+
+def test_prepare_copies_headers_written_by_the_formatter(
+    make_logger: MakeLogger,
+) -> None:
+    target = ListHandler()
+    target.setFormatter(CustomisedJSONFormatter(fields=["message", "header:X-Trace"]))
+    logger = make_logger("she-logging-async-headers", target)
+    app = flask.Flask(__name__)
+    RequestID(app)
+
+    try:
+        async_logging.start_async_logging(loggers=[logger])
+        queue_handler = logger.handlers[0]
+        assert isinstance(queue_handler, async_logging.BoundedQueueHandler)
+        assert queue_handler.header_keys == ("X-Trace",)
+
+        with app.test_request_context(headers={"X-Trace": "abc", "X-Client": "x"}):
+            logger.info("in a request")
+    finally:
+        async_logging.stop_async_logging()
+
+    [record] = target.records
+    assert record.__dict__["X-Trace"] == "abc"
+    assert "X-Client" not in record.__dict__
+    assert json.loads(target.format(record)) == {
+        "message": "in a request",
+        "X-Trace": "abc",
+    }
@@ -0,0 +1,151 @@
+import logging
+from typing import Dict, List
+
+from pytest_mock import MockFixture
+
+from she_logging import async_logging, coalescing
+from she_logging import logging as she_logging
+
+from .conftest import ListHandler, MakeLogger
+
+
+def test_coalesces_bursts(mocker: MockFixture, make_logger: MakeLogger) -> None:
+    mocker.patch.object(coalescing, "_start_sweeper")
+    clock = mocker.patch.object(coalescing.time, "monotonic", return_value=100.0)
+    target = ListHandler()
+    logger = make_logger(
+        "she-logging-coalesce", coalescing.CoalescingHandler(target, window=1.0)
+    )
+
+    for n in range(5):
+        clock.return_value = 100.0 + n * 0.5
+        logger.warning("retrying %d", n)
+    logger.warning("retrying %d", 5, extra={"elsewhere": True})
+    logger.error("retrying %d", 6)
+    assert target.messages == ["retrying 0", "retrying 5", "retrying 6"]
+
+    clock.return_value = 104.0
+    logger.warning("retrying %d", 7)
+    summary, record = target.records[-2:]
+    assert summary.getMessage() == "4 similar messages suppressed: retrying %d"
+    assert summary.levelno == logging.WARNING
+    assert summary.__dict__["suppressed"] == 4
+    assert summary.__dict__["firstSuppressed"] <= summary.__dict__["lastSuppressed"]
+    assert record.getMessage() == "retrying 7"
+
+
+def test_summarised_by_sweep_and_close(
+    mocker: MockFixture, make_logger: MakeLogger
+) -> None:
+    mocker.patch.object(coalescing, "_start_sweeper")
+    clock = mocker.patch.object(coalescing.time, "monotonic", return_value=100.0)
+    target = ListHandler()
+    handler = coalescing.CoalescingHandler(target, window=1.0, max_delay=10.0)
+    logger = make_logger("she-logging-coalesce-sweep", handler)
+
+    for n in range(3):
+        logger.info("poll")
+    clock.return_value = 100.5
+    handler.sweep()
+    assert target.messages == ["poll"]
+    clock.return_value = 101.5
+    handler.sweep()
+    assert target.messages[-1] == "2 similar messages suppressed: poll"
+
+    # A burst which doesn't end is summarised every max_delay seconds
+    for n in range(30):
+        clock.return_value = 102.0 + n * 0.5
+        logger.info("poll")
+    assert target.messages[2:] == ["poll", "21 similar messages suppressed: poll"]
+    handler.close()
+    assert target.messages[-1] == "8 similar messages suppressed: poll"
+
+
+def test_bounded_table(mocker: MockFixture) -> None:
+    mocker.patch.object(coalescing, "_start_sweeper")
+    target = ListHandler()
+    handler = coalescing.CoalescingHandler(target, window=60, max_keys=2)
+    logger = logging.getLogger("she-logging-coalesce-keys")
+    for message in ("a", "a", "b", "c", "a"):
+        handler.handle(logger.makeRecord(logger.name, 20, "f", 1, message, (), None))
+    assert target.messages == [
+        "a",
+        "b",
+        "1 similar messages suppressed: a",
+        "c",
+        "a",
+    ]
+    assert len(handler._bursts) == 2
+
+
+def test_coalesce_handlers(make_logger: MakeLogger) -> None:
+    target = ListHandler()
+    logger = make_logger("she-logging-coalesce-wrapped", target)
+    other = make_logger("she-logging-coalesce-other", target)
+    coalescing.coalesce_handlers(1.0, loggers=[logger, other])
+    [wrapper] = logger.handlers
+    assert isinstance(wrapper, coalescing.CoalescingHandler)
+    assert other.handlers == [wrapper] and wrapper.target is target
+
+
+def test_target_level(mocker: MockFixture, make_logger: MakeLogger) -> None:
+    mocker.patch.object(coalescing, "_start_sweeper")
+    target = ListHandler()
+    target.setLevel(logging.ERROR)
+    logger = make_logger("she-logging-coalesce-level", target)
+    coalescing.coalesce_handlers(1.0, loggers=[logger])
+    [wrapper] = logger.handlers
+    logger.info("below")
+    logger.error("above")
+    # Changed after wrapping
+    target.setLevel(logging.CRITICAL)
+    wrapper.handle(logger.makeRecord(logger.name, logging.ERROR, "f", 1, "x", (), None))
+    wrapper.flush()
+    assert target.messages == ["above"]
+
+
+def test_init_logging_with_async(mocker: MockFixture) -> None:
+    mocker.patch.object(she_logging, "_initialised", False)
+    mocker.patch.object(she_logging, "LOG_ASYNC", True)
+    mocker.patch.object(she_logging, "LOG_COALESCE_WINDOW", 60.0)
+    mocker.patch.object(she_logging.root, "handlers", [])
+    mocker.patch.dict(logging.Logger.manager.loggerDict)
+    logging.Logger.manager.loggerDict.pop("she-logging", None)
+    handlers: Dict[logging.Logger, List[logging.Handler]] = {
+        logger: list(logger.handlers) for logger in async_logging._configured_loggers()
+    }
+    target = ListHandler()
+    config = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {"list": {"()": lambda: target}},
+        "loggers": {
+            "she-logging-coalesce-init": {
+                "level": "INFO",
+                "handlers": ["list"],
+                "propagate": False,
+            }
+        },
+    }
+    logger = logging.getLogger("she-logging-coalesce-init")
+
+    try:
+        she_logging.init_logging(config)
+        [wrapper] = logger.handlers
+        assert isinstance(wrapper, coalescing.CoalescingHandler)
+        assert isinstance(wrapper.target, async_logging.BoundedQueueHandler)
+        for n in range(5):
+            logger.info("retrying %d", n)
+        coalescing.flush_coalesced_summaries()
+    finally:
+        async_logging.stop_async_logging()
+        for configured, configured_handlers in handlers.items():
+            configured.handlers = configured_handlers
+        logger.handlers = []
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+
+    assert target.messages == [
+        "retrying 0",
+        "4 similar messages suppressed: retrying %d",
+    ]
@@ -0,0 +1,99 @@
+import os
+from pathlib import Path
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from pytest_mock import MockFixture
+
+from she_logging import config_cache
+
+CONFIG = """
+version: 1
+formatters:
+  simple:
+    format: "%(levelname)s %(message)s"
+handlers:
+  console:
+    class: logging.StreamHandler
+    formatter: simple
+root:
+  level: INFO
+  handlers: [console]
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path: Path, monkeypatch: MonkeyPatch) -> Path:
+    monkeypatch.delenv("LOG_CONFIG_CACHE_DIR", raising=False)
+    config_cache.clear_cache()
+    path = tmp_path / "logging.yaml"
+    path.write_text(CONFIG)
+    return path
+
+
+def cache_and_reload(path: Path) -> None:
+    config, key = config_cache.load_config(path)
+    assert key is not None
+    config_cache.store_config(key, config)
+    assert config_cache.load_config(path) == (config, None)
+
+
+def test_memory_cache(config_file: Path, mocker: MockFixture) -> None:
+    config, key = config_cache.load_config(config_file)
+    assert config["root"] == {"level": "INFO", "handlers": ["console"]}
+    assert key is not None
+    config_cache.store_config(key, config)
+
+    safe_load = mocker.patch("yaml.safe_load")
+    cached, key = config_cache.load_config(config_file)
+    assert (cached, key) == (config, None)
+    safe_load.assert_not_called()
+
+    cached["root"]["level"] = "DEBUG"
+    assert config_cache.load_config(config_file)[0] == config
+
+
+def test_changed_file_misses(config_file: Path) -> None:
+    cache_and_reload(config_file)
+    stat = config_file.stat()
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+    config, key = config_cache.load_config(config_file)
+    assert key is not None
+
+
+def test_changed_environment_misses(
+    config_file: Path, monkeypatch: MonkeyPatch
+) -> None:
+    cache_and_reload(config_file)
+    monkeypatch.setenv("LOG_LEVEL", "DEBUG")
+
+    config, key = config_cache.load_config(config_file)
+    assert key is not None
+
+
+def test_sidecar(
+    config_file: Path, tmp_path: Path, monkeypatch: MonkeyPatch, mocker: MockFixture
+) -> None:
+    monkeypatch.setenv("LOG_CONFIG_CACHE_DIR", str(tmp_path / "cache"))
+    cache_and_reload(config_file)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    # As if in another process
+    config_cache.clear_cache()
+    safe_load = mocker.patch("yaml.safe_load")
+    config, key = config_cache.load_config(config_file)
+    assert key is None
+    assert config["handlers"]["console"]["formatter"] == "simple"
+    safe_load.assert_not_called()
+
+
+def test_no_sidecar_unless_json(
+    config_file: Path, tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("LOG_CONFIG_CACHE_DIR", str(tmp_path / "cache"))
+    config, key = config_cache.load_config(config_file)
+    assert key is not None
+    config["loggers"] = {"a": {"handlers": ("console",)}}
+    config_cache.store_config(key, config)
+    assert not (tmp_path / "cache").exists()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import pickle  # nosec
+from logging.handlers import SocketHandler
+from typing import Any, Dict, List
+
+import flask
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from she_logging import context, flask_request_id, request_id, wire
+from she_logging.aggregator import AggregatingHandler
+from she_logging.fastapi_request_id import RequestIDMiddleware
+from she_logging.logging import CustomisedJSONFormatter
+
+from .conftest import ListHandler, MakeLogger
+
+
+def formatted(handler: ListHandler, **kwargs: Any) -> List[dict]:
+    formatter = CustomisedJSONFormatter(**kwargs)
+    return [json.loads(formatter.format(record)) for record in handler.records]
+
+
+def test_bind_and_reset() -> None:
+    assert dict(context.current_context().fields) == {}
+
+    outer = context.bind(tenant="abc", user="1")
+    inner = context.bind(user="2", episode="3")
+    assert context.current_context().parent is not None
+    assert dict(context.current_context().fields) == {
+        "tenant": "abc",
+        "user": "2",
+        "episode": "3",
+    }
+
+    removed = context.unbind("tenant", "missing")
+    assert dict(context.current_context().fields) == {"user": "2", "episode": "3"}
+    context.reset_context(removed)
+
+    context.reset_context(inner)
+    assert dict(context.current_context().fields) == {"tenant": "abc", "user": "1"}
+    context.reset_context(outer)
+    assert context.current_context() is context.EMPTY_CONTEXT
+
+
+def test_bound() -> None:
+    with context.bound(tenant="abc") as bound_context:
+        assert context.current_context() is bound_context
+        cleared = context.clear_context()
+        assert not context.current_context()
+        context.reset_context(cleared)
+        assert str(context.current_context()) == "tenant=abc"
+    assert not context.current_context()
+
+
+def test_formatter_writes_bound_fields(make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    logger = make_logger("she-logging-context", handler)
+
+    logger.info("unbound")
+    with context.bound(tenant="abc", user="1"):
+        logger.info("bound", extra={"user": "2"})
+
+    unbound, bound = formatted(handler)
+    assert "tenant" not in unbound and "logContext" not in unbound
+    assert (bound["tenant"], bound["user"]) == ("abc", "2")
+
+    [_, bound] = formatted(handler, fields=["message", "extra"])
+    assert bound == {"message": "bound", "tenant": "abc", "user": "2"}
+
+
+def test_tasks_have_their_own_context() -> None:
+    async def request(tenant: str) -> Dict[str, object]:
+        context.bind(tenant=tenant)
+        await asyncio.sleep(0)
+        return dict(context.current_context().fields)
+
+    async def requests() -> List[Dict[str, object]]:
+        return list(await asyncio.gather(request("a"), request("b")))
+
+    assert asyncio.run(requests()) == [{"tenant": "a"}, {"tenant": "b"}]
+    assert not context.current_context()
+
+
+def test_fastapi(make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    logger = make_logger("she-logging-context-fastapi", handler)
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware)
+
+    @app.get("/tenant/{tenant}")
+    async def tenant(tenant: str) -> None:
+        context.bind(tenant=tenant)
+        logger.info("in request")
+
+    client = TestClient(app)
+    client.get("/tenant/abc", headers={"X-Request-ID": "1"})
+    client.get("/tenant/def", headers={"X-Request-ID": "2"})
+
+    assert [
+        (record["tenant"], record["requestID"]) for record in formatted(handler)
+    ] == [
+        ("abc", "1"),
+        ("def", "2"),
+    ]
+
+
+def test_flask_request_clears_context(
+    make_logger: MakeLogger, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(request_id, "_flask_fallback", True)
+    handler = ListHandler()
+    logger = make_logger("she-logging-context-flask", handler)
+    app = flask.Flask(__name__)
+    flask_request_id.init_app(app)
+
+    @app.route("/tenant/<tenant>")
+    def tenant(tenant: str) -> str:
+        context.bind(tenant=tenant)
+        logger.info("in request")
+        return tenant
+
+    client = app.test_client()
+    with context.bound(job="outer"):
+        client.get("/tenant/abc")
+        assert dict(context.current_context().fields) == {"job": "outer"}
+
+    [record] = formatted(handler)
+    assert record["tenant"] == "abc" and "job" not in record
+
+
+def test_aggregator_sends_bound_fields() -> None:
+    handler = AggregatingHandler("/nonexistent/writer.sock", [])
+    with context.bound(tenant="abc", user="1"):
+        record = logging.getLogger("she-logging-context").makeRecord(
+            "she-logging-context",
+            logging.INFO,
+            __file__,
+            1,
+            "sent",
+            (),
+            None,
+            extra={"user": "2"},
+        )
+    data = wire.decode(handler.makePickle(record)[4:])
+    assert (data["tenant"], data["user"]) == ("abc", "2")
+    assert "logContext" not in data
+
+
+def test_socket_handler_pickles_record() -> None:
+    with context.bound(tenant="abc"):
+        record = logging.getLogRecordFactory()(
+            "she-logging-context", logging.INFO, __file__, 1, "sent", (), None
+        )
+    data = pickle.loads(SocketHandler("localhost", 0).makePickle(record)[4:])  # nosec
+    assert logging.makeLogRecord(data).__dict__["logContext"].fields == {
+        "tenant": "abc"
+    }
@@ -1,14 +1,18 @@
+import asyncio
 import json
 import logging
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Optional
 
 import pytest
 from _pytest.logging import LogCaptureFixture
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from fastapi.testclient import TestClient
+from starlette.requests import Request
+from starlette.responses import Response
 
-from she_logging.fastapi_request_id import RequestContextMiddleware
-from she_logging.request_id import current_request_id
+from she_logging.fastapi_request_id import RequestContextMiddleware, RequestIDMiddleware
+from she_logging.request_id import counter_request_id, current_request_id
 
 
 @pytest.fixture
@@ -39,3 +43,68 @@ def test_fastapi_request_id(client: TestClient, caplog: LogCaptureFixture) -> No
     assert response.json()["request_id"] == "999-888-777"
     captured = json.loads(caplog.text)
     assert captured["message"] == "testme endpoint"
+
+
+@pytest.fixture
+def asgi_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware, id_generator=counter_request_id)
+
+    @app.get("/testme")
+    async def running() -> Dict[str, Optional[str]]:
+        return {"request_id": current_request_id()}
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def chunks() -> AsyncIterator[str]:
+            yield current_request_id() or ""
+            yield "\n"
+
+        return StreamingResponse(chunks(), headers={"X-Request-ID": "replaced"})
+
+    return TestClient(app)
+
+
+def test_asgi_request_id_from_header(asgi_client: TestClient) -> None:
+    response = asgi_client.get("/testme", headers={"X-Request-ID": "999-888-777"})
+    assert response.status_code == 200
+    assert response.json()["request_id"] == "999-888-777"
+    assert response.headers["X-Request-ID"] == "999-888-777"
+    assert current_request_id() is None
+
+
+def test_asgi_request_id_generated(asgi_client: TestClient) -> None:
+    first = asgi_client.get("/testme").headers["X-Request-ID"]
+    second = asgi_client.get("/testme").headers["X-Request-ID"]
+    assert first != second
+    assert first.rsplit("-", 1)[0] == second.rsplit("-", 1)[0]
+
+
+def test_asgi_streaming_response(asgi_client: TestClient) -> None:
+    response = asgi_client.get("/stream", headers={"X-Request-ID": "abc"})
+    assert response.text == "abc\n"
+    assert response.headers.get_list("X-Request-ID") == ["abc"]
+
+
+def test_request_id_reset_after_exception() -> None:
+    middleware = RequestContextMiddleware(FastAPI())
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "query_string": b"",
+            "headers": [(b"x-request-id", b"abc")],
+        }
+    )
+
+    async def fail(request: Request) -> Response:
+        assert current_request_id() == "abc"
+        raise RuntimeError("failed")
+
+    async def dispatch() -> Optional[str]:
+        with pytest.raises(RuntimeError):
+            await middleware.dispatch(request, fail)
+        return current_request_id()
+
+    assert asyncio.run(dispatch()) is None
@@ -0,0 +1,122 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import pytest
+from _pytest.capture import CaptureFixture
+
+from she_logging import files
+from she_logging.logging import CustomisedJSONFormatter
+
+from .conftest import MakeLogger
+
+SCRIPT = """
+from she_logging.logging import init_logging, logger
+
+init_logging()
+logger.info("to the file")
+"""
+
+
+def file_handler(path: Path, **kwargs: Any) -> files.RotatingFileHandler:
+    handler = files.RotatingFileHandler(str(path), flush_on_sigterm=False, **kwargs)
+    handler.setFormatter(CustomisedJSONFormatter())
+    return handler
+
+
+def test_rotates_by_size(tmp_path: Path, make_logger: MakeLogger) -> None:
+    path = tmp_path / "logs" / "service.log"
+    handler = file_handler(path, max_bytes=1000, buffer_size=400)
+    logger = make_logger("she-logging-files", handler)
+
+    for number in range(40):
+        logger.info("record %d", number)
+    handler.flush()
+    files.wait_for_compression()
+
+    rotated = files.rotated_files(str(path))
+    assert len(rotated) > 2 and all(name.endswith(".gz") for name in rotated)
+    for name in rotated:
+        assert len(gzip.decompress(Path(name).read_bytes())) <= 1000
+    messages = [record["message"] for record in files.read_records(str(path))]
+    assert messages == [f"record {number}" for number in range(40)]
+
+
+def test_backup_count(tmp_path: Path, make_logger: MakeLogger) -> None:
+    path = tmp_path / "service.log"
+    handler = file_handler(path, max_bytes=1, buffer_size=1, backup_count=2)
+    logger = make_logger("she-logging-files-backups", handler)
+
+    for number in range(6):
+        logger.info("record %d", number)
+    files.wait_for_compression()
+
+    assert len(files.rotated_files(str(path))) == 2
+    messages = [record["message"] for record in files.read_records(str(path))]
+    assert messages == ["record 3", "record 4", "record 5"]
+
+
+def test_rotates_by_time(tmp_path: Path, make_logger: MakeLogger) -> None:
+    path = tmp_path / "service.log"
+    handler = file_handler(path, when="1h", compression="none", buffer_size=1)
+    logger = make_logger("she-logging-files-time", handler)
+
+    logger.info("first")
+    logger.info("second")
+    assert files.rotated_files(str(path)) == []
+    handler._rollover_at = 0
+    logger.info("third")
+    files.wait_for_compression()
+
+    [rotated] = files.rotated_files(str(path))
+    assert '"first"' in Path(rotated).read_text()
+    assert [json.loads(line)["message"] for line in path.open()] == ["third"]
+
+
+def test_compresses_left_over_files(tmp_path: Path) -> None:
+    path = tmp_path / "service.log"
+    left_over = tmp_path / "service.log.20210601-120000"
+    left_over.write_text("old\n")
+    file_handler(path).close()
+    files.wait_for_compression()
+
+    assert files.rotated_files(str(path)) == [str(left_over) + ".gz"]
+    assert list(files.read_lines(str(path))) == ["old"]
+
+
+def test_invalid_options(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="compression"):
+        files.RotatingFileHandler(str(tmp_path / "a.log"), compression="bz2")
+    with pytest.raises(ValueError, match="interval"):
+        files.RotatingFileHandler(str(tmp_path / "a.log"), when="weekly")
+    assert files.rotation_interval("90s") == 90
+    assert files.rotation_interval("midnight") is None
+
+
+def test_main(tmp_path: Path, capsys: CaptureFixture) -> None:
+    path = tmp_path / "service.log"
+    (tmp_path / "service.log.20210601-120000.gz").write_bytes(gzip.compress(b"a\n"))
+    (tmp_path / "service.log.20210601-120000.1").write_text("b\n")
+    path.write_text("c\n")
+
+    assert files.main([str(path)]) == 0
+    assert capsys.readouterr().out == "a\nb\nc\n"
+    files.main([str(path), "--current-only"])
+    assert capsys.readouterr().out == "c\n"
+
+
+def test_log_file_environment(tmp_path: Path) -> None:
+    path = tmp_path / "service.log"
+    proc = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        stdout=subprocess.PIPE,
+        env={**os.environ, "LOG_FILE": str(path)},
+        timeout=60,
+    )
+    assert proc.returncode == 0 and proc.stdout == b""
+    [record] = files.read_records(str(path))
+    assert record["message"] == "to the file"
@@ -0,0 +1,148 @@
+import logging
+
+from pytest_mock import MockFixture
+
+from she_logging import async_logging, filters
+
+from .conftest import ListHandler, MakeLogger
+
+
+def filtered_handler(log_filter: logging.Filter) -> ListHandler:
+    handler = ListHandler()
+    handler.addFilter(log_filter)
+    return handler
+
+
+def test_rate_limit_suppresses_and_summarises(
+    mocker: MockFixture, make_logger: MakeLogger
+) -> None:
+    mocker.patch.object(filters, "_start_sweeper")
+    clock = mocker.patch.object(filters.time, "monotonic", return_value=100.0)
+    mocker.patch.object(filters.time, "time", return_value=1000.0)
+    rate_limit = filters.RateLimitFilter(rate=1, burst=3, quiet=1.0)
+    handler = filtered_handler(rate_limit)
+    logger = make_logger("she-logging-rate-limit", handler)
+
+    for n in range(10):
+        logger.warning("dependency down %d", n)
+    logger.warning("a different message")
+    assert handler.messages == [
+        "dependency down 0",
+        "dependency down 1",
+        "dependency down 2",
+        "a different message",
+    ]
+
+    clock.return_value = 101.5
+    logger.warning("dependency down %d", 10)
+
+    summary, record = handler.records[-2:]
+    assert summary.getMessage() == "7 similar messages suppressed: dependency down %d"
+    assert summary.__dict__["suppressed"] == 7
+    assert summary.levelno == logging.WARNING
+    assert record.getMessage() == "dependency down 10"
+
+
+def test_rate_limit_summary_after_quiet_period(
+    mocker: MockFixture, make_logger: MakeLogger
+) -> None:
+    mocker.patch.object(filters, "_start_sweeper")
+    clock = mocker.patch.object(filters.time, "monotonic", return_value=100.0)
+    wall_clock = mocker.patch.object(filters.time, "time", return_value=1000.0)
+    rate_limit = filters.RateLimitFilter(rate=0.001, burst=1, quiet=1.0)
+    handler = filtered_handler(rate_limit)
+    logger = make_logger("she-logging-rate-limit-quiet", handler)
+
+    for _ in range(3):
+        logger.info("flapping")
+    clock.return_value = wall_clock.return_value = 2000.0
+    logger.info("something else")
+
+    assert handler.messages == [
+        "flapping",
+        "2 similar messages suppressed: flapping",
+        "something else",
+    ]
+
+
+def test_rate_limit_flush(mocker: MockFixture, make_logger: MakeLogger) -> None:
+    start_sweeper = mocker.patch.object(filters, "_start_sweeper")
+    wall_clock = mocker.patch.object(filters.time, "time", return_value=1000.0)
+    rate_limit = filters.RateLimitFilter(rate=0.001, burst=1, quiet=1.0)
+    handler = filtered_handler(rate_limit)
+    logger = make_logger("she-logging-rate-limit-flush", handler)
+
+    for _ in range(3):
+        logger.warning("flapping")
+    start_sweeper.assert_called_once_with()
+
+    # Nothing else is logged, the sweeper thread writes the summary once it is due
+    rate_limit.flush()
+    assert handler.messages == ["flapping"]
+    wall_clock.return_value = 1001.5
+    rate_limit.flush()
+    assert handler.messages == ["flapping", "2 similar messages suppressed: flapping"]
+
+    logger.warning("flapping")
+    filters.flush_rate_limit_summaries()
+    assert handler.messages[-1] == "1 similar messages suppressed: flapping"
+
+
+def test_rate_limit_with_async_logging(
+    mocker: MockFixture, make_logger: MakeLogger
+) -> None:
+    mocker.patch.object(filters, "_start_sweeper")
+    rate_limit = filters.RateLimitFilter(rate=0.001, burst=2)
+    handler = filtered_handler(rate_limit)
+    logger = make_logger("she-logging-rate-limit-async", handler)
+
+    async_logging.start_async_logging(loggers=[logger])
+    try:
+        for n in range(10):
+            logger.warning("dep flapping %d", n)
+        rate_limit.flush(force=True)
+    finally:
+        async_logging.stop_async_logging()
+
+    assert len(rate_limit._buckets) == 1
+    assert handler.messages == [
+        "dep flapping 0",
+        "dep flapping 1",
+        "8 similar messages suppressed: dep flapping %d",
+    ]
+    assert handler.filters == [rate_limit]
+
+
+def test_rate_limit_max_keys(make_logger: MakeLogger) -> None:
+    rate_limit = filters.RateLimitFilter(max_keys=5)
+    logger = make_logger("she-logging-rate-limit-keys", filtered_handler(rate_limit))
+    for n in range(20):
+        logger.info(f"message {n}")
+    assert len(rate_limit._buckets) <= 5
+
+
+def test_sampling(mocker: MockFixture, make_logger: MakeLogger) -> None:
+    mocker.patch.object(filters.random, "random", side_effect=[0.05, 0.5, 0.05, 0.5])
+    handler = filtered_handler(filters.SamplingFilter(debug=0.1, info=0.1))
+    logger = make_logger("she-logging-sampling", handler)
+
+    logger.debug("debug 1")
+    logger.debug("debug 2")
+    logger.info("info 1")
+    logger.info("info 2")
+    logger.warning("warning")
+
+    assert handler.messages == [
+        "debug 1",
+        "info 1",
+        "warning",
+    ]
+
+
+def test_she_filters() -> None:
+    assert filters.she_filters(0, 20, 1.0, 1.0) == ({}, [])
+
+    config, names = filters.she_filters(5, 10, 0.5, 1.0)
+    assert names == ["sample", "rate_limit"]
+    assert config["rate_limit"]["rate"] == 5
+    assert config["sample"]["debug"] == 0.5
@@ -0,0 +1,41 @@
+from typing import Dict, Optional
+
+import flask
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from flask.testing import FlaskClient
+
+from she_logging import flask_request_id, request_id
+
+
+@pytest.fixture
+def flask_client(monkeypatch: MonkeyPatch) -> FlaskClient:
+    monkeypatch.setattr(request_id, "_flask_fallback", True)
+    app = flask.Flask(__name__)
+    flask_request_id.init_app(app)
+
+    @app.route("/testme")
+    def running() -> Dict[str, Optional[str]]:
+        return {"request_id": request_id.current_request_id()}
+
+    return app.test_client()
+
+
+def test_request_id_set_for_request(flask_client: FlaskClient) -> None:
+    response = flask_client.get("/testme", headers={"X-Request-ID": "999-888-777"})
+    assert response.json == {"request_id": "999-888-777"}
+
+    response = flask_client.get("/testme")
+    assert response.json is not None
+    assert response.json["request_id"] not in (None, "999-888-777")
+
+
+def test_no_flask_lookup_outside_requests(
+    flask_client: FlaskClient, monkeypatch: MonkeyPatch
+) -> None:
+    def flask_lookup() -> str:
+        raise AssertionError("looked up the flask request ID")
+
+    flask_client.get("/testme")
+    monkeypatch.setattr(request_id, "flask_request_id", flask_lookup)
+    assert request_id.current_request_id() is None
@@ -0,0 +1,167 @@
+import io
+import logging
+import os
+import signal
+import subprocess
+import sys
+from typing import IO, Any
+
+from pytest_mock import MockFixture
+
+from she_logging import handlers
+
+from .conftest import MakeLogger
+
+SIGTERM_SCRIPT = """
+import logging, os, signal, sys
+from she_logging.handlers import BufferedStreamHandler
+
+handler = BufferedStreamHandler(sys.stdout)
+handler.setFormatter(logging.Formatter("%(message)s"))
+logging.getLogger().addHandler(handler)
+logging.getLogger().setLevel(logging.INFO)
+logging.info("buffered before SIGTERM")
+os.kill(os.getpid(), signal.SIGTERM)
+"""
+
+
+def buffered_handler(stream: IO[str], **kwargs: Any) -> handlers.BufferedStreamHandler:
+    handler = handlers.BufferedStreamHandler(stream, flush_on_sigterm=False, **kwargs)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def test_buffers_until_full(make_logger: MakeLogger) -> None:
+    stream = io.StringIO()
+    handler = buffered_handler(stream, buffer_size=32)
+    logger = make_logger("she-logging-buffered", handler)
+
+    logger.info("one")
+    logger.info("two")
+    assert stream.getvalue() == ""
+
+    logger.info("x" * 30)
+    assert stream.getvalue() == "one\ntwo\n"
+
+    handler.flush()
+    assert stream.getvalue() == "one\ntwo\n" + "x" * 30 + "\n"
+
+
+def test_larger_than_buffer(make_logger: MakeLogger) -> None:
+    stream = io.StringIO()
+    logger = make_logger(
+        "she-logging-buffered-large", buffered_handler(stream, buffer_size=8)
+    )
+
+    logger.info("one")
+    logger.info("a long message")
+    assert stream.getvalue() == "one\na long message\n"
+
+
+def test_error_flushes(make_logger: MakeLogger) -> None:
+    stream = io.StringIO()
+    logger = make_logger("she-logging-buffered-error", buffered_handler(stream))
+
+    logger.info("info")
+    logger.warning("warning")
+    assert stream.getvalue() == ""
+    logger.error("error")
+    assert stream.getvalue() == "info\nwarning\nerror\n"
+
+
+def test_flush_interval(mocker: MockFixture, make_logger: MakeLogger) -> None:
+    clock = mocker.patch.object(handlers.time, "monotonic", return_value=100.0)
+    stream = io.StringIO()
+    handler = buffered_handler(stream, flush_interval=1.0)
+    logger = make_logger("she-logging-buffered-interval", handler)
+
+    logger.info("one")
+    handler.flush_if_due()
+    assert stream.getvalue() == ""
+
+    clock.return_value = 101.5
+    handler.flush_if_due()
+    assert stream.getvalue() == "one\n"
+
+    clock.return_value = 103.0
+    logger.info("two")
+    assert stream.getvalue() == "one\ntwo\n"
+
+
+def test_writes_to_file_descriptor(make_logger: MakeLogger) -> None:
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "rb") as reader:
+        with os.fdopen(write_fd, "w", encoding="utf-8") as stream:
+            handler = buffered_handler(stream)
+            logger = make_logger("she-logging-buffered-fd", handler)
+            assert handler._fd == write_fd
+
+            logger.info("café")
+            logger.info("two")
+            handler.flush()
+            expected = "café\ntwo\n".encode("utf-8")
+            assert reader.read(len(expected)) == expected
+            handler.close()
+
+
+def test_flush_buffered_handlers(make_logger: MakeLogger) -> None:
+    stream = io.StringIO()
+    handler = buffered_handler(stream)
+    logger = make_logger("she-logging-buffered-all", handler)
+    logger.info("pending")
+
+    handlers.flush_buffered_handlers()
+    assert stream.getvalue() == "pending\n"
+
+    handler.close()
+    assert handler not in handlers._handlers
+
+
+def test_fork_does_not_duplicate_buffered_records(make_logger: MakeLogger) -> None:
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(read_fd, "rb") as reader:
+        with os.fdopen(write_fd, "w", encoding="utf-8") as stream:
+            handler = buffered_handler(stream)
+            logger = make_logger("she-logging-buffered-fork", handler)
+            logger.info("before fork")
+
+            pid = os.fork()
+            if pid == 0:
+                handler.flush()
+                os._exit(0)
+            os.waitpid(pid, 0)
+            handler.close()
+
+        assert reader.read() == b"before fork\n"
+
+
+def test_sigterm_flushes_and_terminates() -> None:
+    result = subprocess.run(
+        [sys.executable, "-c", SIGTERM_SCRIPT], stdout=subprocess.PIPE, timeout=30
+    )
+    assert result.stdout == b"buffered before SIGTERM\n"
+    assert result.returncode == -signal.SIGTERM
+
+
+def test_sigterm_waits_for_handler_lock(
+    mocker: MockFixture, make_logger: MakeLogger
+) -> None:
+    previous = mocker.patch.object(handlers, "_previous_sigterm")
+    stream = io.StringIO()
+    handler = buffered_handler(stream)
+    logger = make_logger("she-logging-buffered-sigterm", handler)
+    logger.info("one")
+
+    # As if the signal arrived while this thread was part way through emit()
+    handler.acquire()
+    try:
+        handlers._on_sigterm(signal.SIGTERM, None)
+        assert stream.getvalue() == ""
+        previous.assert_not_called()
+    finally:
+        handler.release()
+
+    logger.info("two")
+    assert stream.getvalue() == "one\ntwo\n"
+    previous.assert_called_once_with(signal.SIGTERM, None)
+    assert handlers._pending_sigterm is None
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+# Optional packages which are only imported when the feature using them is
+OPTIONAL = {"yaml", "rich", "flask", "flask_log_request_id"}
+# Import time of she_logging not counting its required dependencies
+BUDGET_US = 50000
+DEPENDENCIES = ("environs", "json_log_formatter")
+
+
+def import_times(code: str, **env: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds of each module `code` imports."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stderr=subprocess.PIPE,
+        env={**os.environ, **env},
+        check=True,
+        timeout=60,
+    )
+    times: Dict[str, int] = {}
+    for line in result.stderr.decode().splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_import_does_not_load_optional_packages() -> None:
+    times = import_times("import she_logging")
+    assert not OPTIONAL & set(times)
+
+
+@pytest.mark.parametrize("log_format", ["json", "plain"])
+def test_logging_does_not_load_optional_packages(log_format: str) -> None:
+    times = import_times(
+        "from she_logging import logger; logger.info('hello')", LOG_FORMAT=log_format
+    )
+    assert not OPTIONAL & set(times)
+
+
+def test_import_time() -> None:
+    # Best of three, the first run may read the modules from disk
+    own = min(
+        times["she_logging"] - sum(times.get(name, 0) for name in DEPENDENCIES)
+        for times in (import_times("import she_logging") for _ in range(3))
+    )
+    assert own < BUDGET_US
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+
+import flask
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest_mock import MockFixture
+
+from she_logging import gunicorn_logger, levels
+from she_logging.fastapi_levels import log_levels_app
+from she_logging.flask_levels import log_levels_blueprint
+from she_logging.logging import LogProxy
+
+NAME = "she-logging-levels"
+
+
+@pytest.fixture(autouse=True)
+def logger() -> Iterator[logging.Logger]:
+    logger = logging.getLogger(NAME)
+    logger.setLevel(logging.WARNING)
+    yield logger
+    levels.reset_levels()
+    logger.setLevel(logging.NOTSET)
+
+
+def wait_for(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + 5
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_set_and_revert(logger: logging.Logger) -> None:
+    proxy = LogProxy(NAME)
+    proxy.debug("cached as disabled")
+
+    levels.set_levels({NAME: "debug", f"{NAME}.child": logging.ERROR}, 0.2)
+    assert logger.level == logging.DEBUG and logger.isEnabledFor(logging.DEBUG)
+    assert proxy.__dict__.get("debug") is None, "LogProxy cache cleared"
+    state = levels.get_levels()
+    assert state["levels"][NAME] == "DEBUG"
+    assert state["reverts"][NAME]["level"] == "WARNING"
+    assert 0 < state["reverts"][NAME]["seconds"] <= 0.2
+
+    levels.set_level(NAME, "INFO", 0.2)
+    assert levels.get_levels()["reverts"][NAME]["level"] == "WARNING"
+    proxy.debug("cached as disabled again")
+    wait_for(lambda: not levels.get_levels()["reverts"])
+    assert logger.level == logging.WARNING
+    assert proxy.__dict__.get("debug") is None, "LogProxy cache cleared on revert"
+    assert logging.getLogger(f"{NAME}.child").level == logging.NOTSET
+
+
+def test_permanent_and_reset(logger: logging.Logger) -> None:
+    levels.set_level(NAME, "ERROR", revert_after=0)
+    assert levels.get_levels()["reverts"] == {}
+    levels.set_level(NAME, "DEBUG", revert_after=60)
+    levels.reset_levels()
+    assert logger.level == logging.ERROR
+
+
+def test_invalid_level_changes_nothing(logger: logging.Logger) -> None:
+    with pytest.raises(ValueError):
+        levels.set_levels({NAME: "DEBUG", "other": "LOUD"})
+    with pytest.raises(ValueError):
+        levels.set_levels({NAME: None})  # type: ignore[dict-item]
+    with pytest.raises(ValueError):
+        levels.apply_levels({NAME: "DEBUG"})
+    assert logger.level == logging.WARNING
+
+
+def test_reload_signal(tmp_path: Path, logger: logging.Logger) -> None:
+    path = tmp_path / "levels.json"
+    path.write_text(json.dumps({"levels": {NAME: "DEBUG"}, "revert_after": 60}))
+    previous = signal.getsignal(signal.SIGUSR2)
+    try:
+        levels.install_reload_signal(str(path), signal.SIGUSR2)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        wait_for(lambda: logger.level == logging.DEBUG)
+    finally:
+        signal.signal(signal.SIGUSR2, previous)
+    assert logger.level == logging.DEBUG
+
+
+def test_gunicorn_reopen_files(
+    tmp_path: Path, mocker: MockFixture, logger: logging.Logger
+) -> None:
+    path = tmp_path / "levels.json"
+    path.write_text(json.dumps({"levels": {NAME: "INFO"}, "revert_after": 60}))
+    mocker.patch.object(levels, "_reload_path", str(path))
+    mocker.patch.object(gunicorn_logger.logging, "LOG_LEVEL_FILE", str(path))
+    reopen_files = mocker.patch.object(gunicorn_logger.glogging.Logger, "reopen_files")
+    # Gunicorn calls reopen_files on SIGUSR1, in place of the reload signal handler
+    gunicorn_logger.Logger.__new__(gunicorn_logger.Logger).reopen_files()
+    reopen_files.assert_called_once()
+    wait_for(lambda: logger.level == logging.INFO)
+    assert logger.level == logging.INFO
+
+
+def test_flask_endpoints(logger: logging.Logger) -> None:
+    app = flask.Flask(__name__)
+    app.register_blueprint(log_levels_blueprint(), url_prefix="/admin")
+    client = app.test_client()
+
+    response = client.put("/admin/log-levels", json={"levels": {NAME: "DEBUG"}})
+    assert response.status_code == 200 and response.json is not None
+    assert response.json["levels"][NAME] == "DEBUG"
+    assert client.put("/admin/log-levels", json={NAME: "DEBUG"}).status_code == 400
+    assert client.put("/admin/log-levels", data="{").status_code == 400
+    assert client.delete("/admin/log-levels").status_code == 200
+    assert logger.level == logging.WARNING
+
+
+def test_fastapi_endpoints(logger: logging.Logger) -> None:
+    app = FastAPI()
+    app.mount("/admin/log-levels", log_levels_app())
+    client = TestClient(app)
+
+    response = client.put("/admin/log-levels/", json={"levels": {NAME: "DEBUG"}})
+    assert response.status_code == 200
+    assert response.json()["reverts"][NAME]["level"] == "WARNING"
+    assert client.get("/admin/log-levels/").json()["levels"][NAME] == "DEBUG"
+    assert client.put("/admin/log-levels/", content=b"{").status_code == 400
+    assert client.delete("/admin/log-levels/").status_code == 200
+    assert logger.level == logging.WARNING
@@ -1,7 +1,9 @@
 import datetime
 import json
 import logging
+import sys
 
+import pytest
 from _pytest.capture import CaptureFixture
 from _pytest.logging import LogCaptureFixture
 from flask_log_request_id import RequestID
@@ -117,3 +119,108 @@ def test_json_log_request(caplog: LogCaptureFixture) -> None:
         assert log_object["X-Version"] == "19.1"
         assert log_object["severity"] == "INFO"
         assert log_object["message"] == record.getMessage()
+
+
+def make_record(**extra: object) -> logging.LogRecord:
+    record = logging.getLogRecordFactory()(
+        "test", logging.WARNING, "/app/module.py", 42, "hello %s", ("world",), None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_field_plan() -> None:
+    from she_logging.logging import CustomisedJSONFormatter
+
+    formatter = CustomisedJSONFormatter(
+        serializer="json",
+        fields=["message", {"level": "levelname"}, "lineno", "extra", "exc_info"],
+    )
+    output = formatter.format(make_record(patient="abc", count=2))
+
+    assert output == (
+        '{"message": "hello world", "level": "WARNING", "lineno": 42, '
+        '"patient": "abc", "count": 2}'
+    )
+
+
+def test_field_plan_exception_and_headers() -> None:
+    from flask import Flask
+
+    from she_logging.logging import CustomisedJSONFormatter
+
+    formatter = CustomisedJSONFormatter(
+        fields=[
+            "message",
+            "header:X-Client",
+            {"version": "header:X-Version"},
+            "exc_info",
+        ]
+    )
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        record = make_record(exc_info=sys.exc_info())
+
+    app = Flask(__name__)
+    with app.test_request_context("url", headers={"X-Client": "gdm-desktop"}):
+        log_object = json.loads(formatter.format(record))
+
+    assert list(log_object) == ["message", "X-Client", "exc_info"]
+    assert log_object["X-Client"] == "gdm-desktop"
+    assert "ZeroDivisionError" in log_object["exc_info"]
+
+
+def test_field_plan_invalid() -> None:
+    from she_logging.logging import CustomisedJSONFormatter
+
+    with pytest.raises(ValueError):
+        CustomisedJSONFormatter(fields=[{"a": "levelname", "b": "lineno"}])
+
+
+def test_lazy_message(capsys: CaptureFixture) -> None:
+    from she_logging.logging import Lazy
+
+    calls = []
+
+    def expensive(value: int) -> str:
+        calls.append(value)
+        return f"expensive {value}"
+
+    logger = logging.getLogger("she-logging-lazy")
+    logger.propagate = False
+    handler = logging.StreamHandler()
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+
+    logger.debug(Lazy(lambda: expensive(1)))
+    logger.debug("value %s", Lazy(expensive, 2))
+    logger.info(Lazy(lambda: expensive(3)))
+    logger.info("value %s", Lazy(expensive, 4))
+    # Other callables are logged as before, not called
+    logger.info(expensive)
+
+    assert calls == [3, 4]
+    assert capsys.readouterr().err.startswith(
+        "expensive 3\nvalue expensive 4\n<function "
+    )
+
+
+def test_log_proxy_level_cache() -> None:
+    from she_logging import logging as my_logging
+
+    underlying = logging.getLogger("she-logging-proxy")
+    underlying.setLevel(logging.INFO)
+    proxy = my_logging.LogProxy("she-logging-proxy")
+
+    assert proxy.debug is my_logging._disabled
+    assert proxy.info == underlying.info
+    assert proxy.isEnabledFor == underlying.isEnabledFor
+    assert proxy.isEnabledFor(logging.DEBUG) is False
+
+    underlying.setLevel(logging.DEBUG)
+    assert proxy.debug is my_logging._disabled, "cached until invalidated"
+    my_logging.LogProxy.invalidate_all()
+
+    assert proxy.debug == underlying.debug
+    assert proxy.isEnabledFor(logging.DEBUG) is True
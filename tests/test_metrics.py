@@ -0,0 +1,94 @@
+import io
+import logging
+import threading
+from typing import Iterator
+
+import flask
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from she_logging import metrics
+
+from .conftest import MakeLogger
+
+
+@pytest.fixture
+def instrumented(make_logger: MakeLogger) -> Iterator[logging.Logger]:
+    metrics.reset()
+    handler = logging.StreamHandler(io.StringIO())
+    handler.set_name("test")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    metrics.instrument_handler(handler)
+    yield make_logger("she-logging-metrics", handler)
+    metrics.reset()
+
+
+def test_counts_records_and_bytes(instrumented: logging.Logger) -> None:
+    instrumented.info("café")
+    instrumented.info("two")
+    instrumented.warning("three")
+    instrumented.debug("four")
+
+    data = metrics.snapshot()
+    assert data["records"] == [
+        {"handler": "test", "logger": "she-logging-metrics", "level": level, "count": n}
+        for level, n in (("DEBUG", 1), ("INFO", 2), ("WARNING", 1))
+    ]
+    assert data["bytes"] == {"test": len("café\ntwo\nthree\nfour\n".encode())}
+    for kind in ("format_seconds", "emit_seconds"):
+        summary = data[kind]["test"]
+        assert summary["count"] == 4
+        assert 0 < summary["0.5"] <= summary["max"] <= summary["sum"]
+
+
+def test_merges_threads(instrumented: logging.Logger) -> None:
+    def log() -> None:
+        for _ in range(100):
+            instrumented.info("from a thread")
+
+    threads = [threading.Thread(target=log) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    [row] = metrics.snapshot()["records"]
+    assert row["count"] == 400
+    assert metrics.snapshot()["emit_seconds"]["test"]["count"] == 400
+
+
+def test_reservoir_is_bounded() -> None:
+    reservoir = metrics.Reservoir(size=10)
+    for value in range(1000):
+        reservoir.add(float(value))
+    assert len(reservoir.samples) == 10
+    assert (reservoir.count, reservoir.total, reservoir.maximum) == (1000, 499500, 999)
+
+
+def test_prometheus_text(instrumented: logging.Logger) -> None:
+    instrumented.error('quoted "message"')
+    text = metrics.prometheus_text()
+    assert (
+        'she_logging_records_total{handler="test",logger="she-logging-metrics",'
+        'level="ERROR"} 1\n' in text
+    )
+    assert 'she_logging_bytes_total{handler="test"} 17\n' in text
+    assert "# TYPE she_logging_emit_seconds summary\n" in text
+    assert 'she_logging_format_seconds_count{handler="test"} 1\n' in text
+
+
+def test_flask_and_fastapi_endpoints(instrumented: logging.Logger) -> None:
+    instrumented.info("served")
+
+    flask_app = flask.Flask(__name__)
+    metrics.add_flask_metrics(flask_app)
+    response = flask_app.test_client().get("/metrics")
+    assert response.content_type == metrics.PROMETHEUS_CONTENT_TYPE
+    assert "she_logging_records_total" in response.get_data(as_text=True)
+
+    fastapi_app = FastAPI()
+    metrics.add_fastapi_metrics(fastapi_app, "/logging-metrics")
+    response = TestClient(fastapi_app).get("/logging-metrics")
+    assert response.headers["content-type"] == metrics.PROMETHEUS_CONTENT_TYPE
+    assert "she_logging_records_total" in response.text
@@ -0,0 +1,79 @@
+import logging
+import sys
+
+import pytest
+
+from she_logging.logging import SIMPLE_FORMAT
+from she_logging.plaintext import PlaintextFormatter, compile_format
+
+FORMATS = [
+    SIMPLE_FORMAT,
+    "%(levelname)-8s|%(name)10s|%(lineno)04d|%(levelno).1f %(message)r",
+    "100%% %(message)s %%(literal)s",
+    "%(message)s",
+    "%(asctime)s",
+]
+
+
+def make_record(**attrs: object) -> logging.LogRecord:
+    record = logging.getLogRecordFactory()(
+        "test.plaintext", logging.WARNING, __file__, 42, "hello %s", ("world",), None
+    )
+    record.__dict__.update(attrs)
+    return record
+
+
+def raised() -> object:
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        return sys.exc_info()
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_matches_formatter(fmt: str) -> None:
+    record = make_record()
+    assert PlaintextFormatter(fmt).format(record) == logging.Formatter(fmt).format(
+        record
+    )
+
+
+def test_exception_and_stack() -> None:
+    record = make_record(exc_info=raised(), stack_info="Stack (most recent call last)")
+    expected = logging.Formatter(SIMPLE_FORMAT).format(record)
+    record.exc_text = None
+    assert PlaintextFormatter(SIMPLE_FORMAT).format(record) == expected
+    assert "ValueError: bad" in expected
+
+
+def test_datefmt() -> None:
+    record = make_record()
+    fmt = "%(asctime)s %(message)s"
+    assert PlaintextFormatter(fmt, "%H:%M").format(record) == logging.Formatter(
+        fmt, "%H:%M"
+    ).format(record)
+
+
+def test_message_not_computed_when_unused() -> None:
+    record = make_record()
+    assert PlaintextFormatter("%(levelname)s").format(record) == "WARNING"
+    assert not hasattr(record, "message")
+
+
+def test_missing_field() -> None:
+    with pytest.raises(ValueError, match="'unknown'"):
+        PlaintextFormatter("%(unknown)s").format(make_record())
+
+
+def test_other_styles_use_formatter() -> None:
+    record = make_record()
+    formatter = PlaintextFormatter("{levelname} {message}", style="{")
+    assert formatter.format(record) == "WARNING hello world"
+
+
+def test_compile_format() -> None:
+    assert compile_format("[%(asctime)s] %(levelname)-8s %%(x)s") == (
+        "[%s] %-8s %%(x)s",
+        ["asctime", "levelname"],
+    )
+    assert compile_format("%(width)*d") is None
@@ -0,0 +1,99 @@
+import copy
+import json
+import logging
+import pickle  # nosec
+from logging.handlers import SocketHandler
+from typing import Iterator
+
+import pytest
+
+from she_logging import async_logging, context
+from she_logging.logging import SIMPLE_FORMAT, CustomisedJSONFormatter
+from she_logging.records import CompactLogRecord, RecordDict
+
+from .conftest import ListHandler, MakeLogger
+
+ARGS = ("she-logging-records", logging.INFO, "/app/service.py", 3, "hello %s", ("x",))
+
+
+@pytest.fixture
+def compact_records() -> Iterator[None]:
+    factory = logging.getLogRecordFactory()
+    logging.setLogRecordFactory(CompactLogRecord)
+    yield
+    logging.setLogRecordFactory(factory)
+
+
+def test_same_attributes_as_record_factory() -> None:
+    standard = logging.getLogRecordFactory()(*ARGS, None)
+    compact = CompactLogRecord(*ARGS, None)
+
+    expected = dict(vars(standard))
+    actual = dict(vars(compact))
+    for key in ("created", "msecs", "relativeCreated", "logContext"):
+        del expected[key], actual[key]
+    assert actual == expected
+    assert isinstance(vars(compact), RecordDict)
+
+
+def test_file_names_shared() -> None:
+    first, second = CompactLogRecord(*ARGS, None), CompactLogRecord(*ARGS, None)
+    assert (first.filename, first.module) == ("service.py", "service")
+    assert first.module is second.module
+
+
+def test_extra_and_formatters(compact_records: None, make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    logger = make_logger("she-logging-records", handler)
+    with context.bound(tenant="abc"):
+        logger.info("hello %s", "world", extra={"count": 3})
+    [record] = handler.records
+
+    assert isinstance(record, CompactLogRecord)
+    assert record.__dict__["count"] == 3 and "count" in vars(record)
+    data = json.loads(CustomisedJSONFormatter().format(record))
+    assert (data["message"], data["count"], data["tenant"]) == ("hello world", 3, "abc")
+    text = logging.Formatter("%(levelname)s %(count)s %(message)s").format(record)
+    assert text == "INFO 3 hello world"
+    assert logging.Formatter(SIMPLE_FORMAT).format(record).endswith("hello world")
+
+    with pytest.raises(KeyError):
+        logger.info("clash", extra={"msg": "overwritten"})
+
+
+def test_record_dict_mapping() -> None:
+    record = CompactLogRecord(*ARGS, None)
+    values = vars(record)
+    assert "message" not in values and values.get("message") is None
+    values["message"] = "set"
+    values["custom"] = 1
+    assert (record.message, record.custom) == ("set", 1)  # type: ignore[attr-defined]
+    del values["custom"], values["message"]
+    assert not hasattr(record, "custom") and not hasattr(record, "message")
+    with pytest.raises(KeyError):
+        del values["message"]
+    assert len(values) == len(list(values))
+    assert {"default": 1} | values == {"default": 1, **values}  # type: ignore
+
+
+def test_copy_and_pickle() -> None:
+    record = CompactLogRecord(*ARGS, None)
+    record.__dict__["custom"] = 1
+    for restored in (
+        copy.copy(record),
+        pickle.loads(pickle.dumps(record)),  # nosec
+        logging.makeLogRecord(
+            pickle.loads(SocketHandler("localhost", 0).makePickle(record)[4:])  # nosec
+        ),
+    ):
+        assert restored.getMessage() == "hello x"
+        assert restored.__dict__["custom"] == 1
+
+
+def test_queued(compact_records: None) -> None:
+    handler = async_logging.BoundedQueueHandler(header_keys=())
+    record = logging.getLogRecordFactory()(*ARGS, None)
+    handler.handle(record)
+    queued = handler.queue.get_nowait()
+    assert isinstance(queued, CompactLogRecord)
+    assert (queued.msg, queued.args) == ("hello x", None)
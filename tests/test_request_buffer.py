@@ -0,0 +1,160 @@
+import logging
+from typing import Iterator, Tuple
+
+import flask
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+from she_logging import flask_request_id, levels, request_buffer, request_id
+from she_logging.fastapi_request_id import RequestIDMiddleware
+
+from .conftest import ListHandler
+
+NAME = "she-logging-request-buffer"
+
+
+@pytest.fixture
+def buffered(monkeypatch: MonkeyPatch) -> Iterator[Tuple[logging.Logger, ListHandler]]:
+    """A logger without a level of its own, its handler buffering below INFO."""
+    root = logging.getLogger()
+    monkeypatch.setattr(root, "level", root.level)
+    monkeypatch.setattr(root, "__class__", root.__class__)
+    monkeypatch.setattr(request_buffer, "_installed", False)
+    monkeypatch.setattr(request_buffer, "_level", request_buffer._level)
+    monkeypatch.setattr(request_buffer, "_capture_level", request_buffer._capture_level)
+    handler = ListHandler()
+    logger = logging.getLogger(NAME)
+    logger.handlers = [handler]
+    logger.propagate = False
+    request_buffer.install_request_buffer(
+        logging.INFO, size=3, max_records=4, loggers=[logger]
+    )
+    # pytest adds its capture handlers to the root and non-propagating loggers for
+    # each test, keep them unfiltered so only `handler` buffers records
+    root.__class__ = logging.RootLogger
+    yield logger, handler
+    logger.handlers = []
+    logger.propagate = True
+    logging.getLogger(f"{NAME}.own").setLevel(logging.NOTSET)
+
+
+def test_dropped_outside_requests(buffered: Tuple[logging.Logger, ListHandler]) -> None:
+    logger, handler = buffered
+    logger.debug("dropped")
+    logger.info("written")
+    own = logging.getLogger(f"{NAME}.own")
+    own.setLevel(logging.DEBUG)
+    own.debug("own level")
+    assert handler.messages == ["written", "own level"]
+
+
+def test_handlers_added_later(buffered: Tuple[logging.Logger, ListHandler]) -> None:
+    root = logging.getLogger()
+    later = ListHandler()
+    root.__class__ = request_buffer._BufferedRootLogger
+    try:
+        root.addHandler(later)
+    finally:
+        root.__class__ = logging.RootLogger
+    try:
+        root.debug("dropped")
+        root.info("written")
+    finally:
+        root.removeHandler(later)
+    assert later.messages == ["written"]
+
+
+def test_root_level_changes(buffered: Tuple[logging.Logger, ListHandler]) -> None:
+    logger, handler = buffered
+    root = logging.getLogger()
+    levels.set_levels({"root": "WARNING"}, revert_after=60)
+    assert levels.get_levels()["levels"]["root"] == "WARNING"
+    assert levels.get_levels()["reverts"]["root"]["level"] == "INFO"
+    assert root.level == logging.DEBUG, "still creating the records to buffer"
+    logger.info("dropped")
+    levels.reset_levels()
+    assert request_buffer.root_level() == logging.INFO
+    assert root.level == logging.DEBUG
+    logger.info("written")
+    assert handler.messages == ["written"]
+
+
+def test_discarded_on_success(buffered: Tuple[logging.Logger, ListHandler]) -> None:
+    logger, handler = buffered
+    token = request_buffer.start_request_buffer()
+    logger.debug("one")
+    logger.info("written")
+    assert request_buffer.held_records() == 1
+    request_buffer.end_request_buffer(token, failed=False)
+    assert handler.messages == ["written"]
+    assert request_buffer.held_records() == 0
+
+
+def test_flushed_by_error(buffered: Tuple[logging.Logger, ListHandler]) -> None:
+    logger, handler = buffered
+    token = request_buffer.start_request_buffer()
+    for number in range(4):
+        logger.debug("debug %d", number)
+    logger.error("failed")
+    logger.debug("after")
+    request_buffer.end_request_buffer(token, failed=False)
+    assert handler.messages == ["debug 1", "debug 2", "debug 3", "failed", "after"]
+    assert request_buffer.held_records() == 0
+
+
+def test_global_cap(buffered: Tuple[logging.Logger, ListHandler]) -> None:
+    logger, handler = buffered
+    first = request_buffer.start_request_buffer()
+    for number in range(3):
+        logger.debug("first %d", number)
+    second = request_buffer.start_request_buffer()
+    for number in range(3):
+        logger.debug("second %d", number)
+    assert request_buffer.held_records() == 4
+    request_buffer.end_request_buffer(second, failed=True)
+    request_buffer.end_request_buffer(first, failed=False)
+    assert handler.messages == ["second 0"]
+    assert request_buffer.held_records() == 0
+
+
+def test_asgi_middleware(buffered: Tuple[logging.Logger, ListHandler]) -> None:
+    logger, handler = buffered
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware)
+
+    @app.get("/status/{status}")
+    async def respond(status: int) -> PlainTextResponse:
+        logger.debug("handling %d", status)
+        return PlainTextResponse("", status_code=status)
+
+    client = TestClient(app)
+    client.get("/status/200")
+    client.get("/status/503")
+    assert handler.messages == ["handling 503"]
+
+
+def test_flask(
+    buffered: Tuple[logging.Logger, ListHandler], monkeypatch: MonkeyPatch
+) -> None:
+    logger, handler = buffered
+    monkeypatch.setattr(request_id, "_flask_fallback", True)
+    app = flask.Flask(__name__)
+    flask_request_id.init_app(app)
+
+    @app.route("/ok")
+    def ok() -> str:
+        logger.debug("ok")
+        return "ok"
+
+    @app.route("/fail")
+    def fail() -> str:
+        logger.debug("fail")
+        raise RuntimeError("failed")
+
+    client = app.test_client()
+    client.get("/ok")
+    assert client.get("/fail").status_code == 500
+    assert handler.messages == ["fail"]
@@ -1,4 +1,6 @@
 import json
+import os
+import time
 
 from _pytest.logging import LogCaptureFixture
 
@@ -45,3 +47,31 @@ def test_log_request_id(
         # and in json object output for cloud logging
         log_object = json.loads(caplog.text)
         assert log_object["requestID"] == dummy_flask_request_id
+
+
+def test_counter_request_id() -> None:
+    first, second = request_id.counter_request_id(), request_id.counter_request_id()
+    prefix, count = first.rsplit("-", 1)
+    assert second == f"{prefix}-{int(count, 16) + 1:x}"
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_fd, request_id.counter_request_id().encode("ascii"))
+        os._exit(0)
+    os.waitpid(pid, 0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as reader:
+        child = reader.read().decode("ascii")
+    assert child.rsplit("-", 1)[0] != prefix
+
+
+def test_ulid_request_id() -> None:
+    ulids = [request_id.ulid_request_id() for _ in range(3)]
+    time.sleep(0.002)
+    later = request_id.ulid_request_id()
+    for ulid in ulids + [later]:
+        assert len(ulid) == 26
+        assert set(ulid) <= set("0123456789ABCDEFGHJKMNPQRSTVWXYZ")
+    assert len(set(ulids)) == 3
+    assert later[:10] > max(ulids)[:10]
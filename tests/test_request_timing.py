@@ -0,0 +1,93 @@
+import logging
+from typing import Any, Dict, Iterator
+
+import pytest
+from _pytest.monkeypatch import MonkeyPatch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest_mock import MockFixture
+
+from she_logging import request_timing
+from she_logging.fastapi_request_id import RequestContextMiddleware, RequestIDMiddleware
+from she_logging.records import CompactLogRecord
+
+from .conftest import ListHandler, MakeLogger
+
+NAME = "she-logging-request-timing"
+
+
+@pytest.fixture
+def timing(monkeypatch: MonkeyPatch) -> Iterator[None]:
+    factory = logging.getLogRecordFactory()
+    monkeypatch.setattr(request_timing, "_installed", False)
+    monkeypatch.setattr(request_timing, "_slow_request_ms", 0.0)
+    request_timing.install_request_timing(slow_request_ms=1000)
+    yield
+    logging.setLogRecordFactory(factory)
+
+
+def app_with(middleware: Any, logger: logging.Logger) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware)
+
+    @app.get("/")
+    async def read_root() -> Dict[str, str]:
+        logger.info("handling")
+        return {"Hello": "World"}
+
+    return app
+
+
+def test_not_installed(make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    logger = make_logger(NAME, handler)
+    assert request_timing.start_request_timer() is None
+    response = TestClient(app_with(RequestIDMiddleware, logger)).get("/")
+    assert "Server-Timing" not in response.headers
+    assert "elapsedMs" not in handler.records[0].__dict__
+
+
+def test_elapsed_ms(timing: None, mocker: MockFixture, make_logger: MakeLogger) -> None:
+    clock = mocker.patch.object(request_timing.time, "monotonic", return_value=10.0)
+    handler = ListHandler()
+    logger = make_logger(NAME, handler)
+    slow_handler = ListHandler()
+    make_logger(request_timing.SLOW_REQUEST_LOGGER, slow_handler)
+    logger.info("outside")
+    token = request_timing.start_request_timer()
+    clock.return_value = 10.0125
+    logger.info("inside")
+    assert request_timing.server_timing(12.5) == "app;dur=12.500"
+    clock.return_value = 11.5
+    request_timing.end_request_timer(token, "GET", "/slow")
+    logger.info("after")
+
+    outside, inside, after = handler.records
+    [slow] = slow_handler.records
+    assert "elapsedMs" not in outside.__dict__ and "elapsedMs" not in after.__dict__
+    assert inside.__dict__["elapsedMs"] == 12.5
+    assert slow.getMessage() == "Slow request GET /slow took 1500.0ms"
+    assert slow.levelno == logging.WARNING and slow.__dict__["elapsedMs"] == 1500
+    assert request_timing.request_elapsed_ms() is None
+
+
+def test_compact_records(timing: None, monkeypatch: MonkeyPatch) -> None:
+    logging.setLogRecordFactory(CompactLogRecord)
+    monkeypatch.setattr(request_timing, "_installed", False)
+    request_timing.install_request_timing()
+    token = request_timing.start_request_timer()
+    record = logging.getLogger(NAME).makeRecord(NAME, 20, "f", 1, "m", (), None)
+    request_timing.end_request_timer(token, "GET", "/")
+    assert isinstance(record, CompactLogRecord)
+    assert record.__dict__["elapsedMs"] >= 0
+
+
+@pytest.mark.parametrize("middleware", [RequestIDMiddleware, RequestContextMiddleware])
+def test_middleware(timing: None, middleware: Any, make_logger: MakeLogger) -> None:
+    handler = ListHandler()
+    logger = make_logger(NAME, handler)
+    response = TestClient(app_with(middleware, logger)).get("/")
+    assert response.headers["Server-Timing"].startswith("app;dur=")
+    assert float(response.headers["Server-Timing"][8:]) >= 0
+    [record] = handler.records
+    assert record.__dict__["elapsedMs"] >= 0
@@ -1,3 +1,4 @@
+import json
 import re
 import subprocess
 import sys
@@ -10,9 +11,17 @@ import pytest
 SCRIPT_FOLDER = Path(__file__).parent / "scripts"
 
 
+def normalise_json(output: str) -> str:
+    # orjson and ujson write compact JSON, compare with the standard library layout
+    return "\n".join(
+        json.dumps(json.loads(line)) if line.startswith("{") else line
+        for line in output.split("\n")
+    )
+
+
 def clean_logs(output: bytes, script: Path) -> str:
     cleaned = (
-        output.decode("utf8")
+        normalise_json(output.decode("utf8"))
         .replace(str(script), "📜")
         .replace(str(script.name), "📜")
         .replace(str(script.with_suffix("").name), "📜")
@@ -0,0 +1,79 @@
+import datetime
+import importlib
+import json
+from typing import List
+
+import pytest
+
+from she_logging import serializers
+from she_logging.logging import CustomisedJSONFormatter, SafeJson
+
+AVAILABLE: List[str] = ["json"]
+for name in ("orjson", "ujson"):
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+    else:
+        AVAILABLE.append(name)
+
+
+class Foo:
+    def __repr__(self) -> str:
+        return "<Foo>"
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_serializer_output(name: str) -> None:
+    dumps = serializers.get_serializer(name)
+    now = datetime.datetime(2021, 6, 1, 12, 30, 15, 123456)
+    today = datetime.date(2021, 6, 1)
+
+    data = json.loads(
+        dumps(
+            {
+                "message": "hello",
+                "now": now,
+                "date": today,
+                "unserializable": Foo(),
+                "nested": {"list": [1, 2.5, None, True]},
+            }
+        )
+    )
+
+    assert data["message"] == "hello"
+    assert data["now"] == now.isoformat()
+    assert data["date"] == today.isoformat()
+    assert data["nested"] == {"list": [1, 2.5, None, True]}
+    assert (
+        data["unserializable"].replace("'", "")
+        == "Object of type Foo is not JSON serializable <Foo>"
+    )
+
+
+@pytest.mark.parametrize("name", AVAILABLE)
+def test_serializer_fallback(name: str) -> None:
+    dumps = serializers.get_serializer(name)
+    assert json.loads(dumps({"big": 2**80})) == {"big": 2**80}
+
+
+def test_stdlib_serializer_matches_json_dumps() -> None:
+    data = {"requestID": None, "message": "hello", "lineno": 42}
+    assert serializers.get_serializer("json")(data) == json.dumps(data)
+
+
+def test_unknown_serializer() -> None:
+    with pytest.raises(ValueError):
+        serializers.get_serializer("pickle")
+
+
+def test_formatter_unknown_serializer() -> None:
+    # Fails when the logging configuration is applied, not when a record is written
+    with pytest.raises(ValueError):
+        CustomisedJSONFormatter(serializer="rapidjson")
+
+
+def test_formatter_serializer_option() -> None:
+    formatter = CustomisedJSONFormatter(serializer="json")
+    assert isinstance(formatter.json_lib, SafeJson)
+    assert formatter.json_lib.dumps({"a": 1}) == '{"a": 1}'
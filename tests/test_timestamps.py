@@ -0,0 +1,55 @@
+import datetime
+import logging
+
+import pytest
+
+from she_logging.timestamps import CachedTimeFormatter, TimestampCache
+
+TIMES = [1622550615.123456, 1622550615.9999996, 1622550616.0, 1622550616.5]
+
+
+@pytest.mark.parametrize("created", TIMES)
+def test_iso(created: float) -> None:
+    expected = datetime.datetime.utcfromtimestamp(created).strftime(
+        "%Y-%m-%dT%H:%M:%S.%f"
+    )
+    assert TimestampCache("iso").format(created) == expected
+
+
+@pytest.mark.parametrize("created", TIMES)
+def test_rfc3339_nanos(created: float) -> None:
+    expected = datetime.datetime.utcfromtimestamp(created).strftime(
+        "%Y-%m-%dT%H:%M:%S.%f000Z"
+    )
+    assert TimestampCache("rfc3339_nanos").format(created) == expected
+
+
+def test_epoch_millis() -> None:
+    assert TimestampCache("epoch_millis").format(1622550615.123456) == 1622550615123
+
+
+def test_cache_reused_within_second() -> None:
+    cache = TimestampCache()
+    assert cache.format(1622550615.25) == "2021-06-01T12:30:15.250000"
+    assert cache.format(1622550615.75) == "2021-06-01T12:30:15.750000"
+    assert cache.format(1622550614.5) == "2021-06-01T12:30:14.500000"
+
+
+def test_unknown_format() -> None:
+    with pytest.raises(ValueError):
+        TimestampCache("rfc822")
+
+
+@pytest.mark.parametrize("created", TIMES)
+def test_cached_time_formatter_matches_formatter(created: float) -> None:
+    fmt = "[%(asctime)s] %(levelname)s %(message)s"
+    record = logging.makeLogRecord({"msg": "hello", "levelname": "INFO"})
+    record.created = created
+    record.msecs = int((created - int(created)) * 1000)
+
+    cached = CachedTimeFormatter(fmt)
+    assert cached.format(record) == logging.Formatter(fmt).format(record)
+    assert cached.format(record) == logging.Formatter(fmt).format(record)
+    assert CachedTimeFormatter(fmt, "%H:%M").format(record) == logging.Formatter(
+        fmt, "%H:%M"
+    ).format(record)
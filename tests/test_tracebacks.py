@@ -0,0 +1,109 @@
+import json
+import logging
+import sys
+from typing import Any
+
+import pytest
+from pytest_mock import MockFixture
+
+from she_logging import tracebacks
+from she_logging.logging import CustomisedJSONFormatter
+from she_logging.tracebacks import TracebackRenderer
+
+
+def recurse(depth: int, payload: Any = None) -> None:
+    if depth == 0:
+        raise ValueError(f"failed with {len(str(payload))} characters")
+    recurse(depth - 1, payload)
+
+
+def raised(depth: int = 0, payload: Any = None) -> Any:
+    try:
+        recurse(depth, payload)
+    except ValueError:
+        return sys.exc_info()
+    raise AssertionError("not raised")
+
+
+def test_matches_traceback_module() -> None:
+    exc_info = raised(3)
+    text, exc_id = TracebackRenderer().render(exc_info)
+    expected = logging.Formatter().formatException(exc_info)
+    assert text == expected
+    assert exc_id == tracebacks.exception_id(exc_info)
+
+
+def test_max_frames() -> None:
+    text, _ = TracebackRenderer(max_frames=10, repeat_interval=0).render(raised(100))
+    lines = text.splitlines()
+    assert "  ... 92 frames omitted ..." in lines
+    assert len(lines) < 30
+    assert lines[-1] == "ValueError: failed with 4 characters"
+
+
+def test_locals_are_bounded() -> None:
+    renderer = TracebackRenderer(show_locals=True, max_local_length=50)
+    text, _ = renderer.render(raised(1, payload="x" * 100000))
+    assert "payload = 'xxxxx" in text
+    assert len(text) < 2000
+
+
+def test_max_bytes() -> None:
+    renderer = TracebackRenderer(
+        max_bytes=1000, show_locals=True, max_local_length=1000000
+    )
+    text, _ = renderer.render(raised(1, payload="y" * 100000))
+    assert len(text.encode()) < 1100
+    assert text.startswith("Traceback (most recent call last):\n")
+    assert "bytes truncated" in text
+    assert text.endswith("ValueError: failed with 100000 characters")
+
+
+def test_repeated_exceptions(mocker: MockFixture) -> None:
+    clock = mocker.patch.object(tracebacks.time, "monotonic", return_value=100.0)
+    renderer = TracebackRenderer(repeat_interval=60)
+
+    first, exc_id = renderer.render(raised(2, "first"))
+    assert first.startswith("Traceback (most recent call last):")
+
+    repeated, repeated_id = renderer.render(raised(2, "second"))
+    assert repeated_id == exc_id
+    assert repeated == (
+        f"Traceback repeated, see excId {exc_id}\nValueError: failed with 6 characters"
+    )
+
+    _, other_id = renderer.render(raised(3))
+    assert other_id != exc_id
+
+    clock.return_value = 161.0
+    assert renderer.render(raised(2))[0].startswith("Traceback (most recent")
+
+
+def test_chained_exceptions() -> None:
+    try:
+        try:
+            recurse(0)
+        except ValueError as e:
+            raise RuntimeError("wrapped") from e
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    text, _ = TracebackRenderer().render(exc_info)  # type: ignore[arg-type]
+    assert "ValueError: failed with 4 characters" in text
+    assert "direct cause of the following exception" in text
+    assert text.endswith("RuntimeError: wrapped")
+
+
+@pytest.mark.parametrize(
+    "fields, exc_id", [(None, "excId"), (["message", "exc_info", "exc_id"], "exc_id")]
+)
+def test_formatter(fields: Any, exc_id: str) -> None:
+    formatter = CustomisedJSONFormatter(fields=fields)
+    record = logging.makeLogRecord(
+        {"msg": "failed", "levelno": logging.ERROR, "exc_info": raised(2)}
+    )
+    first = json.loads(formatter.format(record))
+    repeated = json.loads(formatter.format(record))
+
+    assert first[exc_id] == repeated[exc_id]
+    assert first["exc_info"].startswith("Traceback (most recent call last):")
+    assert repeated["exc_info"].startswith("Traceback repeated, see excId")
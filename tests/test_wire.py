@@ -0,0 +1,151 @@
+import datetime
+import logging
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import pytest
+
+from she_logging import context
+from she_logging import logging as she_logging
+from she_logging import request_id, wire
+from she_logging.serializers import get_serializer
+from she_logging.tracebacks import TracebackRenderer
+
+from .conftest import ListHandler, MakeLogger
+
+
+class Unpicklable:
+    def __reduce__(self) -> str:
+        raise TypeError("cannot pickle")
+
+    def __repr__(self) -> str:
+        return "<Unpicklable>"
+
+
+def make_record(exc_info: Any = None, extra: Optional[Dict[str, Any]] = None) -> Any:
+    logger = logging.getLogger("she-logging-wire")
+    return logger.makeRecord(
+        logger.name,
+        logging.WARNING,
+        "/app/service.py",
+        12,
+        "hello %s \udcff",
+        ("wörld",),
+        exc_info,
+        func="handler",
+        extra=extra,
+    )
+
+
+def test_round_trip() -> None:
+    token = request_id.set_request_id("req-1")
+    try:
+        with context.bound(tenant="abc"):
+            record = make_record(
+                extra={
+                    "when": datetime.date(2021, 6, 1),
+                    "other": Unpicklable(),
+                    "count": 3,
+                }
+            )
+    finally:
+        request_id.reset_request_id(token)
+
+    received = wire.decode_record(wire.encode(record))
+    for name in ("name", "levelno", "levelname", "pathname", "filename", "module"):
+        assert getattr(received, name) == getattr(record, name)
+    for name in ("lineno", "funcName", "created", "msecs", "relativeCreated"):
+        assert getattr(received, name) == getattr(record, name)
+    for name in ("process", "processName", "thread", "threadName"):
+        assert getattr(received, name) == getattr(record, name)
+    assert received.getMessage() == "hello wörld \udcff"
+    assert received.args is None
+    assert isinstance(received, type(record))
+    attributes = vars(received)
+    assert attributes["requestID"] == "req-1"
+    assert (attributes["tenant"], attributes["count"]) == ("abc", 3)
+    assert attributes["when"] == "2021-06-01"
+    assert "<Unpicklable>" in attributes["other"]
+
+
+def test_extra_order() -> None:
+    with context.bound(bound=1):
+        record = make_record(extra={"b": 1, "a": 2})
+    record.c = 3
+    data = wire.decode(wire.encode(record, request_headers={"X-Header": "h"}))
+    assert list(data)[-5:] == ["b", "a", "c", "bound", "X-Header"]
+
+
+def test_configured_serializer() -> None:
+    configured = get_serializer(she_logging.LOG_JSON_SERIALIZER)
+    assert wire._dumps.__qualname__ == configured.__qualname__
+
+
+def test_exception_rendered() -> None:
+    try:
+        raise ValueError("failed")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+
+    data = wire.decode(wire.encode(record, tracebacks=TracebackRenderer()))
+    assert data["exc_text"].endswith("ValueError: failed")
+    assert len(data["excId"]) == 12 and data["exc_info"] is None
+
+    data = wire.decode(wire.encode(record))
+    assert data["exc_text"].startswith("Traceback") and "excId" not in data
+
+
+def test_no_process_or_thread() -> None:
+    record = make_record()
+    record.process = record.thread = None
+    data = wire.decode(wire.encode(record))
+    assert data["process"] is None and data["thread"] is None
+
+
+def test_invalid() -> None:
+    data = wire.encode(make_record())
+    with pytest.raises(ValueError, match="Truncated"):
+        wire.decode(data[:-1])
+    with pytest.raises(ValueError, match="version"):
+        wire.decode(b"\x07" + data[1:])
+
+
+def test_split_frames() -> None:
+    frames = [wire.frame(make_record()) for _ in range(3)]
+    stream = b"".join(frames)
+    buffer = bytearray(stream[:-5])
+    assert len(wire.split_frames(buffer)) == 2
+    assert bytes(buffer) == frames[2][:-5]
+    buffer += stream[-5:]
+    [last] = wire.split_frames(buffer)
+    assert wire.decode(last)["msg"] == "hello wörld \udcff" and not buffer
+
+
+def test_handler_and_receiver(make_logger: MakeLogger) -> None:
+    received = ListHandler()
+    logger = make_logger("she-logging-wire.received", received)
+    receiver = wire.WireReceiver(("127.0.0.1", 0))
+    receiver.start()
+    handler = wire.WireSocketHandler("127.0.0.1", receiver.server_address[1])
+    try:
+        handler.handle(
+            logger.makeRecord(
+                logger.name,
+                logging.INFO,
+                __file__,
+                1,
+                "sent %d",
+                (1,),
+                None,
+                extra={"other": Unpicklable()},
+            )
+        )
+        deadline = time.monotonic() + 10
+        while not received.records and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        handler.close()
+        receiver.shutdown()
+        receiver.server_close()
+    assert received.messages == ["sent 1"]